@@ -114,6 +114,14 @@ DATABASES = {
     }
 }
 
+# Cache dùng chung cho response catalog; đặt CACHE_BACKEND/CACHE_LOCATION (vd. memcached) để chia sẻ giữa các worker
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "cosmeticstore"),
+    }
+}
+
 AUTH_USER_MODEL = "store.User"
 
 import pymysql
@@ -150,6 +158,9 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Múi giờ của cửa hàng: ranh giới ngày cho dashboard và báo cáo (DB vẫn lưu UTC)
+STORE_TIME_ZONE = os.getenv("STORE_TIME_ZONE", "Asia/Ho_Chi_Minh")
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
@@ -5,7 +5,9 @@ from .models import (
 	PaymentTransaction, Review,
 	DiscountCode, Promotion,
 	Notification, UserNotification,
-	ChatMessage, DiscountCode, ServiceFee, UserVoucher, FavoriteProduct, StockHistory
+	ChatMessage, DiscountCode, ServiceFee, UserVoucher, FavoriteProduct, StockHistory,
+	ShippingZone, ShippingZoneArea, StockReservation, CheckoutQuote, Job,
+	DailySales, DailyProductSales
 )
 
 @admin.register(User)
@@ -108,7 +110,18 @@ class ChatMessageAdmin(admin.ModelAdmin):
 
 @admin.register(ServiceFee)
 class ServiceFeeAdmin(admin.ModelAdmin):
-	list_display = ("percent", "updated_at")
+	list_display = ("percent", "free_shipping_threshold", "default_shipping_fee", "updated_at")
+
+class ShippingZoneAreaInline(admin.TabularInline):
+	model = ShippingZoneArea
+	extra = 1
+
+@admin.register(ShippingZone)
+class ShippingZoneAdmin(admin.ModelAdmin):
+	list_display = ("name", "fee", "priority", "is_active")
+	list_filter = ("is_active",)
+	search_fields = ("name", "areas__name")
+	inlines = [ShippingZoneAreaInline]
 
 @admin.register(UserVoucher)
 class UserVoucherAdmin(admin.ModelAdmin):
@@ -129,3 +142,34 @@ class StockHistoryAdmin(admin.ModelAdmin):
     list_filter = ("product", "user")
     date_hierarchy = "created_at"
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ("product", "user", "quantity", "status", "checkout_session_id", "expires_at")
+    search_fields = ("product__name", "user__username", "checkout_session_id")
+    list_filter = ("status",)
+    date_hierarchy = "created_at"
+
+@admin.register(CheckoutQuote)
+class CheckoutQuoteAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "total", "checkout_session_id", "order", "expires_at")
+    search_fields = ("user__username", "checkout_session_id")
+    readonly_fields = ("lines",)
+    date_hierarchy = "created_at"
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("kind", "status", "attempts", "run_after", "locked_by", "created_at", "finished_at")
+    search_fields = ("kind", "dedupe_key")
+    list_filter = ("status", "kind")
+    readonly_fields = ("last_error",)
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ("day", "revenue", "order_count", "units_sold", "imports", "exports")
+    date_hierarchy = "day"
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = ("day", "product", "revenue", "order_count", "units_sold", "imports", "exports")
+    search_fields = ("product__name",)
+    date_hierarchy = "day"
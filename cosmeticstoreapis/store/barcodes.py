@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from django.db.models import Q
+from .models import Product
+
+MAX_CACHED_BARCODES = 50000
+MAX_LOOKUP_BARCODES = 500
+LOOKUP_FIELDS = ('id', 'barcode', 'name', 'stock', 'price')
+
+
+# Cache barcode -> id trong từng process (LRU). Id trong cache chỉ là gợi ý: kết quả luôn được đối chiếu
+# lại barcode từ DB nên cache cũ ở worker khác cũng không trả sai sản phẩm
+class BarcodeCache:
+    def __init__(self, max_size=MAX_CACHED_BARCODES):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._barcodes = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, barcodes):
+        with self._lock:
+            found = {}
+            for barcode in barcodes:
+                product_id = self._ids.get(barcode)
+                if product_id is not None:
+                    self._ids.move_to_end(barcode)
+                    found[barcode] = product_id
+            return found
+
+    def set_many(self, mapping):
+        with self._lock:
+            for barcode, product_id in mapping.items():
+                self._ids[barcode] = product_id
+                self._ids.move_to_end(barcode)
+                self._barcodes[product_id] = barcode
+            while len(self._ids) > self.max_size:
+                _, product_id = self._ids.popitem(last=False)
+                self._barcodes.pop(product_id, None)
+
+    def discard_product(self, product_id):
+        with self._lock:
+            barcode = self._barcodes.pop(product_id, None)
+            if barcode is not None:
+                self._ids.pop(barcode, None)
+
+    def discard_barcodes(self, barcodes):
+        with self._lock:
+            for barcode in barcodes:
+                product_id = self._ids.pop(barcode, None)
+                if product_id is not None and self._barcodes.get(product_id) == barcode:
+                    del self._barcodes[product_id]
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._barcodes.clear()
+
+
+barcode_cache = BarcodeCache()
+
+
+# Tra cứu nhiều barcode trong một truy vấn: id đã cache tra theo khoá chính, phần còn lại theo index unique barcode
+def lookup_barcodes(barcodes):
+    barcodes = list(dict.fromkeys(str(b).strip() for b in barcodes if b and str(b).strip()))
+    if not barcodes:
+        return [], []
+    cached = barcode_cache.get_many(barcodes)
+    unknown = [b for b in barcodes if b not in cached]
+    condition = Q(pk__in=list(cached.values())) | Q(barcode__in=unknown)
+    rows = {row['barcode']: row for row in Product.objects.filter(condition).values(*LOOKUP_FIELDS)}
+    # Id cache cũ (barcode đã đổi) thì tra lại theo barcode
+    stale = [b for b in cached if b not in rows]
+    if stale:
+        barcode_cache.discard_barcodes(stale)
+        rows.update({row['barcode']: row for row in Product.objects.filter(barcode__in=stale).values(*LOOKUP_FIELDS)})
+    barcode_cache.set_many({b: rows[b]['id'] for b in barcodes if b in rows})
+    results = [dict(rows[b], price=str(rows[b]['price'])) for b in barcodes if b in rows]
+    not_found = [b for b in barcodes if b not in rows]
+    return results, not_found
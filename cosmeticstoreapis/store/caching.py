@@ -0,0 +1,83 @@
+import hashlib
+import json
+from functools import wraps
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOG_CACHE_TIMEOUT = 300
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+# Số phiên bản dùng chung giữa các worker qua cache: khoá cache gắn phiên bản, tăng phiên bản là vô hiệu toàn bộ
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def catalog_cache_key(request):
+    params = sorted(request.query_params.lists())
+    raw = json.dumps([request.get_host(), request.path, params, request.accepted_renderer.format])
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f'catalog:{get_catalog_version()}:{digest}'
+
+
+def _etag_for(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    return '"%s"' % hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _if_none_match(request):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return {tag.strip() for tag in header.split(',') if tag.strip()}
+
+
+# Cache response của view catalog theo query params, trả 304 khi If-None-Match khớp ETag.
+# Response chứa giá bán nên không được sống quá mốc khuyến mãi bắt đầu/kết thúc kế tiếp
+def cached_catalog_response(request, build_response):
+    from .promotions import seconds_until_promotion_boundary
+    key = catalog_cache_key(request)
+    entry = cache.get(key)
+    if entry is None:
+        response = build_response()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        entry = (_etag_for(response.data), response.data)
+        timeout = min(CATALOG_CACHE_TIMEOUT, int(seconds_until_promotion_boundary()))
+        if timeout > 0:
+            cache.set(key, entry, timeout)
+    etag, data = entry
+    client_tags = _if_none_match(request)
+    if etag in client_tags or '*' in client_tags:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    return response
+
+
+# Decorator cho action list/retrieve của các ViewSet catalog
+def catalog_cached(view_method):
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        return cached_catalog_response(request, lambda: view_method(self, request, *args, **kwargs))
+    return wrapper
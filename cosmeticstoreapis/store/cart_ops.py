@@ -0,0 +1,48 @@
+from .models import CartItem, Product
+
+MAX_CART_OPERATIONS = 100
+CART_OPERATIONS = ('add', 'set_quantity', 'remove')
+
+
+class CartOperationError(Exception):
+    pass
+
+
+# Áp dụng lần lượt các thao tác add / set_quantity / remove lên giỏ hàng rồi ghi kết quả cuối cùng
+# bằng tối đa một bulk_create, một bulk_update và một delete. Gọi trong transaction, sau khi khoá cart
+def apply_cart_operations(cart, operations):
+    product_ids = {operation['product'] for operation in operations}
+    known = set(Product.objects.filter(pk__in=product_ids).values_list('id', flat=True))
+    missing = sorted(product_ids - known)
+    if missing:
+        raise CartOperationError(f"Không tìm thấy sản phẩm: {', '.join(map(str, missing))}")
+
+    items = {item.product_id: item for item in CartItem.objects.filter(cart=cart).order_by('id')}
+    quantities = {product_id: item.quantity for product_id, item in items.items()}
+    for operation in operations:
+        product_id = operation['product']
+        if operation['op'] == 'add':
+            quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+        elif operation['op'] == 'set_quantity':
+            quantities[product_id] = operation['quantity']
+        else:
+            quantities[product_id] = 0
+
+    to_create, to_update, to_delete = [], [], []
+    for product_id, quantity in quantities.items():
+        item = items.get(product_id)
+        if item is None:
+            if quantity > 0:
+                to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+        elif quantity <= 0:
+            to_delete.append(item.pk)
+        elif quantity != item.quantity:
+            item.quantity = quantity
+            to_update.append(item)
+    if to_delete:
+        CartItem.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        CartItem.objects.bulk_update(to_update, ['quantity'])
+    if to_create:
+        CartItem.objects.bulk_create(to_create)
+    return len(to_create), len(to_update), len(to_delete)
@@ -0,0 +1,137 @@
+import csv
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+# Các cột của file nhập/xuất sản phẩm. image là public id ảnh trên Cloudinary. Khi nhập, stock và sold chỉ dùng làm
+# giá trị ban đầu cho sản phẩm mới (để xuất rồi nhập sang DB trống giữ nguyên tồn kho); với sản phẩm đã có, tồn kho
+# chỉ thay đổi qua quantity là số lượng nhập kho cộng thêm. import_price là giá nhập ghi vào ImportTransaction (mặc định bằng price)
+PRODUCT_COLUMNS = (
+    'barcode', 'name', 'description', 'price', 'stock', 'sold', 'brand', 'category',
+    'capacity', 'origin', 'ingredients', 'skin_type', 'image',
+)
+IMPORT_COLUMNS = PRODUCT_COLUMNS + ('quantity', 'import_price')
+UPDATABLE_FIELDS = ('name', 'description', 'price', 'capacity', 'origin', 'ingredients', 'skin_type')
+FORMATS = ('csv', 'jsonl')
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return 'jsonl' if ext in ('jsonl', 'ndjson') else 'csv'
+
+
+# Đọc lần lượt từng dòng (số dòng, dict) mà không nạp cả file vào bộ nhớ. Dòng JSONL hỏng được trả về
+# dưới dạng RowError thay cho dict để bên gọi ghi nhận theo số dòng như các lỗi khác và đọc tiếp
+def iter_rows(stream, fmt):
+    if fmt == 'csv':
+        for line_no, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_no, row
+    else:
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                row = RowError(f'JSON không hợp lệ: {exc.msg} (cột {exc.colno})')
+            else:
+                if not isinstance(row, dict):
+                    row = RowError('mỗi dòng JSONL phải là một object')
+            yield line_no, row
+
+
+def _text(row, name):
+    value = row.get(name)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _decimal(row, name):
+    value = _text(row, name)
+    if value is None:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise RowError(f'{name} không hợp lệ: {value!r}')
+
+
+def _int(row, name):
+    value = _text(row, name)
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise RowError(f'{name} không hợp lệ: {value!r}')
+    if number < 0:
+        raise RowError(f'{name} không được âm: {value!r}')
+    return number
+
+
+# Chuẩn hoá một dòng nhập thành dict giá trị đã ép kiểu
+def parse_import_row(row):
+    if isinstance(row, RowError):
+        raise row
+    barcode = _text(row, 'barcode')
+    if not barcode:
+        raise RowError('thiếu barcode')
+    return {
+        'barcode': barcode,
+        'name': _text(row, 'name'),
+        'description': _text(row, 'description'),
+        'price': _decimal(row, 'price'),
+        'stock': _int(row, 'stock'),
+        'sold': _int(row, 'sold'),
+        'brand': _text(row, 'brand'),
+        'category': _text(row, 'category'),
+        'capacity': _text(row, 'capacity'),
+        'origin': _text(row, 'origin'),
+        'ingredients': _text(row, 'ingredients'),
+        'skin_type': _text(row, 'skin_type'),
+        'image': _text(row, 'image'),
+        'quantity': _int(row, 'quantity') or 0,
+        'import_price': _decimal(row, 'import_price'),
+    }
+
+
+def product_row(product):
+    return {
+        'barcode': product.barcode or '',
+        'name': product.name,
+        'description': product.description or '',
+        'price': str(product.price),
+        'stock': product.stock,
+        'sold': product.sold,
+        'brand': product.brand.name,
+        'category': product.category.name,
+        'capacity': product.capacity or '',
+        'origin': product.origin or '',
+        'ingredients': product.ingredients or '',
+        'skin_type': product.skin_type or '',
+        'image': getattr(product.image, 'public_id', None) or '',
+    }
+
+
+class RowWriter:
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(stream, fieldnames=PRODUCT_COLUMNS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
@@ -0,0 +1,76 @@
+import hashlib
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .caching import bump_version, get_version
+
+DISCOUNT_VERSION_KEY = 'discounts:version'
+# Kết quả tra mã giảm giá được cache ngắn: used_count có thể trễ tối đa khoảng này,
+# giới hạn max_uses thực sự được giữ bởi redeem_discount_code
+DISCOUNT_CACHE_TTL = 30
+DISCOUNT_LOOKUP_FIELDS = ('id', 'code', 'discount_percentage', 'valid_from', 'valid_to', 'max_uses', 'used_count', 'is_active')
+# Đánh dấu mã không tồn tại trong cache (phân biệt với cache miss)
+MISSING = 'missing'
+
+
+# Dạng chuẩn của mã giảm giá để tra theo index: bỏ khoảng trắng hai đầu, viết hoa
+def normalize_discount_code(code):
+    return (code or '').strip().upper()
+
+
+def _cache_key(normalized):
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    return f'discount:{get_version(DISCOUNT_VERSION_KEY)}:{digest}'
+
+
+# Tra mã theo cột code_normalized (có index), kết quả (kể cả không tìm thấy) cache DISCOUNT_CACHE_TTL giây
+def lookup_discount_code(code):
+    from .models import DiscountCode
+    normalized = normalize_discount_code(code)
+    if not normalized:
+        return None
+    key = _cache_key(normalized)
+    row = cache.get(key)
+    if row is None:
+        row = DiscountCode.objects.filter(code_normalized=normalized).values(*DISCOUNT_LOOKUP_FIELDS).first() or MISSING
+        cache.set(key, row, DISCOUNT_CACHE_TTL)
+    return None if row == MISSING else row
+
+
+# Mã còn dùng được tại thời điểm now (cùng điều kiện với DiscountCode.is_valid)
+def is_discount_usable(row, now=None):
+    now = now or timezone.now()
+    if not row['is_active'] or not row['valid_from'] <= now <= row['valid_to']:
+        return False
+    return row['max_uses'] is None or row['used_count'] < row['max_uses']
+
+
+def bump_discount_version():
+    bump_version(DISCOUNT_VERSION_KEY)
+
+
+# Điều kiện còn lượt dùng trong câu UPDATE: chỉ tăng used_count khi used_count < max_uses
+def _redeemable(now):
+    return Q(is_active=True, valid_from__lte=now, valid_to__gte=now) & (
+        Q(max_uses__isnull=True) | Q(used_count__lt=F('max_uses'))
+    )
+
+
+# Dùng một lượt của mã giảm giá bằng một câu UPDATE có điều kiện; checkout đồng thời không thể vượt max_uses.
+# used_count đổi nên bỏ kết quả tra mã đã cache (sau commit) để mã vừa hết lượt không còn báo hợp lệ.
+# Trả về False nếu mã hết hạn, bị tắt hoặc đã hết lượt
+def redeem_discount_code(discount_code_id, now=None):
+    from .models import DiscountCode
+    now = now or timezone.now()
+    redeemed = DiscountCode.objects.filter(_redeemable(now), pk=discount_code_id).update(used_count=F('used_count') + 1) == 1
+    if redeemed:
+        transaction.on_commit(bump_discount_version)
+    return redeemed
+
+
+# Trả lại lượt đã dùng khi phiên thanh toán hết hạn mà chưa thanh toán
+def release_discount_code(discount_code_id):
+    from .models import DiscountCode
+    if DiscountCode.objects.filter(pk=discount_code_id, used_count__gt=0).update(used_count=F('used_count') - 1):
+        transaction.on_commit(bump_discount_version)
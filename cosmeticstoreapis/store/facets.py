@@ -0,0 +1,136 @@
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Q, Value, When
+from .caching import CATALOG_CACHE_TIMEOUT, get_catalog_version
+
+# Các khoảng giá dùng cho facet giá: (key, min, max), max = None là không giới hạn
+PRICE_BUCKETS = (
+    ('under_100k', 0, 100000),
+    ('100k_200k', 100000, 200000),
+    ('200k_500k', 200000, 500000),
+    ('500k_1m', 500000, 1000000),
+    ('over_1m', 1000000, None),
+)
+FILTER_PARAMS = ('category', 'brand', 'skin_type', 'origin', 'min_price', 'max_price', 'min_rating', 'in_stock', 'search')
+
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+
+
+def _list_param(params, name):
+    values = []
+    for raw in params.getlist(name):
+        values.extend(v.strip() for v in raw.split(',') if v.strip())
+    return values
+
+
+def _decimal_param(params, name):
+    try:
+        return Decimal(params.get(name))
+    except (TypeError, InvalidOperation):
+        return None
+
+
+# Lọc sản phẩm theo category, brand, skin_type, origin (nhận nhiều giá trị cách nhau dấu phẩy),
+# khoảng giá, điểm đánh giá tối thiểu và còn hàng
+def apply_catalog_filters(queryset, params):
+    category_ids = [v for v in _list_param(params, 'category') if v.isdigit()]
+    brand_ids = [v for v in _list_param(params, 'brand') if v.isdigit()]
+    skin_types = _list_param(params, 'skin_type')
+    origins = _list_param(params, 'origin')
+    if category_ids:
+        queryset = queryset.filter(category_id__in=category_ids)
+    if brand_ids:
+        queryset = queryset.filter(brand_id__in=brand_ids)
+    if skin_types:
+        queryset = queryset.filter(skin_type__in=skin_types)
+    if origins:
+        queryset = queryset.filter(origin__in=origins)
+    min_price = _decimal_param(params, 'min_price')
+    max_price = _decimal_param(params, 'max_price')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lt=max_price)
+    min_rating = _decimal_param(params, 'min_rating')
+    if min_rating is not None:
+        queryset = queryset.filter(rating_avg__gte=float(min_rating))
+    # Giá trị in_stock không nhận ra (rỗng, sai chính tả) bị bỏ qua như các tham số số không hợp lệ ở trên
+    in_stock = (params.get('in_stock') or '').strip().lower()
+    if in_stock in TRUE_VALUES:
+        queryset = queryset.filter(stock__gt=0)
+    elif in_stock in FALSE_VALUES:
+        queryset = queryset.filter(stock=0)
+    return queryset
+
+
+def _price_bucket_expression():
+    whens = []
+    for key, low, high in PRICE_BUCKETS:
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        whens.append(When(condition, then=Value(key)))
+    return Case(*whens, default=Value(''), output_field=CharField())
+
+
+def filter_signature(params):
+    selected = {name: sorted(params.getlist(name)) for name in FILTER_PARAMS if name in params}
+    raw = json.dumps(selected, sort_keys=True)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+# Đếm facet cho tập sản phẩm đã lọc bằng một truy vấn GROUP BY duy nhất, sau đó gộp theo từng facet
+def compute_facets(queryset):
+    rows = (
+        queryset.order_by()
+        .values(
+            'brand_id', 'brand__name', 'category_id', 'category__name', 'skin_type', 'origin',
+            price_bucket=_price_bucket_expression(),
+            in_stock=Case(When(stock__gt=0, then=Value('true')), default=Value('false'), output_field=CharField()),
+        )
+        .annotate(count=Count('id'))
+    )
+    brands, categories, skin_types, origins = {}, {}, {}, {}
+    prices = {key: 0 for key, _, _ in PRICE_BUCKETS}
+    in_stock = {'true': 0, 'false': 0}
+    for row in rows:
+        count = row['count']
+        brand = brands.setdefault(row['brand_id'], {'id': row['brand_id'], 'name': row['brand__name'], 'count': 0})
+        brand['count'] += count
+        category = categories.setdefault(row['category_id'], {'id': row['category_id'], 'name': row['category__name'], 'count': 0})
+        category['count'] += count
+        if row['skin_type']:
+            skin_types[row['skin_type']] = skin_types.get(row['skin_type'], 0) + count
+        if row['origin']:
+            origins[row['origin']] = origins.get(row['origin'], 0) + count
+        if row['price_bucket']:
+            prices[row['price_bucket']] += count
+        in_stock[row['in_stock']] += count
+
+    def by_count(items):
+        return sorted(items, key=lambda item: (-item['count'], str(item.get('name', item.get('value')))))
+
+    return {
+        'brand': by_count(brands.values()),
+        'category': by_count(categories.values()),
+        'skin_type': by_count({'value': k, 'count': v} for k, v in skin_types.items()),
+        'origin': by_count({'value': k, 'count': v} for k, v in origins.items()),
+        'price': [
+            {'key': key, 'min': low, 'max': high, 'count': prices[key]}
+            for key, low, high in PRICE_BUCKETS
+        ],
+        'in_stock': in_stock,
+    }
+
+
+# Facet được cache theo chữ ký bộ lọc (không phụ thuộc trang), vô hiệu cùng phiên bản catalog
+def get_facets(queryset, params):
+    key = f'facets:{get_catalog_version()}:{filter_signature(params)}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, CATALOG_CACHE_TIMEOUT)
+    return facets
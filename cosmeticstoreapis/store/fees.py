@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+from .caching import bump_version, get_version
+from .shipping import build_zone_matcher
+
+FEE_CONFIG_VERSION_KEY = 'fees:version'
+# Lưới an toàn khi cache không dùng chung giữa các worker (LocMemCache): tự nạp lại sau khoảng này
+FEE_CONFIG_MAX_AGE = 60
+
+FeeConfig = namedtuple('FeeConfig', (
+    'service_fee_percent', 'free_shipping_threshold', 'default_shipping_fee', 'shipping_zones',
+))
+DEFAULT_SERVICE_FEE_PERCENT = 2.0
+DEFAULT_FREE_SHIPPING_THRESHOLD = Decimal('500000')
+DEFAULT_SHIPPING_FEE = Decimal('50000')
+
+
+# Nạp ServiceFee mới nhất và bảng vùng giao hàng (store/shipping.py)
+def load_fee_config():
+    from .models import ServiceFee
+    config = ServiceFee.objects.order_by('-updated_at').first()
+    if config is None:
+        percent, threshold, default_fee = DEFAULT_SERVICE_FEE_PERCENT, DEFAULT_FREE_SHIPPING_THRESHOLD, DEFAULT_SHIPPING_FEE
+    else:
+        percent, threshold, default_fee = config.percent, config.free_shipping_threshold, config.default_shipping_fee
+    return FeeConfig(percent, threshold, default_fee, build_zone_matcher(default_fee))
+
+
+# Cấu hình phí trong bộ nhớ của từng process, gắn với số phiên bản dùng chung.
+# Mỗi lần đọc chỉ kiểm tra phiên bản trong cache, chỉ truy vấn DB khi phiên bản đổi (admin lưu ServiceFee)
+class FeeConfigCache:
+    def __init__(self, max_age=FEE_CONFIG_MAX_AGE):
+        self.max_age = max_age
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = get_version(FEE_CONFIG_VERSION_KEY)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry
+        if entry is not None and entry[0] == version and now - entry[1] < self.max_age:
+            return entry[2]
+        config = load_fee_config()
+        with self._lock:
+            self._entry = (version, now, config)
+        return config
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+
+
+fee_config_cache = FeeConfigCache()
+
+
+def get_fee_config():
+    return fee_config_cache.get()
+
+
+def bump_fee_config_version():
+    bump_version(FEE_CONFIG_VERSION_KEY)
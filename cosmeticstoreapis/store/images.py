@@ -0,0 +1,43 @@
+from cloudinary import CloudinaryResource
+
+# Các biến thể ảnh dựng sẵn: thumbnail cho lưới/danh sách, card cho thẻ sản phẩm, full cho trang chi tiết.
+# Cloudinary tự chọn định dạng và chất lượng phù hợp với thiết bị (f_auto, q_auto)
+IMAGE_VARIANTS = {
+    'thumbnail': {'width': 150, 'height': 150, 'crop': 'fill'},
+    'card': {'width': 400, 'height': 400, 'crop': 'fill'},
+    'full': {'width': 1200, 'crop': 'limit'},
+}
+DEFAULT_VARIANT = 'full'
+
+
+# Tính URL cho mọi biến thể của một ảnh Cloudinary, {} nếu không có ảnh
+def build_image_urls(image):
+    if not image or not isinstance(image, CloudinaryResource) or not image.public_id:
+        return {}
+    return {
+        name: image.build_url(secure=True, fetch_format='auto', quality='auto', **options)
+        for name, options in IMAGE_VARIANTS.items()
+    }
+
+
+# Cập nhật image_urls của bản ghi nếu ảnh đã thay đổi, chỉ ghi DB khi giá trị khác
+def refresh_image_urls(instance):
+    # Ảnh gán bằng chuỗi public id chưa được CloudinaryField chuyển thành CloudinaryResource
+    image = instance._meta.get_field('image').to_python(instance.image)
+    urls = build_image_urls(image)
+    if urls != (instance.image_urls or {}):
+        instance.image_urls = urls
+        type(instance).objects.filter(pk=instance.pk).update(image_urls=urls)
+    return urls
+
+
+# URL ảnh trả cho client: lấy biến thể đã lưu sẵn, chỉ tự dựng URL với bản ghi cũ chưa có image_urls
+def image_url(instance, request=None, variant=DEFAULT_VARIANT):
+    url = (instance.image_urls or {}).get(variant)
+    if url:
+        return url
+    if not instance.image:
+        return ''
+    if request:
+        return request.build_absolute_uri(instance.image.url)
+    return instance.image.url
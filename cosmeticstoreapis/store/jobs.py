@@ -0,0 +1,117 @@
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+VISIBILITY_TIMEOUT = timedelta(minutes=5)
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+
+_handlers = {}
+
+
+# Đăng ký hàm xử lý cho một loại job: @job_handler('order.notify_paid')
+def job_handler(kind):
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def get_handler(kind):
+    # Các handler khai báo trong store/tasks.py, nạp khi cần để tránh import vòng
+    from . import tasks  # noqa: F401
+    return _handlers.get(kind)
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# Xếp một job vào hàng đợi. Có dedupe_key thì job trùng khoá (vd. Stripe gửi lại sự kiện) trả về job đã có.
+# Gọi trong transaction thì job chỉ hiển thị với worker sau khi transaction commit
+def enqueue(kind, payload=None, dedupe_key=None, delay=None, max_attempts=5):
+    fields = {
+        'kind': kind,
+        'payload': payload or {},
+        'max_attempts': max_attempts,
+        'run_after': timezone.now() + (delay or timedelta()),
+    }
+    if dedupe_key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(dedupe_key=dedupe_key, **fields)
+    except IntegrityError:
+        return Job.objects.get(dedupe_key=dedupe_key)
+
+
+def backoff_delay(attempts):
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+# Nhận tối đa limit job sẵn sàng: job đang chờ đã tới run_after, hoặc job đang chạy đã quá hạn thuê
+# (worker cũ chết). SKIP LOCKED để nhiều worker nhận song song không chặn nhau
+def claim_jobs(worker_id, limit, visibility_timeout=VISIBILITY_TIMEOUT):
+    now = timezone.now()
+    ready = Q(status=JobStatus.QUEUED, run_after__lte=now) | Q(status=JobStatus.RUNNING, locked_until__lte=now)
+    with transaction.atomic():
+        ids = list(
+            Job.objects.filter(ready).order_by('run_after', 'id')
+            .select_for_update(skip_locked=True).values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(pk__in=ids).update(
+            status=JobStatus.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + visibility_timeout,
+            attempts=F('attempts') + 1,
+            started_at=now,
+        )
+    return list(Job.objects.filter(pk__in=ids).order_by('run_after', 'id'))
+
+
+# Chạy một job đã nhận. Chỉ ghi kết quả nếu job vẫn thuộc worker này (chưa bị worker khác nhận lại).
+# Lỗi thì xếp lại với backoff luỹ thừa, hết số lần thử thì đánh dấu failed.
+# Trả về True nếu job chạy thành công và kết quả đã được ghi nhận
+def run_job(job, worker_id):
+    handler = get_handler(job.kind)
+    owned = Job.objects.filter(pk=job.pk, locked_by=worker_id, status=JobStatus.RUNNING)
+    try:
+        if handler is None:
+            raise LookupError(f'Không có handler cho job {job.kind}')
+        handler(job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            owned.update(status=JobStatus.FAILED, last_error=error, finished_at=timezone.now(), locked_until=None)
+            logger.error('Job %s #%s failed permanently: %s', job.kind, job.pk, error)
+        else:
+            owned.update(
+                status=JobStatus.QUEUED, last_error=error, locked_by=None, locked_until=None,
+                run_after=timezone.now() + backoff_delay(job.attempts),
+            )
+            logger.warning('Job %s #%s failed (attempt %s), retrying: %s', job.kind, job.pk, job.attempts, error)
+        return False
+    return bool(owned.update(status=JobStatus.SUCCEEDED, finished_at=timezone.now(), locked_until=None))
+
+
+# Số job theo trạng thái và độ trễ hàng đợi (tuổi của job sẵn sàng lâu nhất, tính bằng giây)
+def queue_stats():
+    now = timezone.now()
+    counts = dict(Job.objects.values_list('status').annotate(total=Count('id')).order_by())
+    oldest = Job.objects.filter(status=JobStatus.QUEUED, run_after__lte=now).aggregate(oldest=Min('run_after'))['oldest']
+    return {
+        'counts': {status: counts.get(status, 0) for status in JobStatus.values},
+        'oldest_ready_seconds': (now - oldest).total_seconds() if oldest else 0,
+    }
@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from store.models import Order, OrderStatus, User
+from store.order_search import search_orders
+
+PAGE_SIZE = 20
+
+
+# Cho phép ghi created_at tuỳ ý khi sinh dữ liệu (auto_now_add luôn ghi đè bằng thời điểm hiện tại)
+@contextmanager
+def writable_created_at():
+    field = Order._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the staff order list/search queries (AdminOrderViewSet) against the current database, '
+        'optionally seeding synthetic orders first, and compare them with the old icontains search'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Số đơn hàng giả lập cần tạo trước khi đo')
+        parser.add_argument('--users', type=int, default=5000, help='Số user giả lập khi --seed')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20, help='Số lần chạy mỗi truy vấn')
+        parser.add_argument('--explain', action='store_true', help='In kế hoạch truy vấn của từng trường hợp')
+        parser.add_argument('--cleanup', action='store_true', help='Xoá user/đơn giả lập sau khi đo')
+
+    def handle(self, *args, **options):
+        tag = f'bench-{uuid.uuid4().hex[:8]}'
+        if options['seed']:
+            self.seed(tag, options['seed'], max(options['users'], 1), options['batch_size'])
+        try:
+            sample = Order.objects.exclude(receiver_phone=None).order_by('-id').values('id', 'receiver_phone', 'user__username').first()
+            if sample is None:
+                raise CommandError('Chưa có đơn hàng nào có số điện thoại, chạy lại với --seed.')
+            self.stdout.write(f'{Order.objects.count()} đơn hàng; mẫu: #{sample["id"]}, {sample["receiver_phone"]}, {sample["user__username"]}')
+            self.run_cases(sample, options['repeat'], options['explain'])
+        finally:
+            if options['cleanup'] and options['seed']:
+                deleted, _ = User.objects.filter(username__startswith=f'{tag}-').delete()
+                self.stdout.write(f'Đã xoá {deleted} bản ghi giả lập.')
+
+    def seed(self, tag, total, users, batch_size):
+        phones = [f'09{random.randrange(10 ** 8):08d}' for _ in range(users)]
+        User.objects.bulk_create(
+            [User(username=f'{tag}-{i}', phone=phones[i]) for i in range(users)], batch_size=batch_size,
+        )
+        user_ids = list(User.objects.filter(username__startswith=f'{tag}-').order_by('id').values_list('id', flat=True))
+        statuses = [choice for choice, _ in OrderStatus.choices]
+        now = timezone.now()
+        started = time.monotonic()
+        with writable_created_at():
+            for offset in range(0, total, batch_size):
+                batch = []
+                for _ in range(min(batch_size, total - offset)):
+                    index = random.randrange(len(user_ids))
+                    batch.append(Order(
+                        user_id=user_ids[index],
+                        status=random.choice(statuses),
+                        total_price=random.randrange(50, 5000) * 1000,
+                        address=f'{random.randrange(1, 500)} Đường số {random.randrange(1, 100)}, Quận {random.randrange(1, 13)}',
+                        receiver_phone=phones[index],
+                        created_at=now - timedelta(seconds=random.randrange(2 * 365 * 86400)),
+                    ))
+                Order.objects.bulk_create(batch)
+                self.stdout.write(f'  đã tạo {offset + len(batch)}/{total} đơn', ending='\r')
+        self.stdout.write(f'Đã tạo {total} đơn cho {len(user_ids)} user trong {time.monotonic() - started:.1f}s.')
+
+    def run_cases(self, sample, repeat, explain):
+        base = Order.objects.order_by('-created_at', '-id')
+        username = sample['user__username']
+        prefix = username[:max(len(username) - 1, 1)]
+        legacy = lambda term: base.filter(
+            Q(id__icontains=term) | Q(address__icontains=term) | Q(receiver_phone__icontains=term) | Q(user__username__icontains=term)
+        )
+        cases = [
+            ('danh sách mới nhất', base),
+            ('lọc status=paid', base.filter(status=OrderStatus.PAID)),
+            ('đơn của một user', base.filter(user__username=username)),
+            ('tìm #mã đơn', search_orders(base, f'#{sample["id"]}')),
+            ('tìm số điện thoại', search_orders(base, sample['receiver_phone'])),
+            ('tìm tiền tố username', search_orders(base, prefix)),
+            ('cũ: icontains số điện thoại', legacy(sample['receiver_phone'])),
+            ('cũ: icontains username', legacy(prefix)),
+        ]
+        self.stdout.write(f'{"trường hợp":<30} {"p50 ms":>9} {"p95 ms":>9} {"kết quả":>8}')
+        for name, queryset in cases:
+            page = queryset.values_list('id', flat=True)[:PAGE_SIZE]
+            timings = []
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                rows = list(page.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(f'{name:<30} {statistics.median(timings):>9.2f} {p95:>9.2f} {len(rows):>8}')
+            if explain:
+                self.stdout.write(page.explain())
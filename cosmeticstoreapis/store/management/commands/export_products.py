@@ -0,0 +1,35 @@
+import sys
+import time
+from django.core.management.base import BaseCommand
+from store.models import Product
+from store.catalog_io import FORMATS, RowWriter, detect_format, product_row
+
+class Command(BaseCommand):
+    help = 'Export products to CSV/JSONL, streaming rows in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Đường dẫn file xuất, '-' để ghi ra stdout")
+        parser.add_argument('--format', choices=FORMATS, help='Mặc định đoán theo phần mở rộng của file')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format'])
+        products = Product.objects.select_related('brand', 'category').order_by('id').iterator(
+            chunk_size=options['chunk_size']
+        )
+        started = time.monotonic()
+        count = 0
+        stream = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        try:
+            writer = RowWriter(stream, fmt)
+            for product in products:
+                writer.write(product_row(product))
+                count += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stderr.write(self.style.SUCCESS(
+            f'Đã xuất {count} sản phẩm trong {elapsed:.1f}s ({count / elapsed:.0f} dòng/giây).'
+        ))
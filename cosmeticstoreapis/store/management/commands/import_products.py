@@ -0,0 +1,164 @@
+import time
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from store.models import Brand, Category, Product, ImportTransaction, StockHistory, User
+from store.catalog_io import FORMATS, UPDATABLE_FIELDS, RowError, detect_format, iter_rows, parse_import_row
+from store.search import reindex_products
+from store.caching import bump_catalog_version
+from store.rollups import apply_stock_movements
+from store.images import build_image_urls
+
+MAX_REPORTED_ERRORS = 20
+# bulk_update sinh câu CASE WHEN theo từng dòng, lô nhỏ hơn giúp MySQL xử lý nhanh hơn
+BULK_UPDATE_BATCH_SIZE = 200
+
+class Command(BaseCommand):
+    help = (
+        'Import products from CSV/JSONL, upserting on barcode in batches (streams the file in constant memory). '
+        'The stock and sold columns only set the starting values of new products; quantity is added to the stock '
+        'of new and existing products and recorded as a stock import'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Đường dẫn file CSV hoặc JSONL')
+        parser.add_argument('--format', choices=FORMATS, help='Mặc định đoán theo phần mở rộng của file')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--user', help='Username ghi nhận vào lịch sử kho')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options['path'], options['format'])
+        self.batch_size = max(options['batch_size'], 1)
+        self.verbosity = options['verbosity']
+        self.user = None
+        if options['user']:
+            try:
+                self.user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"Không tìm thấy user '{options['user']}'.")
+        self.brands = dict(Brand.objects.values_list('name', 'id'))
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.created = self.updated = self.rows = 0
+        self.errors = []
+
+        started = time.monotonic()
+        with open(options['path'], encoding=options['encoding'], newline='') as stream:
+            batch = {}
+            for line_no, row in iter_rows(stream, fmt):
+                self.rows += 1
+                try:
+                    data = parse_import_row(row)
+                except RowError as exc:
+                    self.errors.append((line_no, str(exc)))
+                    continue
+                previous = batch.get(data['barcode'])
+                if previous is not None:
+                    # Barcode lặp lại trong cùng lô: giữ giá trị mới nhất, cộng dồn số lượng nhập
+                    data['quantity'] += previous[1]['quantity']
+                batch[data['barcode']] = (line_no, data)
+                if len(batch) >= self.batch_size:
+                    self.process_batch(batch)
+                    batch = {}
+            if batch:
+                self.process_batch(batch)
+        bump_catalog_version()
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        for line_no, message in self.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(f'Dòng {line_no}: {message}')
+        if len(self.errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f'... và {len(self.errors) - MAX_REPORTED_ERRORS} lỗi khác')
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã xử lý {self.rows} dòng trong {elapsed:.1f}s ({self.rows / elapsed:.0f} dòng/giây): '
+            f'{self.created} tạo mới, {self.updated} cập nhật, {len(self.errors)} lỗi.'
+        ))
+
+    def resolve(self, mapping, model, name):
+        if name not in mapping:
+            mapping[name] = model.objects.create(name=name).pk
+        return mapping[name]
+
+    # Ảnh từ public id trong file, kèm các URL biến thể (bulk_create/bulk_update không chạy post_save dựng image_urls)
+    def set_image(self, product, public_id):
+        product.image = Product._meta.get_field('image').to_python(public_id)
+        product.image_urls = build_image_urls(product.image)
+
+    # Upsert một lô theo barcode: một truy vấn đọc, bulk_create/bulk_update, ghi lịch sử kho hàng loạt
+    def process_batch(self, batch):
+        with transaction.atomic():
+            existing = Product.objects.filter(barcode__in=list(batch)).in_bulk(field_name='barcode')
+            to_create, to_update, receipts = [], [], []
+            update_fields = set()
+            stock_increments = defaultdict(list)
+            for barcode, (line_no, data) in batch.items():
+                product = existing.get(barcode)
+                if product is None:
+                    missing = [name for name in ('name', 'price', 'brand', 'category') if data[name] is None]
+                    if missing:
+                        self.errors.append((line_no, f"sản phẩm mới thiếu {', '.join(missing)}"))
+                        continue
+                    product = Product(
+                        barcode=barcode,
+                        name=data['name'],
+                        description=data['description'] or '',
+                        price=data['price'],
+                        stock=(data['stock'] or 0) + data['quantity'],
+                        sold=data['sold'] or 0,
+                        brand_id=self.resolve(self.brands, Brand, data['brand']),
+                        category_id=self.resolve(self.categories, Category, data['category']),
+                        capacity=data['capacity'],
+                        origin=data['origin'],
+                        ingredients=data['ingredients'],
+                        skin_type=data['skin_type'],
+                    )
+                    if data['image']:
+                        self.set_image(product, data['image'])
+                    to_create.append(product)
+                else:
+                    # Chỉ ghi các trường thực sự thay đổi; tồn kho cộng dồn bằng F() theo nhóm số lượng
+                    changed = {field for field in UPDATABLE_FIELDS if data[field] is not None and getattr(product, field) != data[field]}
+                    for field in changed:
+                        setattr(product, field, data[field])
+                    for field, mapping, model in (('brand', self.brands, Brand), ('category', self.categories, Category)):
+                        if data[field]:
+                            related_id = self.resolve(mapping, model, data[field])
+                            if getattr(product, f'{field}_id') != related_id:
+                                setattr(product, f'{field}_id', related_id)
+                                changed.add(field)
+                    if data['image'] and getattr(product.image, 'public_id', None) != data['image']:
+                        self.set_image(product, data['image'])
+                        changed |= {'image', 'image_urls'}
+                    if changed:
+                        to_update.append(product)
+                        update_fields |= changed
+                        self.updated += 1
+                    if data['quantity']:
+                        stock_increments[data['quantity']].append(product.pk)
+                if data['quantity']:
+                    receipts.append((barcode, data['quantity'], data['import_price'] or data['price'] or product.price))
+
+            Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+            if to_update:
+                Product.objects.bulk_update(to_update, sorted(update_fields), batch_size=BULK_UPDATE_BATCH_SIZE)
+            for quantity, product_ids in stock_increments.items():
+                Product.objects.filter(pk__in=product_ids).update(stock=F('stock') + quantity)
+            # bulk_create trên MySQL không trả về id, đọc lại id theo barcode
+            ids = dict(Product.objects.filter(barcode__in=list(batch)).values_list('barcode', 'id'))
+            ImportTransaction.objects.bulk_create(
+                [ImportTransaction(product_id=ids[barcode], quantity=quantity, price=price) for barcode, quantity, price in receipts],
+                batch_size=self.batch_size,
+            )
+            movements = StockHistory.objects.bulk_create(
+                [StockHistory(product_id=ids[barcode], user=self.user, change=quantity, note='Nhập hàng loạt từ file')
+                 for barcode, quantity, _ in receipts],
+                batch_size=self.batch_size,
+            )
+            # bulk_create không phát post_save, cộng số nhập kho vào bảng tổng hợp trực tiếp
+            apply_stock_movements(movements)
+            changed_ids = [ids[product.barcode] for product in to_create] + [product.pk for product in to_update]
+            reindex_products(Product.objects.filter(pk__in=changed_ids).select_related('brand', 'category'))
+        self.created += len(to_create)
+        if self.verbosity > 1:
+            self.stdout.write(f'Đã xử lý {self.rows} dòng...')
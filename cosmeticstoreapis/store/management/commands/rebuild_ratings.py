@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from store.models import Product, Review
+from store.ratings import REBUILD_CHUNK_SIZE, rebuild_rating_aggregates
+from store.caching import bump_catalog_version
+
+class Command(BaseCommand):
+    help = 'Recompute stored review count, average rating and star histogram of every product from the reviews table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            total = rebuild_rating_aggregates(Product, Review, chunk_size=max(options['chunk_size'], 1))
+        bump_catalog_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Đã tính lại số liệu đánh giá cho {total} sản phẩm trong {elapsed:.1f}s.'))
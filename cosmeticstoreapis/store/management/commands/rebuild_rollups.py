@@ -0,0 +1,39 @@
+import time
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from store.rollups import ROLLUP_CHUNK_DAYS, rebuild_rollups
+
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Ngày không hợp lệ: {value} (định dạng YYYY-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the daily sales rollup tables (DailySales, DailyProductSales) from orders and stock history, '
+        'processing the history in chunks of days, each in its own transaction'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=parse_day, help='Ngày bắt đầu (mặc định: ngày có dữ liệu sớm nhất)')
+        parser.add_argument('--to', dest='end', type=parse_day, help='Ngày kết thúc (mặc định: hôm nay theo giờ cửa hàng)')
+        parser.add_argument('--chunk-days', type=int, default=ROLLUP_CHUNK_DAYS)
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError('--from phải trước hoặc bằng --to.')
+        started = time.monotonic()
+        verbosity = options['verbosity']
+
+        def report(first, last):
+            if verbosity > 1:
+                self.stdout.write(f'  đã dựng {first} → {last}')
+
+        days = rebuild_rollups(
+            options['start'], options['end'], chunk_days=max(options['chunk_days'], 1), on_chunk=report,
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Đã dựng lại bảng tổng hợp cho {days} ngày trong {elapsed:.1f}s.'))
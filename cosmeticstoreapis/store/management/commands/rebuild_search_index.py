@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from store.models import Product
+from store.search import reindex_products
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index (normalized tokens for name, brand, category, ingredients, skin type)'
+
+    def handle(self, *args, **kwargs):
+        products = Product.objects.select_related('brand', 'category').order_by('id').iterator(chunk_size=1000)
+        reindex_products(products)
+        self.stdout.write(self.style.SUCCESS(f'Đã đánh chỉ mục lại {Product.objects.count()} sản phẩm.'))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from store.reservations import SWEEP_BATCH_SIZE, release_expired_reservations
+
+class Command(BaseCommand):
+    help = 'Return stock held by expired checkout reservations (run from cron, or with --loop as a background sweeper)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Chạy liên tục, quét lại sau mỗi --interval giây')
+        parser.add_argument('--interval', type=int, default=60)
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        while True:
+            released = release_expired_reservations(batch_size=batch_size)
+            if released or options['verbosity'] > 1:
+                self.stdout.write(f'Đã trả kho cho {released} giữ hàng hết hạn.')
+            if not options['loop']:
+                return
+            time.sleep(max(options['interval'], 1))
@@ -0,0 +1,91 @@
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+from django.utils import timezone
+from store.jobs import VISIBILITY_TIMEOUT, claim_jobs, default_worker_id, queue_stats, run_job
+
+class Command(BaseCommand):
+    help = 'Process background jobs from the database queue with a pool of worker threads (optionally in several processes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Số luồng xử lý trong mỗi process')
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Số giây chờ khi hàng đợi trống')
+        parser.add_argument(
+            '--visibility-timeout', type=int, default=int(VISIBILITY_TIMEOUT.total_seconds()),
+            help='Số giây một job được giữ trước khi worker khác được nhận lại',
+        )
+        parser.add_argument('--once', action='store_true', help='Xử lý hết các job đang sẵn sàng rồi thoát')
+        parser.add_argument('--stats', action='store_true', help='In số job theo trạng thái và độ trễ hàng đợi rồi thoát')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            stats = queue_stats()
+            counts = ', '.join(f'{status}={total}' for status, total in stats['counts'].items())
+            self.stdout.write(f"{counts}; job chờ lâu nhất {stats['oldest_ready_seconds']:.1f}s")
+            return
+        self.options = options
+        self.stop = multiprocessing.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stop.set())
+        processes = max(options['processes'], 1)
+        if processes == 1:
+            self.work()
+            return
+        # Đóng kết nối DB trước khi fork để mỗi process con tự mở kết nối riêng
+        connections.close_all()
+        children = [multiprocessing.Process(target=self.work) for _ in range(processes)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+
+    def work(self):
+        worker_id = default_worker_id()
+        threads = max(self.options['threads'], 1)
+        visibility_timeout = timedelta(seconds=self.options['visibility_timeout'])
+        running = set()
+        lock = threading.Lock()
+        processed = 0
+
+        def execute(job):
+            try:
+                return run_job(job, worker_id)
+            finally:
+                with lock:
+                    running.discard(job.pk)
+                connections.close_all()
+
+        self.stdout.write(f'Worker {worker_id} bắt đầu với {threads} luồng.')
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while not self.stop.is_set():
+                close_old_connections()
+                with lock:
+                    free = threads - len(running)
+                try:
+                    jobs = claim_jobs(worker_id, free, visibility_timeout) if free > 0 else []
+                except DatabaseError as exc:
+                    # Lỗi tạm thời (deadlock, mất kết nối): mở lại kết nối và thử lại ở vòng sau
+                    self.stderr.write(f'Không nhận được job: {exc}')
+                    connections.close_all()
+                    self.stop.wait(self.options['poll_interval'])
+                    continue
+                for job in jobs:
+                    if self.options['verbosity'] > 1:
+                        latency = (timezone.now() - job.run_after).total_seconds()
+                        self.stdout.write(f'{job.kind} #{job.pk} lần {job.attempts}, chờ {latency:.2f}s')
+                    with lock:
+                        running.add(job.pk)
+                    pool.submit(execute, job)
+                processed += len(jobs)
+                if not jobs:
+                    with lock:
+                        idle = not running
+                    if self.options['once'] and idle:
+                        break
+                    self.stop.wait(self.options['poll_interval'] if free > 0 else 0.05)
+        self.stdout.write(f'Worker {worker_id} dừng sau {processed} job.')
@@ -0,0 +1,93 @@
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from store.models import Brand, Category, Product, ReservationStatus, StockReservation, User
+from store.reservations import InsufficientStock, commit_reservations, reserve_stock
+
+class Command(BaseCommand):
+    help = (
+        'Stress test stock reservation: many threads check out the same SKU at once and the command verifies '
+        'that no more units are sold than were in stock. Creates and deletes its own product and users; '
+        'run against a MySQL/PostgreSQL database (SQLite serialises writes). Refuses to run unless DEBUG is on '
+        'or --i-know is given; the same scenario runs in store.tests.ConcurrentCheckoutTests'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=200)
+        parser.add_argument('--stock', type=int, default=50)
+        parser.add_argument('--quantity', type=int, default=1, help='Số lượng mỗi lượt thanh toán')
+        parser.add_argument('--i-know', action='store_true', help='Cho phép chạy khi DEBUG tắt (ghi dữ liệu thật vào DB đang cấu hình)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['i_know']:
+            raise CommandError(
+                'Lệnh tạo và xoá sản phẩm/user trong DB đang cấu hình; chỉ chạy khi DEBUG=True hoặc thêm --i-know.'
+            )
+        threads, initial_stock, quantity = options['threads'], options['stock'], options['quantity']
+        tag = uuid.uuid4().hex[:12]
+        brand = Brand.objects.create(name=f'stress-{tag}')
+        category = Category.objects.create(name=f'stress-{tag}')
+        product = Product.objects.create(
+            name=f'stress-{tag}', price=1000, stock=initial_stock, brand=brand, category=category, barcode=f'stress-{tag}',
+        )
+        User.objects.bulk_create([User(username=f'stress-{tag}-{i}') for i in range(threads)])
+        users = list(User.objects.filter(username__startswith=f'stress-{tag}-'))
+        results = {'reserved': 0, 'rejected': 0, 'errors': []}
+        lock = threading.Lock()
+        start = threading.Barrier(len(users))
+
+        def checkout(user):
+            try:
+                start.wait()
+                try:
+                    reservations = reserve_stock(user, [(product.pk, quantity)])
+                except InsufficientStock:
+                    outcome = 'rejected'
+                else:
+                    session_id = f'stress-{tag}-{user.pk}'
+                    StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(checkout_session_id=session_id)
+                    commit_reservations(session_id, [(product.pk, quantity)])
+                    outcome = 'reserved'
+                with lock:
+                    results[outcome] += 1
+            except Exception as exc:
+                with lock:
+                    results['errors'].append(repr(exc))
+            finally:
+                connection.close()
+
+        started = time.monotonic()
+        workers = [threading.Thread(target=checkout, args=(user,)) for user in users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+
+        product.refresh_from_db()
+        # Lượt lỗi giữa lúc giữ hàng và xác nhận để lại giữ hàng active, phần này vẫn được tính vào tồn kho đã trừ
+        held = StockReservation.objects.filter(product=product, status=ReservationStatus.ACTIVE).aggregate(total=Sum('quantity'))['total'] or 0
+        expected_sold = min(threads, initial_stock // quantity) * quantity
+        try:
+            self.stdout.write(
+                f"{threads} lượt thanh toán trong {elapsed:.2f}s: {results['reserved']} thành công, "
+                f"{results['rejected']} hết hàng, {len(results['errors'])} lỗi; tồn kho {product.stock}, đang giữ {held}, đã bán {product.sold}."
+            )
+            for error in results['errors'][:5]:
+                self.stderr.write(error)
+            if product.sold + held + product.stock != initial_stock or product.sold != results['reserved'] * quantity:
+                raise CommandError('Sai lệch tồn kho: đã bán + đang giữ + tồn kho không khớp số ban đầu.')
+            if product.sold > initial_stock:
+                raise CommandError('Bán vượt tồn kho!')
+            if not results['errors'] and product.sold != expected_sold:
+                raise CommandError(f'Kỳ vọng bán {expected_sold}, thực tế {product.sold}.')
+            self.stdout.write(self.style.SUCCESS('Không bán vượt tồn kho.'))
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            product.delete()
+            brand.delete()
+            category.delete()
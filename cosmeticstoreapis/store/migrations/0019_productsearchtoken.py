@@ -0,0 +1,104 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:14
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+from unidecode import unidecode
+
+# Bản sao cố định của cách đánh chỉ mục lúc tạo migration (store/search.py có thể thay đổi về sau)
+SEARCH_FIELD_WEIGHTS = (
+    ("name", 8),
+    ("barcode", 8),
+    ("brand", 4),
+    ("category", 4),
+    ("skin_type", 2),
+    ("ingredients", 1),
+)
+MAX_TOKEN_LENGTH = 64
+BATCH_SIZE = 1000
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    if not text:
+        return []
+    folded = unidecode(str(text)).lower()
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall(folded)]
+
+
+def product_tokens(product):
+    values = {
+        "name": product.name,
+        "barcode": product.barcode,
+        "brand": product.brand.name if product.brand_id else "",
+        "category": product.category.name if product.category_id else "",
+        "skin_type": product.skin_type,
+        "ingredients": product.ingredients,
+    }
+    tokens = {}
+    for field, weight in SEARCH_FIELD_WEIGHTS:
+        for token in set(tokenize(values[field])):
+            tokens[token] = tokens.get(token, 0) + weight
+    return tokens
+
+
+def build_search_index(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    ProductSearchToken = apps.get_model("store", "ProductSearchToken")
+    batch = []
+    products = Product.objects.select_related("brand", "category").iterator(
+        chunk_size=BATCH_SIZE
+    )
+    for product in products:
+        batch.extend(
+            ProductSearchToken(product_id=product.pk, token=token, weight=weight)
+            for token, weight in product_tokens(product).items()
+        )
+        if len(batch) >= BATCH_SIZE:
+            ProductSearchToken.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            batch = []
+    ProductSearchToken.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0018_stockhistory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=64)),
+                ("weight", models.PositiveSmallIntegerField(default=1)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="store.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["token", "product"], name="store_search_token_idx"
+                    )
+                ],
+                "unique_together": {("product", "token")},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
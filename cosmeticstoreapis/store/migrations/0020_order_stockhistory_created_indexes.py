@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0019_productsearchtoken"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["created_at", "id"], name="store_order_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockhistory",
+            index=models.Index(
+                fields=["created_at", "id"], name="store_stockhist_created_idx"
+            ),
+        ),
+    ]
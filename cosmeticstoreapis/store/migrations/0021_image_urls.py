@@ -0,0 +1,81 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:25
+
+from cloudinary import CloudinaryResource
+from django.db import migrations, models
+
+# Bản sao cố định của các biến thể ảnh lúc tạo migration (store/images.py có thể thay đổi về sau)
+IMAGE_VARIANTS = {
+    "thumbnail": {"width": 150, "height": 150, "crop": "fill"},
+    "card": {"width": 400, "height": 400, "crop": "fill"},
+    "full": {"width": 1200, "crop": "limit"},
+}
+
+
+def build_image_urls(image):
+    if not image or not isinstance(image, CloudinaryResource) or not image.public_id:
+        return {}
+    return {
+        name: image.build_url(
+            secure=True, fetch_format="auto", quality="auto", **options
+        )
+        for name, options in IMAGE_VARIANTS.items()
+    }
+
+
+def backfill_image_urls(apps, schema_editor):
+    for model_name in ("Category", "Product", "ProductImage"):
+        model = apps.get_model("store", model_name)
+        batch = []
+        for instance in (
+            model.objects.exclude(image__isnull=True)
+            .exclude(image="")
+            .iterator(chunk_size=1000)
+        ):
+            instance.image_urls = build_image_urls(instance.image)
+            batch.append(instance)
+            if len(batch) >= 500:
+                model.objects.bulk_update(batch, ["image_urls"])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ["image_urls"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0020_order_stockhistory_created_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="image_urls",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="URL ảnh theo biến thể (thumbnail, card, full)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_urls",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="URL ảnh theo biến thể (thumbnail, card, full)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="productimage",
+            name="image_urls",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="URL ảnh theo biến thể (thumbnail, card, full)",
+            ),
+        ),
+        migrations.RunPython(backfill_image_urls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:29
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+STARS = (1, 2, 3, 4, 5)
+CHUNK_SIZE = 1000
+
+
+# Cùng quy tắc làm tròn sao với store/ratings.py lúc tạo migration: .5 làm tròn lên
+def star_condition(star):
+    condition = Q()
+    if star > 1:
+        condition &= Q(rating__gte=star - 0.5)
+    if star < 5:
+        condition &= Q(rating__lt=star + 0.5)
+    return condition
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    Review = apps.get_model("store", "Review")
+    fields = ["review_count", "rating_sum", "rating_avg"] + [
+        f"rating_{star}" for star in STARS
+    ]
+    last_id = 0
+    while True:
+        products = list(
+            Product.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .only("pk")[:CHUNK_SIZE]
+        )
+        if not products:
+            return
+        last_id = products[-1].pk
+        stats = {
+            row["product_id"]: row
+            for row in Review.objects.filter(product_id__in=[p.pk for p in products])
+            .values("product_id")
+            .annotate(
+                count=Count("id"),
+                total=Sum("rating"),
+                **{
+                    f"star_{star}": Count("id", filter=star_condition(star))
+                    for star in STARS
+                },
+            )
+        }
+        for product in products:
+            row = stats.get(product.pk)
+            product.review_count = row["count"] if row else 0
+            product.rating_sum = float(row["total"]) if row else 0.0
+            product.rating_avg = (
+                product.rating_sum / product.review_count
+                if product.review_count
+                else 0.0
+            )
+            for star in STARS:
+                setattr(product, f"rating_{star}", row[f"star_{star}"] if row else 0)
+        Product.objects.bulk_update(products, fields, batch_size=CHUNK_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0021_image_urls"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_1",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_2",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_3",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_4",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_5",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_avg",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["rating_avg", "id"], name="store_product_rating_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0022_product_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="servicefee",
+            name="free_shipping_threshold",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=500000,
+                help_text="Đơn trên mức này được miễn phí vận chuyển",
+                max_digits=12,
+            ),
+        ),
+        migrations.AddField(
+            model_name="servicefee",
+            name="inner_city_shipping_fee",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=30000,
+                help_text="Phí vận chuyển nội thành",
+                max_digits=12,
+            ),
+        ),
+        migrations.AddField(
+            model_name="servicefee",
+            name="outer_city_shipping_fee",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=50000,
+                help_text="Phí vận chuyển ngoại thành",
+                max_digits=12,
+            ),
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Các tên thành phố trước đây được is_inner_city() coi là nội thành
+INNER_CITY_AREAS = (
+    "Hà Nội",
+    "HN",
+    "Hồ Chí Minh",
+    "TP HCM",
+    "HCM",
+    "Sài Gòn",
+    "Đà Nẵng",
+)
+
+
+def seed_inner_city_zone(apps, schema_editor):
+    ServiceFee = apps.get_model("store", "ServiceFee")
+    ShippingZone = apps.get_model("store", "ShippingZone")
+    ShippingZoneArea = apps.get_model("store", "ShippingZoneArea")
+    config = ServiceFee.objects.order_by("-updated_at").first()
+    fee = config.inner_city_shipping_fee if config else 30000
+    zone = ShippingZone.objects.create(name="Nội thành", fee=fee)
+    ShippingZoneArea.objects.bulk_create(
+        [
+            ShippingZoneArea(zone=zone, name=name, level="city")
+            for name in INNER_CITY_AREAS
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0023_servicefee_shipping_config"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShippingZone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "fee",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Phí vận chuyển của vùng",
+                        max_digits=12,
+                    ),
+                ),
+                (
+                    "priority",
+                    models.PositiveSmallIntegerField(
+                        default=0,
+                        help_text="Địa chỉ khớp nhiều vùng thì lấy vùng có priority cao hơn",
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ShippingZoneArea",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Tên tỉnh/thành hoặc quận/huyện, viết có dấu hay không dấu đều được",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "level",
+                    models.CharField(
+                        choices=[("city", "City"), ("district", "District")],
+                        default="city",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "zone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="areas",
+                        to="store.shippingzone",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(seed_inner_city_zone, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="servicefee",
+            name="inner_city_shipping_fee",
+        ),
+        migrations.RenameField(
+            model_name="servicefee",
+            old_name="outer_city_shipping_fee",
+            new_name="default_shipping_fee",
+        ),
+        migrations.AlterField(
+            model_name="servicefee",
+            name="default_shipping_fee",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=50000,
+                help_text="Phí vận chuyển cho địa chỉ không thuộc vùng giao hàng nào",
+                max_digits=12,
+            ),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0025_stock_reservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        help_text="Tên handler đã đăng ký trong store/tasks.py",
+                        max_length=100,
+                    ),
+                ),
+                ("payload", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "dedupe_key",
+                    models.CharField(
+                        blank=True,
+                        help_text="Khoá chống xếp hàng trùng, vd. id sự kiện Stripe",
+                        max_length=255,
+                        null=True,
+                        unique=True,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("max_attempts", models.PositiveSmallIntegerField(default=5)),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Chưa được chạy trước thời điểm này (dùng cho backoff)",
+                    ),
+                ),
+                ("locked_by", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "locked_until",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Hết thời điểm này mà chưa xong thì worker khác được nhận lại",
+                        null=True,
+                    ),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"], name="store_job_ready_idx"
+                    ),
+                    models.Index(
+                        fields=["status", "locked_until"], name="store_job_lease_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0026_job_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CheckoutQuote",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "checkout_session_id",
+                    models.CharField(
+                        blank=True, max_length=255, null=True, unique=True
+                    ),
+                ),
+                (
+                    "lines",
+                    models.JSONField(
+                        default=list,
+                        help_text="Danh sách {product_id, name, unit_price, quantity, line_total}; số tiền lưu dạng chuỗi Decimal",
+                    ),
+                ),
+                ("subtotal", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "shipping_fee",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "service_fee",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "discount_percent",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=5),
+                ),
+                (
+                    "discount_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("total", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("address", models.TextField(blank=True, null=True)),
+                (
+                    "receiver_phone",
+                    models.CharField(blank=True, max_length=20, null=True),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("expires_at", models.DateTimeField()),
+                (
+                    "discount_code",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="checkout_quotes",
+                        to="store.discountcode",
+                    ),
+                ),
+                (
+                    "order",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="checkout_quote",
+                        to="store.order",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkout_quotes",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
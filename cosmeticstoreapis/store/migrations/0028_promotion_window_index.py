@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0027_checkout_quote"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="promotion",
+            index=models.Index(
+                fields=["is_active", "valid_from", "valid_to"],
+                name="store_promotion_window_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+# Cùng quy tắc với normalize_discount_code lúc tạo migration: bỏ khoảng trắng hai đầu, viết hoa
+def normalize_discount_code(code):
+    return (code or "").strip().upper()
+
+
+def backfill_code_normalized(apps, schema_editor):
+    DiscountCode = apps.get_model("store", "DiscountCode")
+    codes = list(DiscountCode.objects.only("id", "code"))
+    for discount in codes:
+        discount.code_normalized = normalize_discount_code(discount.code)
+    DiscountCode.objects.bulk_update(codes, ["code_normalized"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0028_promotion_window_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="discountcode",
+            name="code_normalized",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="Mã đã chuẩn hoá (viết hoa, bỏ khoảng trắng) để tra theo index",
+                max_length=50,
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_code_normalized, migrations.RunPython.noop),
+    ]
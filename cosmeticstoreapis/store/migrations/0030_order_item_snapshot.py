@@ -0,0 +1,76 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:52
+
+from django.db import migrations, models
+
+# Biến thể ảnh dùng cho dòng đơn lúc tạo migration (store.models.ORDER_ITEM_IMAGE_VARIANT)
+ORDER_ITEM_IMAGE_VARIANT = "thumbnail"
+
+
+# Dòng đơn cũ chụp lại từ sản phẩm hiện tại (giá trị tốt nhất còn có)
+def backfill_order_item_snapshots(apps, schema_editor):
+    OrderItem = apps.get_model("store", "OrderItem")
+    batch = []
+    rows = OrderItem.objects.filter(product_name="").values_list(
+        "id", "product__name", "product__image_urls", "product__barcode"
+    )
+    for pk, name, image_urls, barcode in rows.iterator(chunk_size=2000):
+        batch.append(
+            OrderItem(
+                pk=pk,
+                product_name=name or "",
+                product_image=(image_urls or {}).get(ORDER_ITEM_IMAGE_VARIANT, ""),
+                product_barcode=barcode,
+            )
+        )
+        if len(batch) >= 2000:
+            OrderItem.objects.bulk_update(
+                batch, ["product_name", "product_image", "product_barcode"]
+            )
+            batch = []
+    if batch:
+        OrderItem.objects.bulk_update(
+            batch, ["product_name", "product_image", "product_barcode"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0029_discount_code_normalized"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitem",
+            name="product_barcode",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="product_image",
+            field=models.CharField(blank=True, default="", max_length=500),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="product_name",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AlterField(
+            model_name="checkoutquote",
+            name="lines",
+            field=models.JSONField(
+                default=list,
+                help_text="Danh sách {product_id, name, unit_price, quantity, line_total, snapshot}; số tiền lưu dạng chuỗi Decimal",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="price",
+            field=models.DecimalField(
+                decimal_places=2,
+                help_text="Đơn giá tại thời điểm đặt hàng",
+                max_digits=12,
+            ),
+        ),
+        migrations.RunPython(backfill_order_item_snapshots, migrations.RunPython.noop),
+    ]
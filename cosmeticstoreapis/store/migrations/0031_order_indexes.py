@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0030_order_item_snapshot"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="receiver_phone",
+            field=models.CharField(blank=True, db_index=True, max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "created_at"], name="store_order_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "created_at"], name="store_order_user_idx"
+            ),
+        ),
+    ]
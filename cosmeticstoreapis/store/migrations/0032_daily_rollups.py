@@ -0,0 +1,179 @@
+# Generated by Django 5.2.5 on 2026-10-17 13:02
+
+from collections import defaultdict
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Trạng thái đơn được tính vào doanh thu lúc tạo migration (store.reporting.REVENUE_STATUSES)
+REVENUE_STATUSES = ("paid", "shipped", "completed")
+BATCH_SIZE = 2000
+
+
+def empty_totals():
+    return {
+        "revenue": Decimal("0"),
+        "order_count": 0,
+        "units_sold": 0,
+        "imports": 0,
+        "exports": 0,
+    }
+
+
+# Dựng bảng tổng hợp từ toàn bộ đơn hàng và lịch sử kho hiện có, gom theo ngày giờ cửa hàng
+def backfill_daily_rollups(apps, schema_editor):
+    Order = apps.get_model("store", "Order")
+    OrderItem = apps.get_model("store", "OrderItem")
+    StockHistory = apps.get_model("store", "StockHistory")
+    DailySales = apps.get_model("store", "DailySales")
+    DailyProductSales = apps.get_model("store", "DailyProductSales")
+    tz = ZoneInfo(getattr(settings, "STORE_TIME_ZONE", settings.TIME_ZONE))
+
+    def local_day(value):
+        return timezone.localtime(value, tz).date()
+
+    days = defaultdict(empty_totals)
+    products = defaultdict(empty_totals)
+    orders = Order.objects.filter(status__in=REVENUE_STATUSES).values_list(
+        "created_at", "total_price"
+    )
+    for created_at, total_price in orders.iterator(chunk_size=BATCH_SIZE):
+        totals = days[local_day(created_at)]
+        totals["revenue"] += total_price
+        totals["order_count"] += 1
+    items = (
+        OrderItem.objects.filter(order__status__in=REVENUE_STATUSES)
+        .order_by("order_id")
+        .values_list("order_id", "order__created_at", "product_id", "quantity", "price")
+    )
+    # Dòng đơn theo thứ tự đơn: mỗi sản phẩm chỉ đếm một đơn dù đơn có nhiều dòng cùng sản phẩm
+    current_order, seen = None, set()
+    for order_id, created_at, product_id, quantity, price in items.iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        if order_id != current_order:
+            current_order, seen = order_id, set()
+        day = local_day(created_at)
+        days[day]["units_sold"] += quantity
+        totals = products[(day, product_id)]
+        totals["revenue"] += price * quantity
+        totals["units_sold"] += quantity
+        if product_id not in seen:
+            seen.add(product_id)
+            totals["order_count"] += 1
+    movements = StockHistory.objects.values_list("created_at", "product_id", "change")
+    for created_at, product_id, change in movements.iterator(chunk_size=BATCH_SIZE):
+        if not change:
+            continue
+        field, amount = ("imports", change) if change > 0 else ("exports", -change)
+        day = local_day(created_at)
+        days[day][field] += amount
+        products[(day, product_id)][field] += amount
+
+    DailySales.objects.bulk_create(
+        [DailySales(day=day, **totals) for day, totals in days.items()],
+        batch_size=BATCH_SIZE,
+    )
+    DailyProductSales.objects.bulk_create(
+        [
+            DailyProductSales(day=day, product_id=product_id, **totals)
+            for (day, product_id), totals in products.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    Order.objects.filter(status__in=REVENUE_STATUSES).update(in_rollup=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0031_order_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("order_count", models.IntegerField(default=0)),
+                ("units_sold", models.IntegerField(default=0)),
+                ("imports", models.IntegerField(default=0)),
+                ("exports", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="in_rollup",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Đơn đang được tính trong bảng tổng hợp doanh thu theo ngày (store/rollups.py)",
+            ),
+        ),
+        migrations.CreateModel(
+            name="DailyProductSales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Tổng tiền các dòng đơn (trước phí và giảm giá)",
+                        max_digits=16,
+                    ),
+                ),
+                ("order_count", models.IntegerField(default=0)),
+                ("units_sold", models.IntegerField(default=0)),
+                ("imports", models.IntegerField(default=0)),
+                ("exports", models.IntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="store.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["product", "day"], name="store_daily_product_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "product"), name="store_daily_product_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_daily_rollups, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
-import re
 from cloudinary.models import CloudinaryField
 from decimal import Decimal
 
@@ -40,6 +39,24 @@ class OrderType(models.TextChoices):
     PICKUP = "pickup", "Pickup"
 
 
+class ReservationStatus(models.TextChoices):
+    ACTIVE = "active", "Active"
+    COMMITTED = "committed", "Committed"
+    RELEASED = "released", "Released"
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+
+
+class AreaLevel(models.TextChoices):
+    CITY = "city", "City"
+    DISTRICT = "district", "District"
+
+
 # ==========================
 # USER & USER ADDRESS
 # ==========================
@@ -87,11 +104,36 @@ class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     image = CloudinaryField('image', blank=True, null=True)
+    image_urls = models.JSONField(default=dict, blank=True, editable=False, help_text="URL ảnh theo biến thể (thumbnail, card, full)")
 
     def __str__(self):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    # Đường đọc sản phẩm: nạp sẵn brand, category, ảnh và khuyến mãi đang chạy
+    # trong một số truy vấn cố định, không phụ thuộc số sản phẩm trên trang.
+    # fields là tập trường serializer sẽ xuất; trường nào không xuất thì bỏ qua truy vấn tương ứng
+    def for_read(self, fields=None):
+        def wanted(name):
+            return fields is None or name in fields
+
+        queryset = self.select_related('brand', 'category')
+        if wanted('images'):
+            queryset = queryset.prefetch_related('images')
+        if wanted('promotion_names'):
+            now = timezone.now()
+            active_promotions = Promotion.objects.filter(is_active=True, valid_from__lte=now, valid_to__gte=now)
+            queryset = queryset.prefetch_related(
+                models.Prefetch('promotions', queryset=active_promotions, to_attr='active_promotions')
+            )
+        return queryset
+
+
+# Cột số liệu đánh giá: chỉ cập nhật bằng F() trong store/ratings.py hoặc khi được chỉ định rõ trong update_fields
+RATING_AGGREGATE_FIELDS = ('review_count', 'rating_sum', 'rating_avg', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
+
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -100,6 +142,7 @@ class Product(models.Model):
     sold = models.PositiveIntegerField(default=0)
     barcode = models.CharField(max_length=100, unique=True, blank=True, null=True)
     image = CloudinaryField('image', blank=True, null=True)
+    image_urls = models.JSONField(default=dict, blank=True, editable=False, help_text="URL ảnh theo biến thể (thumbnail, card, full)")
     capacity = models.CharField(max_length=50, blank=True, null=True)
     origin = models.CharField(max_length=100, blank=True, null=True)
     ingredients = models.TextField(blank=True, null=True)
@@ -108,15 +151,59 @@ class Product(models.Model):
     brand = models.ForeignKey(Brand, on_delete=models.CASCADE, related_name="products")
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="products")
 
+    # Số liệu đánh giá lưu sẵn, cập nhật cùng giao dịch khi thêm/sửa/xoá review (xem store/ratings.py)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.FloatField(default=0, editable=False)
+    rating_avg = models.FloatField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rating_avg', 'id'], name='store_product_rating_idx'),
+        ]
+
+    @property
+    def rating_histogram(self):
+        return {str(star): getattr(self, f'rating_{star}') for star in range(1, 6)}
+
+    # save() thông thường (admin, API sửa sản phẩm, cập nhật kho...) không ghi lại số liệu đánh giá từ instance
+    # đã nạp trước đó, tránh mất review được thêm giữa lúc nạp và lúc lưu
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not kwargs.get('force_insert') and not self._state.adding and self.pk is not None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in RATING_AGGREGATE_FIELDS and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="images")
     image = CloudinaryField('image', blank=True, null=True)
+    image_urls = models.JSONField(default=dict, blank=True, editable=False, help_text="URL ảnh theo biến thể (thumbnail, card, full)")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
 
+# Chỉ mục đảo cho tìm kiếm sản phẩm: mỗi dòng là một token đã bỏ dấu của sản phẩm kèm trọng số
+class ProductSearchToken(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="search_tokens")
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('product', 'token')
+        indexes = [models.Index(fields=['token', 'product'], name='store_search_token_idx')]
+
+
 class ImportTransaction(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="imports")
     quantity = models.PositiveIntegerField()
@@ -142,6 +229,17 @@ class FavoriteProduct(models.Model):
 # ==========================
 # CART & ORDER
 # ==========================
+class CartQuerySet(models.QuerySet):
+    # Nạp giỏ hàng cùng user, mã giảm giá và các dòng sản phẩm theo đường đọc sản phẩm
+    def for_read(self):
+        items = CartItem.objects.order_by('id').prefetch_related(
+            models.Prefetch('product', queryset=Product.objects.for_read())
+        )
+        return self.select_related('user', 'discount_code').prefetch_related(
+            models.Prefetch('items', queryset=items)
+        )
+
+
 class Cart(models.Model):
     discount_code = models.ForeignKey('DiscountCode', on_delete=models.SET_NULL, null=True, blank=True, related_name='carts')
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="cart")
@@ -150,6 +248,8 @@ class Cart(models.Model):
     shipping_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     service_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
+    objects = CartQuerySet.as_manager()
+
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="items")
@@ -157,6 +257,16 @@ class CartItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
 
 
+class OrderQuerySet(models.QuerySet):
+    # Đường đọc đơn hàng: đơn (cùng user, mã giảm giá), các dòng và thanh toán trong ba truy vấn,
+    # dòng đơn dùng snapshot nên không cần nạp sản phẩm
+    def for_read(self):
+        return self.select_related('user', 'discount_code').prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.order_by('id')),
+            models.Prefetch('payments', queryset=PaymentTransaction.objects.only('id', 'order_id').order_by('id')),
+        )
+
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     discount_code = models.ForeignKey("DiscountCode", on_delete=models.SET_NULL, null=True, blank=True, related_name="orders")
@@ -165,15 +275,61 @@ class Order(models.Model):
     order_type = models.CharField(max_length=20, choices=OrderType.choices, default=OrderType.DELIVERY)
     created_at = models.DateTimeField(auto_now_add=True)
     address = models.TextField(blank=True, null=True)
-    receiver_phone = models.CharField(max_length=20, blank=True, null=True)
+    receiver_phone = models.CharField(max_length=20, blank=True, null=True, db_index=True)
     shipping_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    in_rollup = models.BooleanField(default=False, editable=False, help_text="Đơn đang được tính trong bảng tổng hợp doanh thu theo ngày (store/rollups.py)")
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='store_order_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='store_order_status_idx'),
+            models.Index(fields=['user', 'created_at'], name='store_order_user_idx'),
+        ]
+
+    # in_rollup chỉ do store/rollups.py ghi; save() thông thường không ghi lại giá trị từ instance đã nạp trước đó
+    # (job đồng bộ có thể đã đổi nó sau khi nạp), như số liệu đánh giá của Product
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not kwargs.get('force_insert') and not self._state.adding and self.pk is not None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'in_rollup' and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+# Biến thể ảnh chụp lại trên dòng đơn hàng (store/images.py)
+ORDER_ITEM_IMAGE_VARIANT = 'thumbnail'
 
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
-    price = models.DecimalField(max_digits=12, decimal_places=2)
+    price = models.DecimalField(max_digits=12, decimal_places=2, help_text="Đơn giá tại thời điểm đặt hàng")
+    # Thông tin sản phẩm chụp lại lúc đặt hàng, không đổi khi sản phẩm được sửa sau đó
+    product_name = models.CharField(max_length=200, blank=True, default='')
+    product_image = models.CharField(max_length=500, blank=True, default='')
+    product_barcode = models.CharField(max_length=100, blank=True, null=True)
+
+    # Các trường snapshot lấy từ sản phẩm hiện tại
+    @staticmethod
+    def snapshot(product):
+        from .images import image_url
+        return {
+            'product_name': product.name,
+            'product_image': image_url(product, variant=ORDER_ITEM_IMAGE_VARIANT),
+            'product_barcode': product.barcode,
+        }
+
+    # Dòng tạo lẻ (admin, seed) chưa có snapshot thì chụp từ sản phẩm; tạo đơn hàng loạt tự điền sẵn
+    def save(self, *args, **kwargs):
+        if not self.product_name and self.product_id:
+            for field, value in self.snapshot(self.product).items():
+                setattr(self, field, value)
+        super().save(*args, **kwargs)
 
 
 # ==========================
@@ -194,12 +350,26 @@ class Review(models.Model):
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Lưu review và cập nhật số liệu đánh giá của sản phẩm trong cùng một giao dịch.
+    # Việc trừ khi xoá nằm ở signal post_delete để áp dụng cả khi xoá hàng loạt/cascade
+    def save(self, *args, **kwargs):
+        from .ratings import apply_review_delta
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Review.objects.select_for_update().filter(pk=self.pk).values('product_id', 'rating').first()
+            super().save(*args, **kwargs)
+            if previous:
+                apply_review_delta(Product, previous['product_id'], previous['rating'], -1)
+            apply_review_delta(Product, self.product_id, self.rating, 1)
+
 
 # ==========================
 # DISCOUNT & PROMOTION
 # ==========================
 class DiscountCode(models.Model):
     code = models.CharField(max_length=50, unique=True)
+    code_normalized = models.CharField(max_length=50, db_index=True, editable=False, help_text="Mã đã chuẩn hoá (viết hoa, bỏ khoảng trắng) để tra theo index")
     discount_percentage = models.DecimalField(max_digits=5, decimal_places=2)
     valid_from = models.DateTimeField()
     valid_to = models.DateTimeField()
@@ -213,6 +383,14 @@ class DiscountCode(models.Model):
             return self.is_active
         return False
 
+    def save(self, *args, **kwargs):
+        from .discounts import normalize_discount_code
+        self.code_normalized = normalize_discount_code(self.code)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'code' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'code_normalized'}
+        super().save(*args, **kwargs)
+
 class Promotion(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -222,6 +400,9 @@ class Promotion(models.Model):
     valid_to = models.DateTimeField()
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['is_active', 'valid_from', 'valid_to'], name='store_promotion_window_idx')]
+
 
 # ==========================
 # USER VOUCHER
@@ -288,12 +469,36 @@ class ChatMessage(models.Model):
 # ==========================
 class ServiceFee(models.Model):
     percent = models.FloatField(default=2.0, help_text="Phần trăm phí dịch vụ")
+    free_shipping_threshold = models.DecimalField(max_digits=12, decimal_places=2, default=500000, help_text="Đơn trên mức này được miễn phí vận chuyển")
+    default_shipping_fee = models.DecimalField(max_digits=12, decimal_places=2, default=50000, help_text="Phí vận chuyển cho địa chỉ không thuộc vùng giao hàng nào")
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Service Fee: {self.percent}%"
     
 
+# ==========================
+# SHIPPING ZONE
+# ==========================
+class ShippingZone(models.Model):
+    name = models.CharField(max_length=100)
+    fee = models.DecimalField(max_digits=12, decimal_places=2, help_text="Phí vận chuyển của vùng")
+    priority = models.PositiveSmallIntegerField(default=0, help_text="Địa chỉ khớp nhiều vùng thì lấy vùng có priority cao hơn")
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.fee})"
+
+
+class ShippingZoneArea(models.Model):
+    zone = models.ForeignKey(ShippingZone, on_delete=models.CASCADE, related_name='areas')
+    name = models.CharField(max_length=100, help_text="Tên tỉnh/thành hoặc quận/huyện, viết có dấu hay không dấu đều được")
+    level = models.CharField(max_length=20, choices=AreaLevel.choices, default=AreaLevel.CITY)
+
+    def __str__(self):
+        return f"{self.name} → {self.zone.name}"
+
+
 # ==========================
 # STOCK HISTORY
 # ==========================
@@ -304,33 +509,131 @@ class StockHistory(models.Model):
     note = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'], name='store_stockhist_created_idx')]
+
     def __str__(self):
         return f"{self.product.name}: {self.change} ({self.created_at:%Y-%m-%d %H:%M})"
 
 
+# ==========================
+# BẢNG TỔNG HỢP BÁO CÁO
+# ==========================
+# Số liệu theo ngày (múi giờ cửa hàng), cập nhật dần khi đơn đổi trạng thái và khi nhập/xuất kho (store/rollups.py).
+# Dựng lại từ dữ liệu gốc bằng manage.py rebuild_rollups
+class DailySales(models.Model):
+    day = models.DateField(unique=True)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    units_sold = models.IntegerField(default=0)
+    imports = models.IntegerField(default=0)
+    exports = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.revenue} ({self.order_count} đơn)"
+
+
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name="daily_sales")
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0, help_text="Tổng tiền các dòng đơn (trước phí và giảm giá)")
+    order_count = models.IntegerField(default=0)
+    units_sold = models.IntegerField(default=0)
+    imports = models.IntegerField(default=0)
+    exports = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'product'], name='store_daily_product_unique')]
+        indexes = [models.Index(fields=['product', 'day'], name='store_daily_product_idx')]
+
+    def __str__(self):
+        return f"{self.day} #{self.product_id}: {self.units_sold}"
+
+
+# Giữ hàng cho phiên thanh toán: tồn kho đã bị trừ khi giữ, được cộng lại nếu hết hạn/huỷ (store/reservations.py)
+class StockReservation(models.Model):
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name="stock_reservations")
+    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name="reservations")
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=ReservationStatus.choices, default=ReservationStatus.ACTIVE)
+    checkout_session_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'expires_at'], name='store_reservation_expiry_idx')]
+
+    def __str__(self):
+        return f"{self.product_id} x{self.quantity} ({self.status})"
+
+
+# Báo giá chốt khi tạo phiên thanh toán Stripe: dòng hàng với đơn giá, phí, giảm giá và tổng tiền.
+# Webhook tạo đơn đúng theo báo giá này (khách trả bao nhiêu thì đơn ghi bấy nhiêu), không tính lại từ giỏ hiện tại
+class CheckoutQuote(models.Model):
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name="checkout_quotes")
+    checkout_session_id = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    lines = models.JSONField(default=list, help_text="Danh sách {product_id, name, unit_price, quantity, line_total, snapshot}; số tiền lưu dạng chuỗi Decimal")
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+    shipping_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    service_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount_code = models.ForeignKey('DiscountCode', on_delete=models.SET_NULL, null=True, blank=True, related_name='checkout_quotes')
+    discount_percent = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    address = models.TextField(blank=True, null=True)
+    receiver_phone = models.CharField(max_length=20, blank=True, null=True)
+    order = models.OneToOneField('Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='checkout_quote')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Quote #{self.pk} {self.total} ({self.checkout_session_id})"
+
+
+# ==========================
+# BACKGROUND JOB
+# ==========================
+# Hàng đợi công việc nền lưu trong DB (store/jobs.py), xử lý bởi manage.py run_workers
+class Job(models.Model):
+    kind = models.CharField(max_length=100, help_text="Tên handler đã đăng ký trong store/tasks.py")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    dedupe_key = models.CharField(max_length=255, unique=True, blank=True, null=True, help_text="Khoá chống xếp hàng trùng, vd. id sự kiện Stripe")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Chưa được chạy trước thời điểm này (dùng cho backoff)")
+    locked_by = models.CharField(max_length=100, blank=True, null=True)
+    locked_until = models.DateTimeField(blank=True, null=True, help_text="Hết thời điểm này mà chưa xong thì worker khác được nhận lại")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='store_job_ready_idx'),
+            models.Index(fields=['status', 'locked_until'], name='store_job_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
 # ==========================
 # HÀM TIỆN ÍCH LIÊN QUAN ĐẾN CART & ĐƠN HÀNG
 # ==========================
-# Nhận diện địa chỉ nội thành
-def is_inner_city(address):
-    inner_city_patterns = [
-        r'\b(hà nội|hn|ha noi)\b',
-        r'\b(Thành phố Hồ Chí Minh|thành phố hồ chí minh|tp hcm|hcm|sài gòn|ho chi minh|ho chi minh city)\b',
-        r'\b(đà nẵng|da nang)\b'
-    ]
-    address_str = str(address).lower()
-    return any(re.search(pattern, address_str) for pattern in inner_city_patterns)
-
-# Tính phí vận chuyển dựa trên tổng tiền và khu vực giao hàng
-def calculate_shipping_fee(cart_total, is_inner_city):
-    if cart_total > 500000:
+# Tính phí vận chuyển dựa trên tổng tiền và vùng giao hàng của địa chỉ (cấu hình phí và bảng vùng đã cache)
+def calculate_shipping_fee(cart_total, address):
+    from .fees import get_fee_config
+    config = get_fee_config()
+    if cart_total > config.free_shipping_threshold:
         return 0
-    return 30000 if is_inner_city else 50000
+    return config.shipping_zones.zone_for(address).fee
 
 # Lấy phần trăm phí dịch vụ
 def get_service_fee_percent():
-    config = ServiceFee.objects.order_by('-updated_at').first()
-    return config.percent if config else 2.0
+    from .fees import get_fee_config
+    return get_fee_config().service_fee_percent
 
 
 # Tính phí dịch vụ dựa trên tổng tiền và phần trăm phí dịch vụ
@@ -343,13 +646,11 @@ def calculate_order_total(cart_total, shipping_fee, service_fee, discount_amount
     return cart_total + shipping_fee + service_fee - discount_amount
 
 # Cập nhật lại phí vận chuyển và phí dịch vụ cho Cart dựa trên địa chỉ giao hàng và tổng tiền sản phẩm.
+# Trả về kết quả tính giá (store.pricing.CartPrice), đã ghi nhớ trên cart để serializer/checkout dùng lại
 def recalculate_cart_fees(cart):
-    cart_total = sum([item.product.price * item.quantity for item in cart.items.all()])
-    inner_city_flag = False
-    if hasattr(cart, 'address') and cart.address:
-        inner_city_flag = is_inner_city(cart.address)
-    shipping_fee = calculate_shipping_fee(cart_total, inner_city_flag)
-    service_fee = calculate_service_fee(cart_total)
-    cart.shipping_fee = shipping_fee
-    cart.service_fee = service_fee
+    from .pricing import price_cart
+    price = price_cart(cart, refresh=True)
+    cart.shipping_fee = price.shipping_fee
+    cart.service_fee = price.service_fee
     cart.save(update_fields=['shipping_fee', 'service_fee'])
+    return price
@@ -0,0 +1,45 @@
+import re
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+# Ký tự thường gặp khi gõ số điện thoại/mã đơn: bỏ đi trước khi so khớp
+PHONE_SEPARATORS = re.compile(r'[\s.\-()]')
+# Chuỗi số ngắn hơn thế này chỉ coi là mã đơn
+PHONE_MIN_DIGITS = 8
+
+
+# Các dạng lưu có thể có của một số điện thoại Việt Nam: 0xxxxxxxxx, 84xxxxxxxxx, +84xxxxxxxxx
+def phone_variants(digits):
+    local = '0' + digits[2:] if digits.startswith('84') else digits
+    variants = {digits, local}
+    if local.startswith('0'):
+        variants.update({'84' + local[1:], '+84' + local[1:]})
+    return variants
+
+
+# Tìm đơn hàng cho staff, mỗi nhánh đều đi theo index thay vì quét icontains:
+# "#123" hoặc chuỗi số ngắn -> khớp đúng mã đơn (khoá chính); chuỗi số dài -> khớp đúng mã đơn hoặc
+# số điện thoại nhận hàng (index receiver_phone); còn lại -> username bắt đầu bằng chuỗi tìm (LIKE 'abc%' trên index
+# unique username với collation không phân biệt hoa thường của MySQL, sau đó index (user, created_at) của đơn)
+def search_orders(queryset, query):
+    term = query.strip()
+    if term.startswith('#'):
+        digits = PHONE_SEPARATORS.sub('', term[1:])
+        return queryset.filter(pk=int(digits)) if digits.isdigit() else queryset.none()
+    digits = PHONE_SEPARATORS.sub('', term).lstrip('+')
+    if digits.isdigit():
+        condition = Q(pk=int(digits)) if len(digits) <= 18 else Q()
+        if len(digits) >= PHONE_MIN_DIGITS:
+            condition |= Q(receiver_phone__in=phone_variants(digits))
+        return queryset.filter(condition) if condition else queryset.none()
+    return queryset.filter(user__username__istartswith=term)
+
+
+class AdminOrderSearchFilter(BaseFilterBackend):
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_orders(queryset, query)
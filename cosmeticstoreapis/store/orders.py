@@ -0,0 +1,128 @@
+import logging
+from collections import defaultdict
+from django.db import transaction
+from .models import (
+    Cart, CartItem, CheckoutQuote, Order, OrderItem, OrderStatus, OrderType, UserAddress, recalculate_cart_fees,
+)
+from .discounts import redeem_discount_code
+from .pricing import price_cart
+from .promotions import effective_price, get_promotion_map
+from .quotes import quote_lines, quote_order_items
+from .reservations import commit_reservations
+
+logger = logging.getLogger(__name__)
+
+
+# Đơn đã thanh toán nhưng kho không đủ giao (giữ hàng đã hết hạn và hàng đã bán cho người khác): ghi log để nhân viên xử lý
+def report_stock_shortfall(order, shortfalls):
+    if shortfalls:
+        logger.error('Order #%s was paid without enough stock (product_id: missing units): %s', order.pk, shortfalls)
+
+
+# Số điện thoại nhận hàng: ưu tiên địa chỉ đã lưu khớp địa chỉ giao của giỏ hàng, sau đó số của user
+def get_receiver_phone(user, cart):
+    if cart.address:
+        phone = (
+            UserAddress.objects.filter(user=user, address=cart.address)
+            .exclude(phone='').values_list('phone', flat=True).first()
+        )
+        if phone:
+            return phone
+    return user.phone or None
+
+
+# Trừ số lượng đã mua khỏi các dòng giỏ (theo thứ tự dòng) và xoá dòng đã hết; phần khách thêm sau khi tạo
+# phiên thanh toán (sản phẩm mới hoặc tăng số lượng) vẫn ở lại giỏ. lines dạng (product_id, quantity, unit_price)
+def remove_purchased_items(cart_id, lines):
+    remaining = defaultdict(int)
+    for product_id, quantity, _ in lines:
+        remaining[product_id] += quantity
+    to_delete, to_update = [], []
+    for item in CartItem.objects.filter(cart_id=cart_id, product_id__in=list(remaining)).order_by('id'):
+        taken = min(item.quantity, remaining[item.product_id])
+        remaining[item.product_id] -= taken
+        if taken == item.quantity:
+            to_delete.append(item.pk)
+        elif taken:
+            item.quantity -= taken
+            to_update.append(item)
+    CartItem.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        CartItem.objects.bulk_update(to_update, ['quantity'])
+
+
+# Tạo đơn hàng đã thanh toán đúng theo báo giá đã chốt khi tạo phiên thanh toán, không tính lại giá
+# (lượt mã giảm giá đã được giữ lúc tạo báo giá): khoá báo giá, tạo Order và OrderItem từ dòng hàng đã lưu,
+# xác nhận giữ hàng rồi trừ phần đã mua khỏi giỏ.
+# Báo giá đã thành đơn (webhook gửi lặp lại) thì trả về None
+def create_order_from_quote(checkout_session_id):
+    with transaction.atomic():
+        quote = CheckoutQuote.objects.select_for_update().get(checkout_session_id=checkout_session_id)
+        if quote.order_id is not None:
+            return None
+        lines = quote_lines(quote)
+        order = Order.objects.create(
+            user_id=quote.user_id,
+            status=OrderStatus.PAID,
+            total_price=quote.total,
+            order_type=OrderType.DELIVERY,
+            discount_code_id=quote.discount_code_id,
+            address=quote.address,
+            shipping_fee=quote.shipping_fee,
+            receiver_phone=quote.receiver_phone,
+        )
+        OrderItem.objects.bulk_create(quote_order_items(quote, order))
+        shortfalls = commit_reservations(checkout_session_id, [(product_id, quantity) for product_id, quantity, _ in lines])
+        CheckoutQuote.objects.filter(pk=quote.pk).update(order=order)
+        cart_id = Cart.objects.select_for_update().filter(user_id=quote.user_id).values_list('pk', flat=True).first()
+        if cart_id is not None:
+            remove_purchased_items(cart_id, lines)
+            Cart.objects.filter(pk=cart_id).update(discount_code=None, shipping_fee=0, service_fee=0, address='')
+            # Giỏ còn hàng thêm sau khi tạo phiên thanh toán: tính lại phí cho phần còn lại
+            if CartItem.objects.filter(cart_id=cart_id).exists():
+                recalculate_cart_fees(Cart.objects.get(pk=cart_id))
+    report_stock_shortfall(order, shortfalls)
+    return order
+
+
+# Tạo đơn hàng đã thanh toán từ giỏ hàng của user (phiên thanh toán không có báo giá, vd. tạo trước khi có CheckoutQuote) trong một transaction: khoá giỏ, tạo Order,
+# bulk_create OrderItem, xác nhận giữ hàng (một câu UPDATE stock/sold) và làm rỗng giỏ.
+# Giỏ đã rỗng (webhook gửi lặp lại) thì không tạo đơn và trả về None
+def create_order_from_cart(user, checkout_session_id=None):
+    with transaction.atomic():
+        cart_id = Cart.objects.select_for_update().filter(user=user).values_list('pk', flat=True).first()
+        if cart_id is None:
+            return None
+        cart = Cart.objects.for_read().get(pk=cart_id)
+        cart_items = list(cart.items.all())
+        if not cart_items:
+            return None
+        price = price_cart(cart)
+        promotion_map = get_promotion_map()
+        # Phiên không có báo giá chưa giữ lượt mã giảm giá: dùng lượt ngay khi tạo đơn.
+        # Khách đã thanh toán theo giá có giảm nên đơn vẫn ghi mã dù mã vừa hết lượt
+        if cart.discount_code_id:
+            redeem_discount_code(cart.discount_code_id)
+        order = Order.objects.create(
+            user=user,
+            status=OrderStatus.PAID,
+            total_price=price.total,
+            order_type=OrderType.DELIVERY,
+            discount_code=cart.discount_code,
+            address=cart.address or user.address,
+            shipping_fee=price.shipping_fee,
+            receiver_phone=get_receiver_phone(user, cart),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order, product_id=item.product_id, quantity=item.quantity,
+                price=effective_price(item.product, promotion_map), **OrderItem.snapshot(item.product),
+            )
+            for item in cart_items
+        ])
+        shortfalls = commit_reservations(checkout_session_id, [(item.product_id, item.quantity) for item in cart_items])
+        # Đảm bảo discount_code đã được lưu vào order trước khi xóa khỏi cart
+        CartItem.objects.filter(cart_id=cart.pk).delete()
+        Cart.objects.filter(pk=cart.pk).update(discount_code=None, shipping_fee=0, service_fee=0, address='')
+    report_stock_shortfall(order, shortfalls)
+    return order
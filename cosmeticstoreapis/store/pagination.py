@@ -1,6 +1,41 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 1
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+# Phân trang theo con trỏ (keyset): không COUNT(*), không OFFSET lớn, trang sâu tốn như trang đầu.
+# Thứ tự lấy từ thuộc tính cursor_ordering của view, phải kết thúc bằng khoá duy nhất (id)
+class KeysetResultsSetPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+
+# Giữ phân trang theo số trang cho client cũ, chuyển sang con trỏ khi client gửi ?cursor= hoặc ?pagination=cursor
+class CursorOrPageNumberPagination(StandardResultsSetPagination):
+    cursor_pagination_class = KeysetResultsSetPagination
+    mode_query_param = 'pagination'
+
+    def use_cursor(self, request):
+        return (
+            self.cursor_pagination_class.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = self.cursor_pagination_class() if self.use_cursor(request) else None
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.paginate_queryset(queryset, request, view=view)
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        if getattr(self, 'cursor_paginator', None) is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,58 @@
+from collections import namedtuple
+from decimal import Decimal
+from .models import CartItem, calculate_order_total, calculate_service_fee, calculate_shipping_fee
+from .promotions import discounted_price, get_promotion_map
+
+# Kết quả tính giá giỏ hàng, mọi số tiền là Decimal (VND)
+CartPrice = namedtuple('CartPrice', (
+    'subtotal', 'quantity', 'line_count', 'shipping_fee', 'service_fee',
+    'discount_percent', 'discount_amount', 'total',
+))
+
+CENT = Decimal('0.01')
+
+# Tên thuộc tính ghi nhớ kết quả trên instance Cart; mỗi request nạp Cart riêng nên đây là cache theo request
+MEMO_ATTR = '_cart_price'
+
+
+def _item_totals(cart, refresh, promotion_map=None):
+    # Dùng items đã prefetch (Cart.objects.for_read()) nếu có, không thì đọc (sản phẩm, giá, số lượng) bằng một truy vấn.
+    # Đơn giá là giá bán sau khuyến mãi, tra trong bảng khuyến mãi đã cache
+    promotion_map = promotion_map or get_promotion_map()
+    prefetched = getattr(cart, '_prefetched_objects_cache', {}).get('items')
+    if prefetched is not None and not refresh:
+        lines = [(item.product_id, item.product.price, item.quantity) for item in prefetched]
+    else:
+        lines = list(CartItem.objects.filter(cart_id=cart.pk).values_list('product_id', 'product__price', 'quantity'))
+    subtotal = sum(
+        (discounted_price(price, promotion_map.percents.get(product_id)) * quantity for product_id, price, quantity in lines),
+        Decimal('0'),
+    )
+    return Decimal(subtotal).quantize(CENT), sum(quantity for _, _, quantity in lines), len(lines)
+
+
+# Tính tạm tính, số lượng, phí vận chuyển, phí dịch vụ, giảm giá và tổng tiền của giỏ hàng.
+# Mặc định dùng phí đã lưu trên Cart; refresh=True đọc lại items từ DB và tính lại phí theo địa chỉ (dùng khi giỏ thay đổi).
+# recompute_fees=True chỉ tính lại phí trên items đã prefetch (checkout vừa nạp giỏ, không cần đọc lại items)
+def price_cart(cart, refresh=False, recompute_fees=None, promotion_map=None):
+    if recompute_fees is None:
+        recompute_fees = refresh
+    memo = getattr(cart, MEMO_ATTR, None)
+    if memo is not None and not refresh and not recompute_fees:
+        return memo
+    subtotal, quantity, line_count = _item_totals(cart, refresh, promotion_map)
+    if recompute_fees:
+        shipping_fee = Decimal(calculate_shipping_fee(subtotal, cart.address))
+        service_fee = Decimal(calculate_service_fee(subtotal))
+    else:
+        shipping_fee = cart.shipping_fee or Decimal('0')
+        service_fee = cart.service_fee or Decimal('0')
+    discount_percent = Decimal('0')
+    discount_amount = Decimal('0')
+    if cart.discount_code_id and cart.discount_code:
+        discount_percent = Decimal(str(cart.discount_code.discount_percentage))
+        discount_amount = Decimal(int(subtotal * discount_percent / Decimal('100')))
+    total = max(calculate_order_total(subtotal, shipping_fee, service_fee, discount_amount), Decimal('0'))
+    price = CartPrice(subtotal, quantity, line_count, shipping_fee, service_fee, discount_percent, discount_amount, total)
+    setattr(cart, MEMO_ATTR, price)
+    return price
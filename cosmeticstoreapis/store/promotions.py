@@ -0,0 +1,101 @@
+import threading
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from .caching import bump_version, get_version
+
+PROMOTION_VERSION_KEY = 'promotions:version'
+# Không có mốc khuyến mãi nào sắp tới thì vẫn nạp lại sau khoảng này
+PROMOTION_MAP_HORIZON = timedelta(hours=1)
+
+VND = Decimal('1')
+CENT = Decimal('0.01')
+
+# Phần trăm giảm tốt nhất của từng sản phẩm đang có khuyến mãi, dùng được đến expires_at
+# (mốc gần nhất có khuyến mãi bắt đầu hoặc kết thúc)
+PromotionMap = namedtuple('PromotionMap', ('percents', 'expires_at'))
+
+
+# Nạp khuyến mãi đang chạy: một truy vấn lấy phần trăm giảm cao nhất theo sản phẩm
+# và một truy vấn tìm mốc kế tiếp, cả hai lọc theo index (is_active, valid_from, valid_to)
+def load_promotion_map(now=None):
+    from .models import Promotion
+    now = now or timezone.now()
+    active = Promotion.objects.filter(is_active=True, valid_from__lte=now, valid_to__gte=now)
+    rows = (
+        Promotion.products.through.objects.filter(promotion__in=active)
+        .values('product_id').annotate(percent=Max('promotion__discount_percentage'))
+        .values_list('product_id', 'percent')
+    )
+    percents = {product_id: Decimal(percent) for product_id, percent in rows if percent and percent > 0}
+    started = Q(valid_from__lte=now)
+    boundaries = Promotion.objects.filter(is_active=True, valid_to__gte=now).aggregate(
+        next_start=Min('valid_from', filter=~started),
+        next_end=Min('valid_to', filter=started),
+    )
+    expires_at = now + PROMOTION_MAP_HORIZON
+    if boundaries['next_start'] is not None:
+        expires_at = min(expires_at, boundaries['next_start'])
+    if boundaries['next_end'] is not None:
+        # Khuyến mãi vẫn hiệu lực tại đúng valid_to nên bảng giá hết hạn ngay sau mốc đó
+        expires_at = min(expires_at, boundaries['next_end'] + timedelta(microseconds=1))
+    return PromotionMap(percents, expires_at)
+
+
+# Bảng khuyến mãi trong bộ nhớ của từng process, gắn với số phiên bản dùng chung và mốc hết hạn.
+# Chỉ truy vấn DB khi admin sửa khuyến mãi (phiên bản đổi) hoặc khi có khuyến mãi bắt đầu/kết thúc
+class PromotionMapCache:
+    def __init__(self):
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = get_version(PROMOTION_VERSION_KEY)
+        now = timezone.now()
+        with self._lock:
+            entry = self._entry
+        if entry is not None and entry[0] == version and now < entry[1].expires_at:
+            return entry[1]
+        promotion_map = load_promotion_map(now)
+        with self._lock:
+            self._entry = (version, promotion_map)
+        return promotion_map
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+
+
+promotion_map_cache = PromotionMapCache()
+
+
+def get_promotion_map():
+    return promotion_map_cache.get()
+
+
+def bump_promotion_version():
+    bump_version(PROMOTION_VERSION_KEY)
+
+
+# Số giây đến mốc khuyến mãi kế tiếp, dùng giới hạn thời gian cache response có giá bán
+def seconds_until_promotion_boundary():
+    return max((get_promotion_map().expires_at - timezone.now()).total_seconds(), 0)
+
+
+# Giá sau khi giảm theo phần trăm, làm tròn đến đồng (giữ 2 chữ số thập phân như cột price)
+def discounted_price(price, percent):
+    if not percent:
+        return price
+    return (price * (Decimal('100') - percent) / Decimal('100')).quantize(VND, rounding=ROUND_HALF_UP).quantize(CENT)
+
+
+def promotion_percent(product_id, promotion_map=None):
+    promotion_map = promotion_map or get_promotion_map()
+    return promotion_map.percents.get(product_id, Decimal('0'))
+
+
+# Giá bán thực tế của sản phẩm theo khuyến mãi tốt nhất đang chạy; không truy vấn khi bảng khuyến mãi đã cache
+def effective_price(product, promotion_map=None):
+    return discounted_price(product.price, promotion_percent(product.pk, promotion_map))
@@ -0,0 +1,72 @@
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from .discounts import release_discount_code
+from .models import Cart, CheckoutQuote, OrderItem
+from .pricing import price_cart
+from .promotions import effective_price, get_promotion_map
+from .reservations import RESERVATION_TTL
+
+# Báo giá hết hạn cùng lúc với phiên Stripe và hàng đang giữ
+QUOTE_TTL = RESERVATION_TTL
+
+
+# Chốt báo giá từ giỏ đã nạp bằng Cart.objects.for_read() (items và sản phẩm đã prefetch): một lần tính giá
+# trên items đó (đơn giá sau khuyến mãi) với phí tính lại theo địa chỉ, đồng thời lưu phí mới lên giỏ. Trả về instance chưa lưu
+def build_checkout_quote(cart, receiver_phone=None, ttl=QUOTE_TTL):
+    items = list(cart.items.all())
+    # Cùng một bảng khuyến mãi cho tổng tiền và đơn giá từng dòng
+    promotion_map = get_promotion_map()
+    price = price_cart(cart, recompute_fees=True, promotion_map=promotion_map)
+    unit_prices = {item.pk: effective_price(item.product, promotion_map) for item in items}
+    Cart.objects.filter(pk=cart.pk).update(shipping_fee=price.shipping_fee, service_fee=price.service_fee)
+    cart.shipping_fee = price.shipping_fee
+    cart.service_fee = price.service_fee
+    lines = [
+        {
+            'product_id': item.product_id,
+            'name': item.product.name,
+            'unit_price': str(unit_prices[item.pk]),
+            'quantity': item.quantity,
+            'line_total': str(unit_prices[item.pk] * item.quantity),
+            'snapshot': OrderItem.snapshot(item.product),
+        }
+        for item in items
+    ]
+    return CheckoutQuote(
+        user_id=cart.user_id,
+        lines=lines,
+        subtotal=price.subtotal,
+        shipping_fee=price.shipping_fee,
+        service_fee=price.service_fee,
+        discount_code_id=cart.discount_code_id,
+        discount_percent=price.discount_percent,
+        discount_amount=price.discount_amount,
+        total=price.total,
+        address=cart.address or cart.user.address,
+        receiver_phone=receiver_phone,
+        expires_at=timezone.now() + ttl,
+    )
+
+
+# Dòng hàng của báo giá dạng (product_id, quantity, unit_price Decimal)
+def quote_lines(quote):
+    return [(line['product_id'], line['quantity'], Decimal(line['unit_price'])) for line in quote.lines]
+
+
+# Dòng đơn hàng (chưa lưu) từ báo giá: đơn giá và snapshot sản phẩm đúng như lúc khách thanh toán
+def quote_order_items(quote, order):
+    return [
+        OrderItem(
+            order=order, product_id=line['product_id'], quantity=line['quantity'], price=Decimal(line['unit_price']),
+            **line.get('snapshot', {'product_name': line['name']}),
+        )
+        for line in quote.lines
+    ]
+
+
+# Bỏ báo giá chưa thành đơn (phiên hết hạn hoặc tạo phiên Stripe lỗi) và trả lại lượt mã giảm giá đã giữ
+def release_checkout_quote(quote):
+    with transaction.atomic():
+        if CheckoutQuote.objects.filter(pk=quote.pk, order__isnull=True).delete()[0] and quote.discount_code_id:
+            release_discount_code(quote.discount_code_id)
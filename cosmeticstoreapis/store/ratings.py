@@ -0,0 +1,68 @@
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+STARS = (1, 2, 3, 4, 5)
+REBUILD_CHUNK_SIZE = 1000
+
+
+# Quy điểm đánh giá (có thể lẻ, vd. 4.5) về số sao 1-5 theo làm tròn lên từ .5
+def rating_star(rating):
+    return min(max(int(float(rating) + 0.5), 1), 5)
+
+
+def _star_condition(star):
+    condition = Q()
+    if star > 1:
+        condition &= Q(rating__gte=star - 0.5)
+    if star < 5:
+        condition &= Q(rating__lt=star + 0.5)
+    return condition
+
+
+# Cộng (sign=1) hoặc trừ (sign=-1) một đánh giá vào số liệu tổng hợp của sản phẩm bằng một câu UPDATE.
+# rating_avg đặt đầu tiên và tính từ giá trị cũ: MySQL dùng giá trị đã cập nhật cho các phép gán phía sau
+def apply_review_delta(product_model, product_id, rating, sign):
+    count_delta = sign
+    sum_delta = sign * float(rating)
+    star_field = f'rating_{rating_star(rating)}'
+    new_avg = ExpressionWrapper(
+        (F('rating_sum') + Value(sum_delta)) / NullIf(F('review_count') + Value(count_delta), 0),
+        output_field=FloatField(),
+    )
+    product_model.objects.filter(pk=product_id).update(
+        rating_avg=Coalesce(new_avg, Value(0.0)),
+        review_count=F('review_count') + count_delta,
+        rating_sum=F('rating_sum') + sum_delta,
+        **{star_field: F(star_field) + count_delta},
+    )
+
+
+# Tính lại toàn bộ số liệu đánh giá theo từng lô sản phẩm: một truy vấn GROUP BY và một bulk_update mỗi lô
+def rebuild_rating_aggregates(product_model, review_model, chunk_size=REBUILD_CHUNK_SIZE):
+    fields = ['review_count', 'rating_sum', 'rating_avg'] + [f'rating_{star}' for star in STARS]
+    last_id = 0
+    total = 0
+    while True:
+        products = list(product_model.objects.filter(pk__gt=last_id).order_by('pk').only('pk')[:chunk_size])
+        if not products:
+            return total
+        last_id = products[-1].pk
+        stats = {
+            row['product_id']: row
+            for row in review_model.objects.filter(product_id__in=[p.pk for p in products])
+            .values('product_id')
+            .annotate(
+                count=Count('id'),
+                total=Sum('rating'),
+                **{f'star_{star}': Count('id', filter=_star_condition(star)) for star in STARS},
+            )
+        }
+        for product in products:
+            row = stats.get(product.pk)
+            product.review_count = row['count'] if row else 0
+            product.rating_sum = float(row['total']) if row else 0.0
+            product.rating_avg = product.rating_sum / product.review_count if product.review_count else 0.0
+            for star in STARS:
+                setattr(product, f'rating_{star}', row[f'star_{star}'] if row else 0)
+        product_model.objects.bulk_update(products, fields, batch_size=chunk_size)
+        total += len(products)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField, DecimalField, F, Max, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from .models import DailySales, Order, OrderItem, OrderStatus
+
+# Đơn được tính vào doanh thu
+REVENUE_STATUSES = (OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.COMPLETED)
+
+SERIES_GRANULARITIES = ('day', 'week', 'month')
+# Giới hạn số điểm của một chuỗi (vd. ~1 năm theo ngày)
+SERIES_MAX_POINTS = 400
+# Chuỗi báo cáo được cache ngắn theo bộ tham số: số liệu trễ tối đa khoảng này
+SERIES_CACHE_TTL = 60
+CENT = Decimal('0.01')
+
+
+def store_timezone():
+    return ZoneInfo(getattr(settings, 'STORE_TIME_ZONE', settings.TIME_ZONE))
+
+
+# Ngày hiện tại theo múi giờ cửa hàng (không theo múi giờ server/DB)
+def store_today():
+    return timezone.localtime(timezone.now(), store_timezone()).date()
+
+
+# Khoảng nửa mở [đầu ngày, đầu ngày kế tiếp) của một ngày theo múi giờ cửa hàng, dạng datetime aware.
+# So sánh trực tiếp created_at với hai mốc nên dùng được index, khác với created_at__date
+def day_bounds(day):
+    tz = store_timezone()
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+
+# Doanh thu, số đơn hôm nay và số đơn hôm qua trong một truy vấn aggregate có điều kiện,
+# quét một lần khoảng [đầu hôm qua, đầu ngày mai) theo index (status, created_at)
+def daily_order_stats(today=None):
+    today = today or store_today()
+    yesterday_start, today_start = day_bounds(today - timedelta(days=1))
+    _, tomorrow_start = day_bounds(today)
+    is_today = Q(created_at__gte=today_start)
+    return Order.objects.filter(
+        status__in=REVENUE_STATUSES, created_at__gte=yesterday_start, created_at__lt=tomorrow_start,
+    ).aggregate(
+        revenue_today=Sum('total_price', filter=is_today),
+        orders_today=Count('id', filter=is_today),
+        orders_yesterday=Count('id', filter=~is_today),
+        last_order_at=Max('created_at', filter=is_today),
+    )
+
+
+# Mốc đầu kỳ (ngày, thứ Hai của tuần, ngày 1 của tháng) chứa day, cùng quy ước với Trunc của DB
+def period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def series_periods(start, end, granularity):
+    periods = []
+    current = period_start(start, granularity)
+    while current <= end:
+        periods.append(current)
+        current = next_period(current, granularity)
+    return periods
+
+
+# Không lọc: đọc bảng tổng hợp theo ngày, doanh thu là tổng tiền đơn (gồm phí, sau giảm giá)
+def _rollup_series_rows(start, end, granularity):
+    return (
+        DailySales.objects.filter(day__gte=start, day__lte=end)
+        .annotate(period=Trunc('day', granularity, output_field=DateField()))
+        .values('period')
+        .annotate(revenue=Sum('revenue'), orders=Sum('order_count'), units=Sum('units_sold'))
+        .values_list('period', 'revenue', 'orders', 'units')
+    )
+
+
+# Lọc theo danh mục/thương hiệu: gom dòng đơn của các sản phẩm khớp theo kỳ (giờ cửa hàng) ngay trong DB;
+# doanh thu ở đây là thành tiền các dòng đó (trước phí và giảm giá) nên trả về dưới khoá item_*, số đơn đếm riêng biệt.
+# Khoảng thời gian so trực tiếp với created_at nên đi theo index (status, created_at) của đơn
+def _item_series_rows(start, end, granularity, category_id=None, brand_id=None):
+    range_start, _ = day_bounds(start)
+    _, range_end = day_bounds(end)
+    items = OrderItem.objects.filter(
+        order__status__in=REVENUE_STATUSES, order__created_at__gte=range_start, order__created_at__lt=range_end,
+    )
+    if category_id is not None:
+        items = items.filter(product__category_id=category_id)
+    if brand_id is not None:
+        items = items.filter(product__brand_id=brand_id)
+    amount = F('price') * F('quantity')
+    return (
+        items.annotate(period=Trunc('order__created_at', granularity, output_field=DateField(), tzinfo=store_timezone()))
+        .values('period')
+        .annotate(
+            revenue=Sum(amount, output_field=DecimalField(max_digits=16, decimal_places=2)),
+            orders=Count('order_id', distinct=True),
+            units=Sum('quantity'),
+        )
+        .values_list('period', 'revenue', 'orders', 'units')
+    )
+
+
+# Chuỗi doanh thu, số đơn, số sản phẩm bán và giá trị đơn trung bình theo kỳ trong [start, end] (ngày giờ cửa hàng).
+# Không lọc: revenue/average_order_value tính theo tổng tiền đơn. Có lọc: item_revenue/item_average_order_value
+# tính theo thành tiền dòng đơn khớp, để hai nghĩa không lẫn dưới cùng một khoá.
+# Kỳ đầu tiên chỉ chứa dữ liệu từ start nên được gắn nhãn start thay vì ngày đầu tuần/tháng.
+# Một truy vấn gom nhóm, kỳ không có đơn được điền 0
+def sales_series(start, end, granularity='day', category_id=None, brand_id=None):
+    filtered = category_id is not None or brand_id is not None
+    if filtered:
+        rows = _item_series_rows(start, end, granularity, category_id, brand_id)
+    else:
+        rows = _rollup_series_rows(start, end, granularity)
+    by_period = {
+        (period.date() if isinstance(period, datetime) else period): (revenue or Decimal('0'), orders or 0, units or 0)
+        for period, revenue, orders, units in rows
+    }
+    prefix = 'item_' if filtered else ''
+    series = []
+    totals = [Decimal('0'), 0, 0]
+    for period in series_periods(start, end, granularity):
+        revenue, orders, units = by_period.get(period, (Decimal('0'), 0, 0))
+        series.append(_series_point(revenue, orders, units, prefix, period=max(period, start).isoformat()))
+        totals[0] += revenue
+        totals[1] += orders
+        totals[2] += units
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'granularity': granularity,
+        'category': category_id,
+        'brand': brand_id,
+        'series': series,
+        'totals': _series_point(*totals, prefix),
+    }
+
+
+def _series_point(revenue, orders, units, prefix='', **extra):
+    average = (Decimal(revenue) / orders).quantize(CENT) if orders else Decimal('0.00')
+    return {
+        **extra,
+        f'{prefix}revenue': Decimal(revenue).quantize(CENT),
+        'orders': orders,
+        'units': units,
+        f'{prefix}average_order_value': average,
+    }
+
+
+def cached_sales_series(start, end, granularity='day', category_id=None, brand_id=None):
+    raw = json.dumps([start.isoformat(), end.isoformat(), granularity, category_id, brand_id])
+    key = f'reports:series:{hashlib.sha1(raw.encode("utf-8")).hexdigest()}'
+    data = cache.get(key)
+    if data is None:
+        data = sales_series(start, end, granularity, category_id, brand_id)
+        cache.set(key, data, SERIES_CACHE_TTL)
+    return data
@@ -0,0 +1,136 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.utils import timezone
+from .models import Product, ReservationStatus, StockReservation
+from .caching import bump_catalog_version
+
+# Stripe yêu cầu phiên thanh toán sống tối thiểu 30 phút, giữ hàng lâu hơn một chút để webhook kịp về
+RESERVATION_TTL = timedelta(minutes=35)
+SWEEP_BATCH_SIZE = 500
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, quantity):
+        super().__init__(f'Sản phẩm {product_id} không đủ {quantity} trong kho.')
+        self.product_id = product_id
+        self.quantity = quantity
+
+
+def _merge_lines(lines):
+    quantities = defaultdict(int)
+    for product_id, quantity in lines:
+        quantities[product_id] += quantity
+    return quantities
+
+
+# Biểu thức CASE theo id sản phẩm để cập nhật nhiều sản phẩm trong một câu UPDATE
+def per_product_case(field, expressions):
+    return Case(
+        *[When(pk=product_id, then=expression) for product_id, expression in expressions.items()],
+        default=F(field), output_field=PositiveIntegerField(),
+    )
+
+
+def _restock(quantities):
+    if quantities:
+        Product.objects.filter(pk__in=list(quantities)).update(
+            stock=per_product_case('stock', {product_id: F('stock') + quantity for product_id, quantity in quantities.items()})
+        )
+
+
+# Giữ hàng cho các dòng (product_id, quantity): mỗi sản phẩm trừ kho bằng một câu
+# UPDATE ... WHERE stock >= quantity nên không thể bán vượt tồn kho dù nhiều phiên chạy đồng thời.
+# Thiếu hàng ở bất kỳ dòng nào thì huỷ toàn bộ và ném InsufficientStock
+def reserve_stock(user, lines, ttl=RESERVATION_TTL):
+    quantities = _merge_lines(lines)
+    expires_at = timezone.now() + ttl
+    with transaction.atomic():
+        # Khoá các dòng sản phẩm theo thứ tự id để tránh deadlock giữa các phiên
+        for product_id in sorted(quantities):
+            quantity = quantities[product_id]
+            if not Product.objects.filter(pk=product_id, stock__gte=quantity).update(stock=F('stock') - quantity):
+                raise InsufficientStock(product_id, quantity)
+        reservations = StockReservation.objects.bulk_create([
+            StockReservation(user=user, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in sorted(quantities.items())
+        ])
+    bump_catalog_version()
+    return reservations
+
+
+# Trả lại kho cho các giữ hàng còn hiệu lực trong queryset; chỉ xử lý các dòng khoá được
+# nên an toàn khi chạy song song với commit_reservations hoặc một tiến trình dọn khác
+def release_reservations(reservations):
+    with transaction.atomic():
+        locked = list(
+            reservations.filter(status=ReservationStatus.ACTIVE)
+            .select_for_update(skip_locked=True)
+            .values_list('id', 'product_id', 'quantity')
+        )
+        if not locked:
+            return 0
+        StockReservation.objects.filter(pk__in=[row[0] for row in locked]).update(status=ReservationStatus.RELEASED)
+        _restock(_merge_lines((product_id, quantity) for _, product_id, quantity in locked))
+    bump_catalog_version()
+    return len(locked)
+
+
+# Dọn các giữ hàng đã hết hạn theo lô, trả về số giữ hàng đã trả kho
+def release_expired_reservations(now=None, batch_size=SWEEP_BATCH_SIZE):
+    now = now or timezone.now()
+    total = 0
+    while True:
+        ids = list(
+            StockReservation.objects.filter(status=ReservationStatus.ACTIVE, expires_at__lte=now)
+            .order_by('expires_at').values_list('id', flat=True)[:batch_size]
+        )
+        released = release_reservations(StockReservation.objects.filter(pk__in=ids)) if ids else 0
+        total += released
+        if len(ids) < batch_size or not released:
+            return total
+
+
+# Xác nhận giữ hàng khi đã thanh toán: đánh dấu committed và tăng sold trong một câu UPDATE. Phần không còn
+# giữ (giữ hàng đã hết hạn trước khi webhook về) thì trừ kho trực tiếp trong giới hạn tồn kho hiện có.
+# Trả về {product_id: số lượng thiếu} cho phần không đủ hàng để giao (đã bán vượt), rỗng nếu đủ
+def commit_reservations(checkout_session_id, lines):
+    quantities = _merge_lines(lines)
+    shortfalls = {}
+    with transaction.atomic():
+        reserved = defaultdict(int)
+        if checkout_session_id:
+            locked = list(
+                StockReservation.objects.filter(checkout_session_id=checkout_session_id, status=ReservationStatus.ACTIVE)
+                .select_for_update()
+                .values_list('id', 'product_id', 'quantity')
+            )
+            StockReservation.objects.filter(pk__in=[row[0] for row in locked]).update(status=ReservationStatus.COMMITTED)
+            for _, product_id, quantity in locked:
+                reserved[product_id] += quantity
+        missing = {}
+        for product_id, quantity in quantities.items():
+            missing[product_id] = quantity - reserved.pop(product_id, 0)
+        short = [product_id for product_id, quantity in missing.items() if quantity > 0]
+        available = dict(
+            Product.objects.select_for_update().filter(pk__in=sorted(short)).values_list('pk', 'stock')
+        ) if short else {}
+        stock, sold = {}, {}
+        for product_id, quantity in quantities.items():
+            if missing[product_id] > 0:
+                taken = min(missing[product_id], available.get(product_id, 0))
+                if taken < missing[product_id]:
+                    shortfalls[product_id] = missing[product_id] - taken
+                stock[product_id] = F('stock') - taken
+            elif missing[product_id] < 0:
+                stock[product_id] = F('stock') - missing[product_id]
+            sold[product_id] = F('sold') + quantity
+        if sold:
+            Product.objects.filter(pk__in=list(sold)).update(
+                stock=per_product_case('stock', stock), sold=per_product_case('sold', sold),
+            )
+        # Giữ hàng của sản phẩm không còn trong đơn thì trả lại kho
+        _restock(reserved)
+    bump_catalog_version()
+    return shortfalls
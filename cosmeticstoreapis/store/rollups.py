@@ -0,0 +1,210 @@
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Min, When
+from django.utils import timezone
+from .reporting import REVENUE_STATUSES, day_bounds, store_timezone, store_today
+
+ROLLUP_FIELDS = ('revenue', 'order_count', 'units_sold', 'imports', 'exports')
+ROLLUP_CHUNK_DAYS = 31
+
+# Các model tham gia bảng tổng hợp, lấy qua app registry (truyền registry khác để dùng với model lịch sử)
+RollupModels = namedtuple('RollupModels', ('order', 'order_item', 'stock_history', 'daily', 'daily_product'))
+
+
+def rollup_models(registry=None):
+    registry = registry or django_apps
+    return RollupModels(*(
+        registry.get_model('store', name)
+        for name in ('Order', 'OrderItem', 'StockHistory', 'DailySales', 'DailyProductSales')
+    ))
+
+
+# Ngày theo múi giờ cửa hàng của một thời điểm
+def local_day(value):
+    return timezone.localtime(value, store_timezone()).date()
+
+
+def _empty_totals():
+    return {'revenue': Decimal('0'), 'order_count': 0, 'units_sold': 0, 'imports': 0, 'exports': 0}
+
+
+# Số liệu cộng dồn theo ngày và theo (ngày, sản phẩm), chưa ghi DB
+class RollupDelta:
+    def __init__(self):
+        self.days = defaultdict(_empty_totals)
+        self.products = defaultdict(_empty_totals)
+
+    # lines: {product_id: (số lượng, thành tiền)}
+    def add_order(self, day, total_price, lines):
+        totals = self.days[day]
+        totals['revenue'] += total_price
+        totals['order_count'] += 1
+        for product_id, (quantity, amount) in lines.items():
+            totals['units_sold'] += quantity
+            product_totals = self.products[(day, product_id)]
+            product_totals['revenue'] += amount
+            product_totals['order_count'] += 1
+            product_totals['units_sold'] += quantity
+
+    # change dương là nhập kho, âm là xuất kho (cùng quy ước với StockHistory.change)
+    def add_stock_change(self, day, product_id, change):
+        if not change:
+            return
+        field, amount = ('imports', change) if change > 0 else ('exports', -change)
+        self.days[day][field] += amount
+        self.products[(day, product_id)][field] += amount
+
+    def __bool__(self):
+        return bool(self.days or self.products)
+
+
+def _output_field(field):
+    return DecimalField(max_digits=16, decimal_places=2) if field == 'revenue' else IntegerField()
+
+
+# Cộng (sign=1) hoặc trừ (sign=-1) delta vào bảng tổng hợp: tạo các dòng còn thiếu bằng bulk_create,
+# rồi mỗi ngày một câu UPDATE cho dòng ngày và một câu UPDATE (Case theo sản phẩm) cho các dòng sản phẩm
+def apply_rollup_delta(delta, sign=1, models=None):
+    if not delta:
+        return
+    models = models or rollup_models()
+    models.daily.objects.bulk_create([models.daily(day=day) for day in delta.days], ignore_conflicts=True)
+    models.daily_product.objects.bulk_create(
+        [models.daily_product(day=day, product_id=product_id) for day, product_id in delta.products],
+        ignore_conflicts=True,
+    )
+    for day, totals in delta.days.items():
+        changes = {field: F(field) + sign * value for field, value in totals.items() if value}
+        if changes:
+            models.daily.objects.filter(day=day).update(**changes)
+    by_day = defaultdict(dict)
+    for (day, product_id), totals in delta.products.items():
+        by_day[day][product_id] = totals
+    for day, products in by_day.items():
+        changes = {}
+        for field in ROLLUP_FIELDS:
+            whens = [
+                When(product_id=product_id, then=F(field) + sign * totals[field])
+                for product_id, totals in products.items() if totals[field]
+            ]
+            if whens:
+                changes[field] = Case(*whens, default=F(field), output_field=_output_field(field))
+        if changes:
+            models.daily_product.objects.filter(day=day, product_id__in=list(products)).update(**changes)
+
+
+# Dòng đơn gộp theo sản phẩm: {order_id: {product_id: (số lượng, thành tiền)}}
+def _order_lines(models, **filters):
+    lines = defaultdict(lambda: defaultdict(lambda: [0, Decimal('0')]))
+    rows = models.order_item.objects.filter(**filters).values_list('order_id', 'product_id', 'quantity', 'price')
+    for order_id, product_id, quantity, price in rows.iterator(chunk_size=2000):
+        line = lines[order_id][product_id]
+        line[0] += quantity
+        line[1] += price * quantity
+    return {order_id: {product_id: tuple(line) for product_id, line in products.items()} for order_id, products in lines.items()}
+
+
+# Đồng bộ một đơn với bảng tổng hợp theo trạng thái hiện tại của nó. in_rollup cho biết đơn đã được cộng hay chưa,
+# nên gọi lặp lại (job chạy lại, sự kiện đến không theo thứ tự) không cộng trùng. Trả về True nếu có thay đổi
+def sync_order_rollup(order_id, models=None):
+    models = models or rollup_models()
+    with transaction.atomic():
+        order = (
+            models.order.objects.select_for_update().filter(pk=order_id)
+            .values('status', 'in_rollup', 'created_at', 'total_price').first()
+        )
+        if order is None:
+            return False
+        wanted = order['status'] in REVENUE_STATUSES
+        if wanted == order['in_rollup']:
+            return False
+        delta = RollupDelta()
+        delta.add_order(local_day(order['created_at']), order['total_price'], _order_lines(models, order_id=order_id).get(order_id, {}))
+        apply_rollup_delta(delta, 1 if wanted else -1, models)
+        models.order.objects.filter(pk=order_id).update(in_rollup=wanted)
+    return True
+
+
+# Trừ đơn đang được tính khỏi bảng tổng hợp trước khi xoá (dòng đơn vẫn còn lúc pre_delete).
+# Đọc lại in_rollup từ DB vì job đồng bộ có thể đã cập nhật sau khi instance được nạp
+def discard_order_rollup(order_id, models=None):
+    models = models or rollup_models()
+    order = (
+        models.order.objects.select_for_update().filter(pk=order_id, in_rollup=True)
+        .values('created_at', 'total_price').first()
+    )
+    if order is None:
+        return
+    delta = RollupDelta()
+    delta.add_order(local_day(order['created_at']), order['total_price'], _order_lines(models, order_id=order_id).get(order_id, {}))
+    apply_rollup_delta(delta, -1, models)
+
+
+# Ghi nhận nhập/xuất kho; rows là các StockHistory đã lưu (created_at đã có giá trị)
+def apply_stock_movements(rows, sign=1, models=None):
+    delta = RollupDelta()
+    for row in rows:
+        delta.add_stock_change(local_day(row.created_at), row.product_id, row.change)
+    apply_rollup_delta(delta, sign, models)
+
+
+# Ngày sớm nhất có dữ liệu gốc (đơn hoặc lịch sử kho)
+def first_rollup_day(models=None):
+    models = models or rollup_models()
+    candidates = [
+        models.order.objects.aggregate(first=Min('created_at'))['first'],
+        models.stock_history.objects.aggregate(first=Min('created_at'))['first'],
+    ]
+    candidates = [value for value in candidates if value is not None]
+    return local_day(min(candidates)) if candidates else None
+
+
+# Dựng lại bảng tổng hợp cho các ngày [start, end] từ Order/OrderItem/StockHistory, mỗi lô chunk_days ngày
+# trong một transaction: khoá các đơn của lô, xoá và ghi lại dòng tổng hợp, đặt lại in_rollup.
+# on_chunk(first_day, last_day) được gọi sau mỗi lô. Trả về số ngày đã xử lý
+def rebuild_rollups(start=None, end=None, chunk_days=ROLLUP_CHUNK_DAYS, models=None, on_chunk=None):
+    models = models or rollup_models()
+    start = start or first_rollup_day(models)
+    end = end or store_today()
+    if start is None or start > end:
+        return 0
+    day = start
+    while day <= end:
+        last = min(day + timedelta(days=chunk_days - 1), end)
+        _rebuild_chunk(models, day, last)
+        if on_chunk:
+            on_chunk(day, last)
+        day = last + timedelta(days=1)
+    return (end - start).days + 1
+
+
+def _rebuild_chunk(models, first, last):
+    range_start, _ = day_bounds(first)
+    _, range_end = day_bounds(last)
+    in_range = {'created_at__gte': range_start, 'created_at__lt': range_end}
+    with transaction.atomic():
+        orders = list(
+            models.order.objects.select_for_update().filter(**in_range, status__in=REVENUE_STATUSES)
+            .values_list('id', 'created_at', 'total_price')
+        )
+        lines = _order_lines(models, order__created_at__gte=range_start, order__created_at__lt=range_end, order__status__in=REVENUE_STATUSES)
+        delta = RollupDelta()
+        for order_id, created_at, total_price in orders:
+            delta.add_order(local_day(created_at), total_price, lines.get(order_id, {}))
+        movements = models.stock_history.objects.filter(**in_range).values_list('created_at', 'product_id', 'change')
+        for created_at, product_id, change in movements.iterator(chunk_size=2000):
+            delta.add_stock_change(local_day(created_at), product_id, change)
+
+        models.daily.objects.filter(day__gte=first, day__lte=last).delete()
+        models.daily_product.objects.filter(day__gte=first, day__lte=last).delete()
+        models.daily.objects.bulk_create([models.daily(day=day, **totals) for day, totals in delta.days.items()], batch_size=1000)
+        models.daily_product.objects.bulk_create(
+            [models.daily_product(day=day, product_id=product_id, **totals) for (day, product_id), totals in delta.products.items()],
+            batch_size=1000,
+        )
+        models.order.objects.filter(**in_range).update(
+            in_rollup=Case(When(status__in=REVENUE_STATUSES, then=True), default=False)
+        )
@@ -0,0 +1,124 @@
+import re
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from rest_framework.filters import BaseFilterBackend
+from unidecode import unidecode
+
+# Trọng số của từng trường khi xếp hạng kết quả tìm kiếm
+SEARCH_FIELD_WEIGHTS = (
+    ('name', 8),
+    ('barcode', 8),
+    ('brand', 4),
+    ('category', 4),
+    ('skin_type', 2),
+    ('ingredients', 1),
+)
+MAX_TOKEN_LENGTH = 64
+MAX_PREFIX_EXPANSIONS = 50
+INDEX_BATCH_SIZE = 1000
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+# Chuẩn hoá chuỗi: bỏ dấu tiếng Việt (Unidecode), chữ thường, tách thành các token
+def tokenize(text):
+    if not text:
+        return []
+    folded = unidecode(str(text)).lower()
+    return [token[:MAX_TOKEN_LENGTH] for token in _TOKEN_RE.findall(folded)]
+
+
+# Lấy giá trị các trường cần đánh chỉ mục của một sản phẩm
+def _product_field_values(product):
+    return {
+        'name': product.name,
+        'barcode': product.barcode,
+        'brand': product.brand.name if product.brand_id else '',
+        'category': product.category.name if product.category_id else '',
+        'skin_type': product.skin_type,
+        'ingredients': product.ingredients,
+    }
+
+
+# Tính {token: trọng số} cho một sản phẩm, token xuất hiện ở nhiều trường thì cộng dồn trọng số
+def product_tokens(product):
+    values = _product_field_values(product)
+    tokens = {}
+    for field, weight in SEARCH_FIELD_WEIGHTS:
+        for token in set(tokenize(values[field])):
+            tokens[token] = tokens.get(token, 0) + weight
+    return tokens
+
+
+# Đánh chỉ mục lại một tập sản phẩm theo lô (xoá token cũ, bulk_create token mới)
+def reindex_products(products, token_model=None):
+    if token_model is None:
+        from .models import ProductSearchToken
+        token_model = ProductSearchToken
+    batch, product_ids = [], []
+    for product in products:
+        product_ids.append(product.pk)
+        batch.extend(
+            token_model(product_id=product.pk, token=token, weight=weight)
+            for token, weight in product_tokens(product).items()
+        )
+        if len(product_ids) >= INDEX_BATCH_SIZE:
+            _flush_index(token_model, product_ids, batch)
+            batch, product_ids = [], []
+    if product_ids:
+        _flush_index(token_model, product_ids, batch)
+
+
+def _flush_index(token_model, product_ids, batch):
+    token_model.objects.filter(product_id__in=product_ids).delete()
+    token_model.objects.bulk_create(batch, batch_size=INDEX_BATCH_SIZE)
+
+
+def reindex_product(product):
+    reindex_products([product])
+
+
+# Áp dụng tìm kiếm lên queryset sản phẩm: mọi từ khoá phải khớp, từ cuối được khớp theo tiền tố
+# (phục vụ gõ dở), kết quả được xếp theo tổng trọng số
+def search_products(queryset, query):
+    from .models import ProductSearchToken
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset
+    exact_terms, last_term = terms[:-1], terms[-1]
+    expansions = list(
+        ProductSearchToken.objects.filter(token__startswith=last_term)
+        .values_list('token', flat=True).distinct()[:MAX_PREFIX_EXPANSIONS]
+    )
+    if not expansions:
+        return queryset.none()
+    # Mỗi từ khoá đếm riêng số token khớp (từ đầy đủ khớp đúng, từ cuối khớp một trong các token mở rộng)
+    # và đều phải >= 1; một token vừa khớp đúng từ trước vừa là mở rộng của từ cuối vẫn tính cho cả hai
+    hits = ProductSearchToken.objects.filter(Q(token__in=exact_terms) | Q(token__in=expansions))
+    term_counts = {f'term_{index}': Count('id', filter=Q(token=term)) for index, term in enumerate(exact_terms)}
+    matching_ids = (
+        hits.values('product_id')
+        .annotate(prefix_hits=Count('id', filter=Q(token__in=expansions)), **term_counts)
+        .filter(prefix_hits__gte=1, **{f'{name}__gte': 1 for name in term_counts})
+        .values('product_id')
+    )
+    score = (
+        hits.filter(product_id=OuterRef('pk'))
+        .values('product_id')
+        .annotate(score=Sum('weight'))
+        .values('score')
+    )
+    return queryset.filter(pk__in=matching_ids).annotate(
+        search_score=Coalesce(Subquery(score, output_field=IntegerField()), 0)
+    ).order_by('-search_score', 'id')
+
+
+# Filter backend cho /products/?search= dùng chỉ mục token thay vì LIKE '%term%'
+class ProductSearchFilter(BaseFilterBackend):
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_products(queryset, query)
@@ -1,8 +1,71 @@
+from django.utils import timezone
 from rest_framework import serializers
+from .images import image_url
 from .models import (
     User, Brand, Category, Product, ProductImage, ImportTransaction, Cart, CartItem, Order, OrderItem,
     PaymentTransaction, Review, DiscountCode, Promotion, Notification, UserAddress, UserNotification, ChatMessage, UserVoucher, FavoriteProduct, StockHistory
 )
+from .pricing import price_cart
+from .promotions import discounted_price, get_promotion_map, promotion_percent
+from .cart_ops import CART_OPERATIONS
+
+# Hỗ trợ ?fields= (chỉ lấy các trường liệt kê) và ?expand= (thêm trường ngoài dạng rút gọn).
+# Serializer lồng nhau dùng tiền tố theo đường dẫn trường, vd. ?fields=id,items.product_detail.name.
+# Khi view đặt context['compact'] (action list), chỉ xuất compact_fields và thay các quan hệ
+# trong compact_nested bằng dạng {id, name} trừ khi được expand
+class SparseFieldsMixin:
+    compact_fields = None
+    compact_nested = ()
+
+    def _field_path(self):
+        names = []
+        node = self
+        while node is not None:
+            if getattr(node, 'field_name', None):
+                names.append(node.field_name)
+            node = getattr(node, 'parent', None)
+        return '.'.join(reversed(names))
+
+    def _requested_names(self, param):
+        request = self.context.get('request')
+        raw = request.query_params.get(param) if request is not None else None
+        if not raw:
+            return None
+        path = self._field_path()
+        prefix = f'{path}.' if path else ''
+        names = set()
+        for item in raw.split(','):
+            item = item.strip()
+            if item.startswith(prefix) and len(item) > len(prefix):
+                names.add(item[len(prefix):].split('.')[0])
+        return names or None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self._requested_names('fields')
+        expand = self._requested_names('expand') or set()
+        compact = self.context.get('compact', False)
+        if requested:
+            allowed = requested
+        elif compact and self.compact_fields is not None:
+            allowed = set(self.compact_fields) | expand
+        else:
+            allowed = None
+        if allowed is not None:
+            for name in list(fields):
+                if name not in allowed:
+                    fields.pop(name)
+        if compact:
+            for name in self.compact_nested:
+                if name in fields and name not in expand:
+                    fields[name] = NamedRefSerializer(read_only=True)
+        return fields
+
+
+class NamedRefSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -81,11 +144,7 @@ class BrandSerializer(serializers.ModelSerializer):
 class CategorySerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        request = self.context.get('request', None)
-        if instance.image and request:
-            data['image'] = request.build_absolute_uri(instance.image.url)
-        else:
-            data['image'] = instance.image.url if instance.image else ''
+        data['image'] = image_url(instance, self.context.get('request', None))
         return data
 
     class Meta:
@@ -95,46 +154,66 @@ class CategorySerializer(serializers.ModelSerializer):
 class ProductImageSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        request = self.context.get('request', None)
-        if instance.image and request:
-            data['image'] = request.build_absolute_uri(instance.image.url)
-        else:
-            data['image'] = instance.image.url if instance.image else ''
+        data['image'] = image_url(instance, self.context.get('request', None))
         return data
 
     class Meta:
         model = ProductImage
-        fields = ('id', 'product', 'image', 'uploaded_at')
+        fields = ('id', 'product', 'image', 'image_urls', 'uploaded_at')
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     brand = BrandSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
-    review_count = serializers.SerializerMethodField()
+    rating_avg = serializers.SerializerMethodField()
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     promotion_names = serializers.SerializerMethodField()
+    promotion_percent = serializers.SerializerMethodField()
+    effective_price = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(read_only=True)
 
-    def get_review_count(self, obj):
-        return obj.reviews.count()
+    def get_rating_avg(self, obj):
+        return round(obj.rating_avg, 2)
+
+    # Bảng khuyến mãi lấy một lần cho cả response (context dùng chung giữa các serializer con)
+    def _promotion_map(self):
+        if 'promotion_map' not in self.context:
+            self.context['promotion_map'] = get_promotion_map()
+        return self.context['promotion_map']
+
+    def get_promotion_percent(self, obj):
+        return str(promotion_percent(obj.pk, self._promotion_map()))
+
+    # Giá bán sau khuyến mãi tốt nhất đang chạy, cùng cách tính với giỏ hàng và checkout
+    def get_effective_price(self, obj):
+        return str(discounted_price(obj.price, self._promotion_map().percents.get(obj.pk)))
 
     def get_promotion_names(self, obj):
-        return [promo.name for promo in obj.promotions.all()]
+        promotions = getattr(obj, 'active_promotions', None)
+        if promotions is None:
+            now = timezone.now()
+            promotions = obj.promotions.filter(is_active=True, valid_from__lte=now, valid_to__gte=now)
+        return [promo.name for promo in promotions]
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        request = self.context.get('request', None)
-        if instance.image and request:
-            data['image'] = request.build_absolute_uri(instance.image.url)
-        else:
-            data['image'] = instance.image.url if instance.image else ''
+        if 'image' not in data:
+            return data
+        data['image'] = image_url(instance, self.context.get('request', None))
         return data
 
+    compact_fields = (
+        'id', 'name', 'price', 'effective_price', 'promotion_percent', 'stock', 'sold', 'barcode', 'image', 'image_urls',
+        'brand', 'category', 'review_count', 'rating_avg', 'promotion_names',
+    )
+    compact_nested = ('brand', 'category')
+
     class Meta:
         model = Product
         fields = (
-            'id', 'name', 'description', 'price', 'stock', 'sold',
-            'barcode', 'image', 'brand', 'category', 'images',
-            'review_count', 'promotion_names', 'created_at',
+            'id', 'name', 'description', 'price', 'effective_price', 'promotion_percent', 'stock', 'sold',
+            'barcode', 'image', 'image_urls', 'brand', 'category', 'images',
+            'review_count', 'rating_avg', 'rating_histogram', 'promotion_names', 'created_at',
             'capacity', 'origin', 'ingredients', 'skin_type'
         )
     
@@ -153,7 +232,7 @@ class ImportTransactionSerializer(serializers.ModelSerializer):
         model = ImportTransaction
         fields = '__all__'
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
     product_name = serializers.SerializerMethodField()
     product_detail = ProductSerializer(source='product', read_only=True)
@@ -164,7 +243,20 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = '__all__'
 
-class CartSerializer(serializers.ModelSerializer):
+# Một thao tác trong yêu cầu cập nhật giỏ hàng hàng loạt (POST /carts/batch/)
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=CART_OPERATIONS)
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'remove' and attrs.get('quantity') is None:
+            raise serializers.ValidationError({'quantity': 'Thao tác add/set_quantity cần quantity.'})
+        if attrs['op'] == 'add' and attrs['quantity'] < 1:
+            raise serializers.ValidationError({'quantity': 'Số lượng thêm phải lớn hơn 0.'})
+        return attrs
+
+class CartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     user = serializers.StringRelatedField(read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
@@ -184,20 +276,15 @@ class CartSerializer(serializers.ModelSerializer):
             }
         return None
 
+    # Các số liệu tổng hợp lấy từ store.pricing.price_cart, tính một lần cho mỗi cart
     def get_discount_amount(self, obj):
-        # Tính số tiền giảm giá dựa trên discount_percentage
-        from decimal import Decimal
-        if obj.discount_code:
-            subtotal = sum([(item.product.price if item.product else Decimal('0')) * item.quantity for item in obj.items.all()])
-            percent = Decimal(str(obj.discount_code.discount_percentage))
-            return int(subtotal * percent / Decimal('100'))
-        return 0
+        return int(price_cart(obj).discount_amount)
 
     def get_total_quantity(self, obj):
-        return sum([item.quantity for item in obj.items.all()])
+        return price_cart(obj).quantity
 
     def get_cart_total(self, obj):
-        return sum([(item.product.price if item.product else 0) * item.quantity for item in obj.items.all()])
+        return price_cart(obj).subtotal
 
     # Xoá các hàm get_shipping_fee và get_service_fee, chỉ lấy từ trường của model
     
@@ -208,13 +295,14 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ('id', 'user', 'created_at', 'items', 'total_quantity', 'shipping_fee', 'service_fee', 'address', 'user_address', 'discount_code', 'discount_amount')
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+# Dòng đơn hàng trả snapshot sản phẩm lưu lúc đặt hàng (tên, ảnh, barcode, đơn giá) thay vì lồng ProductSerializer,
+# lịch sử đơn không đổi khi sản phẩm được sửa và không cần truy vấn thêm theo số dòng
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = OrderItem
-        fields = '__all__'
+        fields = ('id', 'order', 'product', 'product_name', 'product_image', 'product_barcode', 'quantity', 'price')
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user = serializers.StringRelatedField(read_only=True)
     discount_code = serializers.SerializerMethodField()
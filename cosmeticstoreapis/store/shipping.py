@@ -0,0 +1,56 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+from .search import tokenize
+
+MAX_CACHED_ADDRESSES = 10000
+# Quận/huyện cụ thể hơn tỉnh/thành nên được so khớp trước
+LEVEL_ORDER = ('district', 'city')
+
+ResolvedZone = namedtuple('ResolvedZone', ('zone_id', 'name', 'fee'))
+
+
+# Chuẩn hoá địa chỉ một lần: bỏ dấu (Unidecode), chữ thường, chỉ giữ chữ và số cách nhau một dấu cách
+def normalize_address(address):
+    return ' '.join(tokenize(address))
+
+
+# Bảng vùng giao hàng đã biên dịch: mỗi cấp (quận/huyện, tỉnh/thành) là một regex gộp mọi tên,
+# kết quả address -> vùng được nhớ trong LRU cache. Bảng dựng lại khi cấu hình phí đổi phiên bản (store/fees.py)
+class ShippingZoneMatcher:
+    def __init__(self, areas, default_fee, cache_size=MAX_CACHED_ADDRESSES):
+        # areas: các bộ (level, tên vùng con, ResolvedZone, priority)
+        self.default = ResolvedZone(None, '', default_fee)
+        self._levels = []
+        for level in LEVEL_ORDER:
+            zones = {}
+            for area_level, name, zone, priority in areas:
+                alias = normalize_address(name)
+                if area_level != level or not alias:
+                    continue
+                if alias not in zones or priority > zones[alias][1]:
+                    zones[alias] = (zone, priority)
+            if zones:
+                aliases = sorted(zones, key=len, reverse=True)
+                pattern = re.compile(r'\b(%s)\b' % '|'.join(re.escape(alias) for alias in aliases))
+                self._levels.append((pattern, zones))
+        self.zone_for = lru_cache(maxsize=cache_size)(self._zone_for)
+
+    def _zone_for(self, address):
+        text = normalize_address(address)
+        if not text:
+            return self.default
+        for pattern, zones in self._levels:
+            matches = [zones[match.group(1)] for match in pattern.finditer(text)]
+            if matches:
+                return max(matches, key=lambda match: match[1])[0]
+        return self.default
+
+
+def build_zone_matcher(default_fee):
+    from .models import ShippingZoneArea
+    areas = [
+        (area.level, area.name, ResolvedZone(area.zone_id, area.zone.name, area.zone.fee), area.zone.priority)
+        for area in ShippingZoneArea.objects.filter(zone__is_active=True).select_related('zone').order_by('id')
+    ]
+    return ShippingZoneMatcher(areas, default_fee)
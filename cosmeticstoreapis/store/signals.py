@@ -1,6 +1,21 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
 from django.dispatch import receiver
-from .models import Order, OrderStatus, OrderItem, Product
+from django.db import transaction
+from .models import (
+    Order, OrderItem, Product, Brand, Category, ProductImage, Promotion, Review, ServiceFee, DiscountCode,
+    ShippingZone, ShippingZoneArea, StockHistory,
+)
+from .search import reindex_product, reindex_products
+from .caching import bump_catalog_version
+from .barcodes import barcode_cache
+from .images import refresh_image_urls
+from .ratings import apply_review_delta
+from .fees import bump_fee_config_version
+from .promotions import bump_promotion_version
+from .discounts import bump_discount_version
+from .reporting import REVENUE_STATUSES
+from .jobs import enqueue
+from .rollups import apply_stock_movements, discard_order_rollup
 
 # Cập nhật last_login khi xác thực OAuth2
 from django.contrib.auth import get_user_model
@@ -15,11 +30,125 @@ def update_last_login(sender, request, token, **kwargs):
 
 app_authorized.connect(update_last_login)
 
-# Tăng số lượng đã bán cho sản phẩm khi đơn hàng hoàn tất
+# Các trường của đơn được chép vào bảng tổng hợp (ngày theo created_at, doanh thu theo total_price)
+ROLLUP_SOURCE_FIELDS = ('total_price', 'created_at')
+
+
+# Đơn đang được tính bị sửa tổng tiền hoặc ngày tạo (vd. nhân viên sửa đơn qua API quản trị): trừ số liệu cũ
+# khỏi bảng tổng hợp và đánh dấu chưa tính, post_save bên dưới sẽ xếp job cộng lại theo giá trị mới
+@receiver(pre_save, sender=Order)
+def discard_edited_order_rollups(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and not set(ROLLUP_SOURCE_FIELDS) & set(update_fields)):
+        return
+    with transaction.atomic():
+        current = (
+            Order.objects.select_for_update().filter(pk=instance.pk, in_rollup=True)
+            .values(*ROLLUP_SOURCE_FIELDS).first()
+        )
+        if current is None or all(
+            current[name] == sender._meta.get_field(name).to_python(getattr(instance, name)) for name in ROLLUP_SOURCE_FIELDS
+        ):
+            return
+        discard_order_rollup(instance.pk)
+        Order.objects.filter(pk=instance.pk).update(in_rollup=False)
+    instance.in_rollup = False
+
+
+# Đồng bộ bảng tổng hợp doanh thu khi đơn được tạo, đổi trạng thái hoặc được sửa ở trên. Job được ghi cùng giao dịch
+# với đơn nên chỉ chạy khi đơn (và dòng đơn) đã commit; không dùng dedupe_key vì một đơn có thể đổi trạng thái nhiều lần
 @receiver(post_save, sender=Order)
-def update_product_sold_on_order_completed(sender, instance, created, **kwargs):
-    if not created and instance.status == OrderStatus.COMPLETED:
-        for item in instance.items.all():
-            product = item.product
-            product.sold = (product.sold or 0) + item.quantity
-            product.save(update_fields=['sold'])
+def sync_order_rollups_on_status_change(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not {'status', *ROLLUP_SOURCE_FIELDS} & set(update_fields)):
+        return
+    # Đơn đã có: đọc in_rollup từ DB vì instance có thể được nạp trước khi job đồng bộ cập nhật nó
+    in_rollup = instance.in_rollup if created else Order.objects.filter(pk=instance.pk).values_list('in_rollup', flat=True).first()
+    if in_rollup != (instance.status in REVENUE_STATUSES):
+        enqueue('reports.sync_order', {'order_id': instance.pk})
+
+
+# Trừ đơn khỏi bảng tổng hợp trước khi xoá (lúc này dòng đơn vẫn còn)
+@receiver(pre_delete, sender=Order)
+def discard_deleted_order_rollups(sender, instance, **kwargs):
+    discard_order_rollup(instance.pk)
+
+
+# Đồng bộ chỉ mục tìm kiếm khi sản phẩm, thương hiệu hoặc danh mục thay đổi
+@receiver(post_save, sender=Product)
+def reindex_product_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        reindex_product(instance)
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def reindex_products_on_taxonomy_save(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    products = instance.products.select_related('brand', 'category').iterator(chunk_size=1000)
+    reindex_products(products)
+
+
+# Vô hiệu cache response catalog khi dữ liệu hiển thị của sản phẩm/danh mục thay đổi
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=Promotion)
+@receiver([post_save, post_delete], sender=Review)
+@receiver(m2m_changed, sender=Promotion.products.through)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+# Bỏ barcode của sản phẩm khỏi cache tra cứu khi sản phẩm được lưu hoặc xoá
+@receiver([post_save, post_delete], sender=Product)
+def discard_cached_barcode(sender, instance, **kwargs):
+    barcode_cache.discard_product(instance.pk)
+
+
+# Dựng sẵn URL các biến thể ảnh (thumbnail, card, full) khi ảnh được lưu
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=ProductImage)
+def refresh_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_image_urls(instance)
+
+
+# Trừ review khỏi số liệu đánh giá của sản phẩm; post_delete chạy trong giao dịch xoá của Django
+# nên áp dụng cả cho xoá hàng loạt và xoá cascade (vd. khi xoá user)
+@receiver(post_delete, sender=Review)
+def discount_deleted_review(sender, instance, **kwargs):
+    apply_review_delta(Product, instance.product_id, instance.rating, -1)
+
+
+# Báo cho mọi worker nạp lại cấu hình phí (ServiceFee, bảng vùng giao hàng) sau khi giao dịch đã commit,
+# tránh worker khác đọc lại giá trị cũ và cache nó dưới phiên bản mới
+@receiver([post_save, post_delete], sender=ServiceFee)
+@receiver([post_save, post_delete], sender=ShippingZone)
+@receiver([post_save, post_delete], sender=ShippingZoneArea)
+def invalidate_fee_config(sender, **kwargs):
+    transaction.on_commit(bump_fee_config_version)
+
+
+# Nạp lại bảng giá khuyến mãi ở mọi worker khi khuyến mãi hoặc danh sách sản phẩm của nó thay đổi
+@receiver([post_save, post_delete], sender=Promotion)
+@receiver(m2m_changed, sender=Promotion.products.through)
+def invalidate_promotion_map(sender, **kwargs):
+    transaction.on_commit(bump_promotion_version)
+
+
+# Bỏ kết quả tra mã giảm giá đã cache khi admin sửa hoặc xoá mã
+@receiver([post_save, post_delete], sender=DiscountCode)
+def invalidate_discount_lookups(sender, **kwargs):
+    transaction.on_commit(bump_discount_version)
+
+
+# Ghi nhận nhập/xuất kho vào bảng tổng hợp ngay trong giao dịch tạo/xoá lịch sử kho
+@receiver(post_save, sender=StockHistory)
+def record_stock_movement(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        apply_stock_movements([instance])
+
+@receiver(post_delete, sender=StockHistory)
+def discard_stock_movement(sender, instance, **kwargs):
+    apply_stock_movements([instance], sign=-1)
@@ -1,125 +1,191 @@
 import stripe
 import json
 import traceback
+from decimal import Decimal, ROUND_HALF_UP
 from django.conf import settings
+from django.db import transaction
 from django.http import JsonResponse, HttpResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from .models import Cart, CartItem, Order, OrderItem, User
+from .models import Cart, CheckoutQuote, StockReservation
+from .jobs import enqueue
+from .orders import get_receiver_phone
+from .discounts import redeem_discount_code
+from .quotes import build_checkout_quote, quote_lines, release_checkout_quote
+from .reservations import (
+    RESERVATION_TTL, InsufficientStock, release_reservations, reserve_stock,
+)
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
+VND_TO_USD = Decimal('24000')
+
+
+# Đổi số tiền VND sang cent USD cho Stripe (làm tròn một lần, không qua float)
+def vnd_to_usd_cents(amount):
+    return int((Decimal(amount) / VND_TO_USD * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+# Đóng phiên thanh toán trên Stripe để khách không thể trả tiền cho nó nữa. Trả về True nếu phiên đã đóng
+# (vừa expire hoặc đã hết hạn từ trước); phiên đã thanh toán hoặc không gọi được Stripe thì trả về False
+def expire_checkout_session(session_id):
+    try:
+        stripe.checkout.Session.expire(session_id)
+        return True
+    except stripe.InvalidRequestError:
+        # Phiên không còn mở: chỉ coi là đã đóng khi Stripe báo hết hạn, không phải đã thanh toán
+        try:
+            return stripe.checkout.Session.retrieve(session_id).status == 'expired'
+        except stripe.StripeError:
+            return False
+    except stripe.StripeError:
+        return False
+
+
+# Huỷ các lần thanh toán chưa trả tiền trước đó của user: đóng phiên Stripe rồi mới trả hàng đang giữ,
+# bỏ báo giá và trả lượt mã giảm giá. Phiên không đóng được (đã thanh toán, webhook chưa về) giữ nguyên hàng
+# và báo giá để webhook tạo đơn đúng theo phần hàng đã giữ
+def abandon_open_checkouts(user):
+    kept = []
+    for quote in CheckoutQuote.objects.filter(user=user, order__isnull=True):
+        if quote.checkout_session_id and not expire_checkout_session(quote.checkout_session_id):
+            kept.append(quote.checkout_session_id)
+            continue
+        release_checkout_quote(quote)
+    release_reservations(StockReservation.objects.filter(user=user).exclude(checkout_session_id__in=kept))
+
+
 class StripeCheckoutSessionView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         user = request.user
         try:
-            cart = Cart.objects.get(user=user)
-            cart_items = CartItem.objects.filter(cart=cart)
+            cart = Cart.objects.for_read().get(user=user)
         except Cart.DoesNotExist:
             return JsonResponse({'error': 'Cart not found'}, status=404)
+        # Chốt báo giá theo giỏ hiện tại (một lần tính giá, phí tính lại theo địa chỉ); webhook tạo đơn đúng theo báo giá này
+        quote = build_checkout_quote(cart, receiver_phone=get_receiver_phone(user, cart))
+        products = {item.product_id: item.product for item in cart.items.all()}
 
         line_items = []
         errors = []
-        VND_TO_USD = 24000
-        subtotal = 0
-        for item in cart_items:
-            if not item.product.price or item.product.price <= 0:
-                errors.append(f"Product '{item.product.name}' has invalid price: {item.product.price}")
-            if not item.quantity or item.quantity <= 0:
-                errors.append(f"Product '{item.product.name}' has invalid quantity: {item.quantity}")
-            usd_price = float(item.product.price) / VND_TO_USD
+        for product_id, quantity, unit_price in quote_lines(quote):
+            product = products[product_id]
+            if not unit_price or unit_price <= 0:
+                errors.append(f"Product '{product.name}' has invalid price: {unit_price}")
+            if not quantity or quantity <= 0:
+                errors.append(f"Product '{product.name}' has invalid quantity: {quantity}")
             image_url = ''
-            if hasattr(item.product, 'image') and item.product.image:
+            if hasattr(product, 'image') and product.image:
                 try:
-                    image_url = item.product.image.url
+                    image_url = product.image.url
                 except Exception:
                     image_url = ''
             line_items.append({
                 'price_data': {
                     'currency': 'usd',
                     'product_data': {
-                        'name': item.product.name,
-                        'description': item.product.description or '',
+                        'name': product.name,
+                        'description': product.description or '',
                         'images': [image_url] if image_url else [],
                     },
-                    'unit_amount': int(usd_price * 100),
+                    'unit_amount': vnd_to_usd_cents(unit_price),
                 },
-                'quantity': item.quantity,
+                'quantity': quantity,
             })
-            subtotal += float(item.product.price) * item.quantity
-
-        shipping_fee = float(cart.shipping_fee) if cart.shipping_fee else 0
-        service_fee = float(cart.service_fee) if cart.service_fee else 0
-        discount = 0
-        discount_code = getattr(cart, 'discount_code', None)
-        discount_percent = 0
-        if discount_code and hasattr(discount_code, 'discount_percentage'):
-            discount_percent = float(discount_code.discount_percentage)
-            if discount_percent > 0:
-                discount = subtotal * discount_percent / 100
-
-        if shipping_fee > 0:
+
+        if quote.shipping_fee > 0:
             line_items.append({
                 'price_data': {
                     'currency': 'usd',
                     'product_data': {
                         'name': 'Phí vận chuyển',
                     },
-                    'unit_amount': int(shipping_fee / VND_TO_USD * 100),
+                    'unit_amount': vnd_to_usd_cents(quote.shipping_fee),
                 },
                 'quantity': 1,
             })
-        if service_fee > 0:
+        if quote.service_fee > 0:
             line_items.append({
                 'price_data': {
                     'currency': 'usd',
                     'product_data': {
                         'name': 'Phí dịch vụ',
                     },
-                    'unit_amount': int(service_fee / VND_TO_USD * 100),
-                },
-                'quantity': 1,
-            })
-        if discount > 0:
-            line_items.append({
-                'price_data': {
-                    'currency': 'usd',
-                    'product_data': {
-                        'name': 'Giảm giá',
-                    },
-                    'unit_amount': int(discount / VND_TO_USD * 100),
+                    'unit_amount': vnd_to_usd_cents(quote.service_fee),
                 },
                 'quantity': 1,
             })
+        if not quote.lines:
+            errors.append("Cart is empty.")
         if not user.email:
             errors.append("User does not have a valid email.")
         if errors:
             return JsonResponse({'error': ' | '.join(errors)}, status=400)
 
-        # Lưu các giá trị vào metadata để dùng lại ở webhook
+        # Đóng phiên thanh toán trước của user và trả lại hàng đang giữ rồi giữ hàng cho phiên mới
+        abandon_open_checkouts(user)
+        try:
+            reservations = reserve_stock(user, [(product_id, quantity) for product_id, quantity, _ in quote_lines(quote)])
+        except InsufficientStock as exc:
+            product = products.get(exc.product_id)
+            return JsonResponse({'error': f"Sản phẩm '{product.name if product else exc.product_id}' không đủ hàng trong kho."}, status=400)
+        reserved = StockReservation.objects.filter(pk__in=[r.pk for r in reservations])
+        # Giữ một lượt dùng mã giảm giá cho báo giá này (UPDATE có điều kiện used_count < max_uses) cùng giao dịch
+        # với việc lưu báo giá: lưu lỗi thì lượt dùng được hoàn lại. Lượt của các lần thanh toán dở trước đó
+        # đã được trả ở abandon_open_checkouts nên khách thử lại vẫn dùng được mã chỉ còn một lượt
+        try:
+            with transaction.atomic():
+                redeemed = not quote.discount_code_id or redeem_discount_code(quote.discount_code_id)
+                if redeemed:
+                    quote.save()
+        except Exception:
+            release_reservations(reserved)
+            raise
+        if not redeemed:
+            release_reservations(reserved)
+            return JsonResponse({'error': 'Mã giảm giá hết hạn hoặc đã sử dụng tối đa.'}, status=400)
+
+        # Metadata chỉ để tra cứu trên Stripe; webhook dùng báo giá đã lưu
         metadata = {
-            'subtotal': str(subtotal),
-            'shipping_fee': str(shipping_fee),
-            'service_fee': str(service_fee),
-            'discount': str(discount),
-            'discount_percent': str(discount_percent),
+            'quote_id': str(quote.pk),
+            'subtotal': str(quote.subtotal),
+            'shipping_fee': str(quote.shipping_fee),
+            'service_fee': str(quote.service_fee),
+            'discount': str(quote.discount_amount),
+            'discount_percent': str(quote.discount_percent),
+            'total': str(quote.total),
         }
 
         try:
+            # Giảm giá trừ vào số tiền thanh toán bằng coupon dùng một lần (Stripe không nhận dòng hàng giá âm)
+            discounts = []
+            if quote.discount_amount > 0:
+                coupon = stripe.Coupon.create(
+                    amount_off=vnd_to_usd_cents(quote.discount_amount), currency='usd',
+                    duration='once', max_redemptions=1, name='Giảm giá',
+                )
+                discounts.append({'coupon': coupon.id})
             session = stripe.checkout.Session.create(
                 payment_method_types=['card'],
                 line_items=line_items,
+                discounts=discounts,
                 mode='payment',
                 success_url=settings.STRIPE_SUCCESS_URL,
                 cancel_url=settings.STRIPE_CANCEL_URL,
                 customer_email=user.email,
                 metadata=metadata,
+                expires_at=int(quote.expires_at.timestamp()),
             )
+            reserved.update(checkout_session_id=session.id)
+            CheckoutQuote.objects.filter(pk=quote.pk).update(checkout_session_id=session.id)
             return JsonResponse({'checkout_url': session.url})
         except Exception as e:
+            release_reservations(reserved)
+            release_checkout_quote(quote)
             print('Stripe error:', str(e))
             print(traceback.format_exc())
             return JsonResponse({'error': str(e)}, status=500)
@@ -138,80 +204,20 @@ def stripe_webhook(request):
         print('Webhook error:', str(e))
         return HttpResponse(status=400)
 
-    # Xử lý sự kiện thanh toán thành công
+    # Chỉ xếp sự kiện vào hàng đợi rồi trả 200 ngay; tạo đơn, trả kho và thông báo do manage.py run_workers xử lý.
+    # Stripe gửi lại sự kiện thì id sự kiện trùng nên không tạo job mới
+    session = event['data']['object']
     if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        email = session.get('customer_email')
-        metadata = session.get('metadata', {})
-        try:
-            user = User.objects.get(email=email)
-            cart = Cart.objects.get(user=user)
-            cart_items = CartItem.objects.filter(cart=cart)
-            from decimal import Decimal
-            from .models import calculate_order_total
-            # Tính lại giá trị từ DB
-            cart_total = sum([Decimal(str(item.product.price)) * item.quantity for item in cart_items])
-            shipping_fee = Decimal(str(cart.shipping_fee)) if cart.shipping_fee else Decimal('0')
-            service_fee = Decimal(str(cart.service_fee)) if cart.service_fee else Decimal('0')
-            discount_amount = Decimal('0')
-            discount_code = getattr(cart, 'discount_code', None)
-            if discount_code and hasattr(discount_code, 'discount_percentage'):
-                discount_percent = Decimal(str(discount_code.discount_percentage))
-                if discount_percent > 0:
-                    discount_amount = cart_total * discount_percent / Decimal('100')
-            total_price = calculate_order_total(cart_total, shipping_fee, service_fee, discount_amount)
-            if total_price < 0:
-                total_price = Decimal('0')
-            # Lấy địa chỉ giao hàng từ giỏ hàng hoặc user
-            address = cart.address if cart and cart.address else user.address
-            # Lấy số điện thoại giao hàng: ưu tiên cart, sau đó user, nếu không có thì để trống
-            receiver_phone = None
-            if hasattr(cart, 'receiver_phone') and cart.receiver_phone:
-                receiver_phone = cart.receiver_phone
-            elif hasattr(cart, 'address') and cart.address:
-                # Nếu cart có address, thử lấy UserAddress mặc định
-                try:
-                    from .models import UserAddress
-                    user_address = UserAddress.objects.filter(user=user, address=cart.address).first()
-                    if user_address and user_address.phone:
-                        receiver_phone = user_address.phone
-                except Exception:
-                    pass
-            if not receiver_phone and user.phone:
-                receiver_phone = user.phone
-            order = Order.objects.create(
-                user=user,
-                status='paid',
-                total_price=total_price,
-                order_type='delivery',
-                discount_code=discount_code,
-                address=address,
-                shipping_fee=shipping_fee,
-                receiver_phone=receiver_phone
-            )
-            for item in cart_items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    price=item.product.price,
-                )
-                # Giảm stock và tăng sold cho sản phẩm
-                product = item.product
-                if product.stock is not None:
-                    product.stock = max(product.stock - item.quantity, 0)
-                if product.sold is not None:
-                    product.sold += item.quantity
-                product.save(update_fields=["stock", "sold"])
-            # Đảm bảo discount_code đã được lưu vào order trước khi xóa khỏi cart
-            cart_items.delete()
-            cart.discount_code = None
-            # Reset shipping_fee, service_fee, and address after successful payment
-            cart.shipping_fee = 0
-            cart.service_fee = 0
-            cart.address = ""
-            cart.save(update_fields=['shipping_fee', 'service_fee', 'address', 'discount_code'])
-        except Exception as e:
-            print('Order creation error:', str(e))
-            return HttpResponse(status=400)
+        enqueue(
+            'stripe.checkout_completed',
+            {'session_id': session.get('id'), 'email': session.get('customer_email')},
+            dedupe_key=f"stripe:{event['id']}" if event.get('id') else None,
+        )
+    # Phiên thanh toán hết hạn hoặc bị huỷ: trả lại hàng đang giữ
+    elif event['type'] == 'checkout.session.expired':
+        enqueue(
+            'stripe.checkout_expired',
+            {'session_id': session.get('id')},
+            dedupe_key=f"stripe:{event['id']}" if event.get('id') else None,
+        )
     return HttpResponse(status=200)
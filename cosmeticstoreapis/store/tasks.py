@@ -0,0 +1,48 @@
+from django.db import transaction
+from .jobs import enqueue, job_handler
+from .models import CheckoutQuote, Notification, Order, StockReservation, User, UserNotification
+from .orders import create_order_from_cart, create_order_from_quote
+from .quotes import release_checkout_quote
+from .reservations import release_reservations
+from .rollups import sync_order_rollup
+
+
+# Tạo đơn hàng từ sự kiện checkout.session.completed của Stripe theo báo giá đã chốt, sau đó xếp job thông báo cho khách
+@job_handler('stripe.checkout_completed')
+def process_checkout_completed(payload):
+    session_id = payload.get('session_id')
+    if session_id and CheckoutQuote.objects.filter(checkout_session_id=session_id).exists():
+        order = create_order_from_quote(session_id)
+    else:
+        order = create_order_from_cart(User.objects.get(email=payload['email']), session_id)
+    if order is not None:
+        enqueue('order.notify_paid', {'order_id': order.pk}, dedupe_key=f'order-paid:{order.pk}')
+
+
+# Phiên hết hạn mà chưa thanh toán: trả lại hàng đang giữ, bỏ báo giá và trả lượt mã giảm giá
+@job_handler('stripe.checkout_expired')
+def process_checkout_expired(payload):
+    release_reservations(StockReservation.objects.filter(checkout_session_id=payload['session_id']))
+    for quote in CheckoutQuote.objects.filter(checkout_session_id=payload['session_id'], order__isnull=True):
+        release_checkout_quote(quote)
+
+
+# Thông báo thanh toán gắn với đơn qua nội dung cố định theo mã đơn: job chạy lại (lỗi giữa chừng, worker chết
+# trước khi ghi nhận kết quả) dùng lại thông báo đã có thay vì gửi trùng cho khách
+@job_handler('order.notify_paid')
+def notify_order_paid(payload):
+    order = Order.objects.get(pk=payload['order_id'])
+    fields = {
+        'title': 'Đơn hàng đã được thanh toán',
+        'message': f'Đơn hàng #{order.pk} đã được thanh toán thành công. Cảm ơn bạn đã mua hàng!',
+        'notification_type': 'order',
+    }
+    with transaction.atomic():
+        notification = Notification.objects.filter(**fields).order_by('id').first() or Notification.objects.create(**fields)
+        UserNotification.objects.get_or_create(user_id=order.user_id, notification=notification)
+
+
+# Cộng/trừ đơn vào bảng tổng hợp doanh thu theo trạng thái hiện tại; an toàn khi chạy lại
+@job_handler('reports.sync_order')
+def sync_order_rollups(payload):
+    sync_order_rollup(payload['order_id'])
@@ -1,3 +1,1010 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Sum
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application
+from rest_framework.test import APIClient
+from store.models import (
+    Brand, Cart, CartItem, Category, CheckoutQuote, DailyProductSales, DailySales, DiscountCode, Job, JobStatus, Notification, Order,
+    OrderItem, OrderStatus, Product, Promotion, ReservationStatus, Review, ServiceFee, ShippingZone, ShippingZoneArea,
+    StockHistory, StockReservation, User, UserNotification, recalculate_cart_fees,
+)
+from store.barcodes import barcode_cache
+from store.caching import get_catalog_version
+from store.discounts import is_discount_usable, lookup_discount_code, redeem_discount_code, release_discount_code
+from store.facets import apply_catalog_filters, compute_facets
+from store.fees import fee_config_cache, get_fee_config
+from store.jobs import claim_jobs, enqueue, job_handler, run_job
+from store.orders import create_order_from_cart, create_order_from_quote
+from store.pricing import price_cart
+from store.promotions import effective_price, promotion_map_cache
+from store.quotes import build_checkout_quote, quote_lines
+from store.ratings import rating_star
+from store.management.commands.benchmark_order_search import writable_created_at
+from store.reporting import REVENUE_STATUSES, daily_order_stats, day_bounds, sales_series, store_timezone, store_today
+from store.reservations import InsufficientStock, commit_reservations, release_reservations, reserve_stock
+from store.rollups import local_day, rebuild_rollups, sync_order_rollup
+from store.search import search_products
+from store.tasks import notify_order_paid
 
-# Create your tests here.
+
+def create_product(stock):
+    brand = Brand.objects.create(name='Brand')
+    category = Category.objects.create(name='Category')
+    return Product.objects.create(name='Sản phẩm', price=1000, stock=stock, brand=brand, category=category)
+
+
+# Chạy hết job đang sẵn sàng ngay trong luồng test (run_workers dùng luồng riêng, không thấy giao dịch của TestCase)
+def run_queued_jobs():
+    while True:
+        jobs = claim_jobs('test', 100)
+        if not jobs:
+            return
+        for job in jobs:
+            run_job(job, 'test')
+
+
+# Client gọi API bằng access token OAuth2 (các view kiểm tra scope của token)
+def api_client(user):
+    application = Application.objects.create(
+        name='test', user=user, client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_PASSWORD,
+    )
+    token = AccessToken.objects.create(
+        user=user, application=application, token=f'token-{user.pk}', scope='read write',
+        expires=timezone.now() + timedelta(days=1),
+    )
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.token}')
+    return client
+
+
+def held_quantity(product):
+    return StockReservation.objects.filter(product=product, status=ReservationStatus.ACTIVE).aggregate(
+        total=Sum('quantity'))['total'] or 0
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x')
+        self.product = create_product(stock=5)
+
+    def test_reserve_takes_stock_and_rejects_shortage(self):
+        reserve_stock(self.user, [(self.product.pk, 3)])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+        with self.assertRaises(InsufficientStock):
+            reserve_stock(self.user, [(self.product.pk, 3)])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+
+    def test_reserve_invalidates_cached_catalog(self):
+        version = get_catalog_version()
+        reserve_stock(self.user, [(self.product.pk, 1)])
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_release_returns_stock_once(self):
+        reserve_stock(self.user, [(self.product.pk, 4)])
+        reservations = StockReservation.objects.filter(user=self.user)
+        self.assertEqual(release_reservations(reservations), 1)
+        self.assertEqual(release_reservations(reservations), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+        self.assertEqual(held_quantity(self.product), 0)
+
+    def test_commit_moves_held_units_to_sold(self):
+        reservations = reserve_stock(self.user, [(self.product.pk, 2)])
+        StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(checkout_session_id='cs_1')
+        self.assertEqual(commit_reservations('cs_1', [(self.product.pk, 2)]), {})
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sold), (3, 2))
+        self.assertFalse(StockReservation.objects.filter(status=ReservationStatus.ACTIVE).exists())
+
+    def test_commit_without_hold_reports_shortfall(self):
+        # Giữ hàng đã hết hạn và phần tồn kho đã bán cho người khác: không trừ kho xuống dưới 0 mà báo thiếu
+        reservations = reserve_stock(self.user, [(self.product.pk, 3)])
+        StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(checkout_session_id='cs_1')
+        release_reservations(StockReservation.objects.filter(checkout_session_id='cs_1'))
+        Product.objects.filter(pk=self.product.pk).update(stock=1)
+        self.assertEqual(commit_reservations('cs_1', [(self.product.pk, 3)]), {self.product.pk: 2})
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sold), (0, 3))
+
+    def test_completing_paid_order_does_not_count_sold_again(self):
+        # sold được cộng khi xác nhận giữ hàng lúc thanh toán; hoàn tất đơn không cộng lần nữa
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        reservations = reserve_stock(self.user, [(self.product.pk, 2)])
+        StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(checkout_session_id='cs_1')
+        order = create_order_from_cart(self.user, 'cs_1')
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sold), (3, 2))
+        order.status = OrderStatus.COMPLETED
+        order.save()
+        run_queued_jobs()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sold), (3, 2))
+
+
+# Nhiều luồng cùng thanh toán một sản phẩm: tồn kho + đã bán + đang giữ luôn bằng số ban đầu và không bán vượt;
+# nhiều luồng cùng dùng một mã giảm giá không vượt max_uses.
+# Cần DB có khoá dòng (MySQL/PostgreSQL); SQLite báo "database is locked" khi nhiều luồng cùng ghi
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentCheckoutTests(TransactionTestCase):
+    THREADS = 20
+    STOCK = 7
+
+    def test_concurrent_checkouts_never_oversell(self):
+        product = create_product(stock=self.STOCK)
+        users = [User.objects.create_user(username=f'user-{i}', password='x') for i in range(self.THREADS)]
+        results = {'reserved': 0, 'rejected': 0, 'errors': []}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(users))
+
+        def checkout(user):
+            try:
+                barrier.wait()
+                try:
+                    reservations = reserve_stock(user, [(product.pk, 1)])
+                except InsufficientStock:
+                    outcome = 'rejected'
+                else:
+                    session_id = f'cs-{user.pk}'
+                    StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(checkout_session_id=session_id)
+                    commit_reservations(session_id, [(product.pk, 1)])
+                    outcome = 'reserved'
+                with lock:
+                    results[outcome] += 1
+            except Exception as exc:
+                with lock:
+                    results['errors'].append(repr(exc))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=checkout, args=(user,)) for user in users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        product.refresh_from_db()
+        self.assertEqual(results['errors'], [])
+        self.assertGreaterEqual(product.stock, 0)
+        self.assertEqual(product.stock + product.sold + held_quantity(product), self.STOCK)
+        self.assertEqual(product.sold, results['reserved'])
+        self.assertEqual(product.sold, self.STOCK)
+        self.assertEqual(results['rejected'], self.THREADS - self.STOCK)
+
+    def test_concurrent_redeems_never_exceed_max_uses(self):
+        now = timezone.now()
+        code = DiscountCode.objects.create(
+            code='RUSH', discount_percentage=10, max_uses=3, valid_from=now - timedelta(days=1), valid_to=now + timedelta(days=1),
+        )
+        outcomes = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def redeem():
+            try:
+                barrier.wait()
+                outcomes.append(redeem_discount_code(code.pk))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=redeem) for _ in range(self.THREADS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        code.refresh_from_db()
+        self.assertEqual(outcomes.count(True), 3)
+        self.assertEqual(code.used_count, 3)
+
+
+class ImportProductsTests(TestCase):
+    def import_lines(self, *lines):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8', delete=False) as stream:
+            stream.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.remove, stream.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_products', stream.name, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_malformed_line_is_reported_and_import_continues(self):
+        new = {'barcode': 'B1', 'name': 'Son', 'price': '100', 'brand': 'Brand', 'category': 'Category', 'image': 'products/son'}
+        stdout, stderr = self.import_lines('{"barcode": "B0",', json.dumps(new))
+        self.assertIn('Dòng 1: JSON không hợp lệ', stderr)
+        self.assertIn('1 tạo mới, 0 cập nhật, 1 lỗi', stdout)
+        product = Product.objects.get(barcode='B1')
+        self.assertEqual(product.image.public_id, 'products/son')
+        self.assertIn('products/son', product.image_urls['thumbnail'])
+
+    def test_unchanged_rows_are_not_counted_as_updated(self):
+        product = create_product(stock=5)
+        Product.objects.filter(pk=product.pk).update(barcode='B1')
+        stdout, _ = self.import_lines(
+            json.dumps({'barcode': 'B1', 'name': 'Sản phẩm', 'quantity': 2}),
+            json.dumps({'barcode': 'B1', 'name': 'Sản phẩm', 'price': '1000'}),
+        )
+        self.assertIn('0 tạo mới, 0 cập nhật, 0 lỗi', stdout)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 7)
+
+    def test_export_then_import_into_empty_catalog_keeps_stock(self):
+        product = create_product(stock=5)
+        Product.objects.filter(pk=product.pk).update(barcode='B1', sold=3)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as stream:
+            pass
+        self.addCleanup(os.remove, stream.name)
+        call_command('export_products', stream.name, stdout=io.StringIO())
+        Product.objects.all().delete()
+        call_command('import_products', stream.name, stdout=io.StringIO(), stderr=io.StringIO())
+        imported = Product.objects.get(barcode='B1')
+        self.assertEqual((imported.stock, imported.sold), (5, 3))
+
+
+# Handler dùng trong test: lỗi cho tới khi payload['fail'] lần chạy đã qua
+flaky_runs = []
+
+
+@job_handler('test.flaky')
+def flaky_job(payload):
+    flaky_runs.append(payload)
+    if len(flaky_runs) <= payload.get('fail', 0):
+        raise RuntimeError('lỗi tạm thời')
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x')
+        flaky_runs.clear()
+
+    def make_ready(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+    def test_enqueue_with_same_dedupe_key_returns_existing_job(self):
+        first = enqueue('test.flaky', {'n': 1}, dedupe_key='once')
+        second = enqueue('test.flaky', {'n': 2}, dedupe_key='once')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.filter(kind='test.flaky').count(), 1)
+        self.assertNotEqual(enqueue('test.flaky').pk, enqueue('test.flaky').pk)
+
+    def test_claim_leases_ready_jobs_once_and_reclaims_expired_leases(self):
+        ready = enqueue('test.flaky')
+        enqueue('test.flaky', delay=timedelta(minutes=5))
+        self.assertEqual([job.pk for job in claim_jobs('worker-a', 10)], [ready.pk])
+        self.assertEqual(claim_jobs('worker-b', 10), [])
+        ready.refresh_from_db()
+        self.assertEqual((ready.status, ready.locked_by, ready.attempts), (JobStatus.RUNNING, 'worker-a', 1))
+        # worker-a chết: hết hạn thuê thì worker khác nhận lại, kết quả của worker cũ không còn được ghi
+        Job.objects.filter(pk=ready.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [reclaimed] = claim_jobs('worker-b', 10)
+        self.assertEqual((reclaimed.pk, reclaimed.attempts), (ready.pk, 2))
+        self.assertFalse(run_job(ready, 'worker-a'))
+        self.assertTrue(run_job(reclaimed, 'worker-b'))
+        self.assertEqual(Job.objects.get(pk=ready.pk).status, JobStatus.SUCCEEDED)
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        job = enqueue('test.flaky', {'fail': 1})
+        with self.assertLogs('store.jobs', 'WARNING'):
+            run_queued_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('lỗi tạm thời', job.last_error)
+        self.make_ready(job)
+        run_queued_jobs()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, JobStatus.SUCCEEDED)
+
+        hopeless = enqueue('test.flaky', {'fail': 99}, max_attempts=2)
+        with self.assertLogs('store.jobs', 'WARNING'):
+            run_queued_jobs()
+        self.make_ready(hopeless)
+        with self.assertLogs('store.jobs', 'ERROR'):
+            run_queued_jobs()
+        hopeless.refresh_from_db()
+        self.assertEqual((hopeless.status, hopeless.attempts), (JobStatus.FAILED, 2))
+
+    def test_paid_notification_is_sent_once_when_job_is_retried(self):
+        order = Order.objects.create(user=self.user, status=OrderStatus.PAID, total_price=1000)
+        job = enqueue('order.notify_paid', {'order_id': order.pk}, dedupe_key=f'order-paid:{order.pk}')
+        # Lần chạy đầu lỗi sau khi tạo thông báo: giao dịch của handler huỷ cả thông báo
+        with mock.patch.object(UserNotification.objects, 'get_or_create', side_effect=DatabaseError('mất kết nối')):
+            with self.assertLogs('store.jobs', 'WARNING'):
+                run_queued_jobs()
+        self.assertFalse(Notification.objects.exists())
+        self.make_ready(job)
+        run_queued_jobs()
+        notify_order_paid({'order_id': order.pk})
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(UserNotification.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, JobStatus.SUCCEEDED)
+
+
+def _rollup_row(revenue=0, order_count=0, units_sold=0, imports=0, exports=0):
+    return (Decimal(revenue).quantize(Decimal('0.01')), order_count, units_sold, imports, exports)
+
+
+# Bảng tổng hợp tính lại từ đầu bằng Python trên dữ liệu gốc, bỏ các dòng toàn số 0
+def fresh_rollups():
+    days = defaultdict(lambda: [Decimal('0'), 0, 0, 0, 0])
+    products = defaultdict(lambda: [Decimal('0'), 0, 0, 0, 0])
+    for order in Order.objects.filter(status__in=REVENUE_STATUSES).prefetch_related('items'):
+        day = local_day(order.created_at)
+        days[day][0] += order.total_price
+        days[day][1] += 1
+        for product_id in {item.product_id for item in order.items.all()}:
+            products[(day, product_id)][1] += 1
+        for item in order.items.all():
+            days[day][2] += item.quantity
+            products[(day, item.product_id)][0] += item.price * item.quantity
+            products[(day, item.product_id)][2] += item.quantity
+    for history in StockHistory.objects.all():
+        day = local_day(history.created_at)
+        index = 3 if history.change > 0 else 4
+        days[day][index] += abs(history.change)
+        products[(day, history.product_id)][index] += abs(history.change)
+    empty = _rollup_row()
+    return (
+        {day: row for day, values in days.items() if (row := _rollup_row(*values)) != empty},
+        {key: row for key, values in products.items() if (row := _rollup_row(*values)) != empty},
+    )
+
+
+def stored_rollups():
+    fields = ('revenue', 'order_count', 'units_sold', 'imports', 'exports')
+    empty = _rollup_row()
+    days = {row[0]: _rollup_row(*row[1:]) for row in DailySales.objects.values_list('day', *fields)}
+    products = {(row[0], row[1]): _rollup_row(*row[2:]) for row in DailyProductSales.objects.values_list('day', 'product_id', *fields)}
+    return (
+        {day: row for day, row in days.items() if row != empty},
+        {key: row for key, row in products.items() if row != empty},
+    )
+
+
+# Đơn một dòng với thời điểm tạo tuỳ ý, đã đồng bộ vào bảng tổng hợp
+def create_order(user, product, total_price, quantity=1, status=OrderStatus.PAID, created_at=None):
+    with writable_created_at():
+        order = Order.objects.create(user=user, status=status, total_price=total_price, created_at=created_at or timezone.now())
+    OrderItem.objects.create(order=order, product=product, quantity=quantity, price=Decimal(total_price) / quantity)
+    run_queued_jobs()
+    return order
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x')
+        self.product = create_product(stock=10)
+
+    def create_order(self, total_price, quantity=1, status=OrderStatus.PAID, created_at=None, product=None):
+        return create_order(self.user, product or self.product, total_price, quantity, status, created_at)
+
+    def daily_revenue(self):
+        return DailySales.objects.aggregate(total=Sum('revenue'))['total'] or 0
+
+    def test_incremental_updates_and_rebuild_match_fresh_aggregate(self):
+        other = Product.objects.create(name='Kem', price=500, stock=10, brand=self.product.brand, category=self.product.category)
+        today_start, _ = day_bounds(store_today())
+        yesterday = today_start - timedelta(minutes=1)
+        with writable_created_at():
+            paid = Order.objects.create(user=self.user, status=OrderStatus.PAID, total_price=1200, created_at=today_start)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=paid, product=self.product, quantity=2, price=300),
+            OrderItem(order=paid, product=other, quantity=1, price=200),
+            OrderItem(order=paid, product=self.product, quantity=1, price=300),
+        ])
+        self.create_order(Decimal('800'), status=OrderStatus.COMPLETED, created_at=yesterday, product=other)
+        pending = self.create_order(Decimal('500'), status=OrderStatus.PENDING, created_at=yesterday)
+        cancelled = self.create_order(Decimal('700'), created_at=yesterday)
+        removed = self.create_order(Decimal('900'))
+        pending.status = OrderStatus.PAID
+        pending.save()
+        # cancelled được nạp trước khi job đồng bộ đánh dấu in_rollup
+        cancelled.status = OrderStatus.CANCELLED
+        cancelled.save(update_fields=['status'])
+        run_queued_jobs()
+        removed.delete()
+        StockHistory.objects.create(product=self.product, change=5)
+        StockHistory.objects.create(product=other, change=-2)
+        StockHistory.objects.create(product=other, change=4).delete()
+        expected = fresh_rollups()
+        self.assertEqual(len(expected[0]), 2)
+        self.assertEqual(stored_rollups(), expected)
+        # Các lần sync lặp lại không cộng trùng
+        for order_id in Order.objects.values_list('pk', flat=True):
+            self.assertFalse(sync_order_rollup(order_id))
+        self.assertEqual(stored_rollups(), expected)
+
+        DailySales.objects.all().delete()
+        DailyProductSales.objects.filter(product=other).update(revenue=0, units_sold=99)
+        Order.objects.update(in_rollup=False)
+        rebuild_rollups(chunk_days=1)
+        self.assertEqual(stored_rollups(), expected)
+        self.assertEqual(
+            set(Order.objects.filter(in_rollup=True).values_list('pk', flat=True)),
+            set(Order.objects.filter(status__in=REVENUE_STATUSES).values_list('pk', flat=True)),
+        )
+
+    def test_editing_total_of_counted_order_reapplies_rollup(self):
+        order = self.create_order(1000)
+        self.assertEqual(self.daily_revenue(), 1000)
+        order.total_price = Decimal('700')
+        order.save()
+        run_queued_jobs()
+        self.assertEqual(self.daily_revenue(), 700)
+        order.refresh_from_db()
+        self.assertTrue(order.in_rollup)
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name='Brand')
+        self.other_brand = Brand.objects.create(name='Other')
+        self.category = Category.objects.create(name='Category')
+        for name, price, stock, brand, skin_type in (
+            ('A', 50000, 3, self.brand, 'oily'),
+            ('B', 150000, 0, self.brand, 'dry'),
+            ('C', 150000, 2, self.other_brand, 'oily'),
+        ):
+            Product.objects.create(name=name, price=price, stock=stock, brand=brand, category=self.category, skin_type=skin_type)
+
+    def filtered_names(self, query):
+        return sorted(apply_catalog_filters(Product.objects.all(), QueryDict(query)).values_list('name', flat=True))
+
+    def test_in_stock_filter_ignores_unrecognised_values(self):
+        self.assertEqual(self.filtered_names('in_stock=true'), ['A', 'C'])
+        self.assertEqual(self.filtered_names('in_stock=0'), ['B'])
+        self.assertEqual(self.filtered_names('in_stock='), ['A', 'B', 'C'])
+        self.assertEqual(self.filtered_names('in_stock=abc'), ['A', 'B', 'C'])
+
+    def test_facet_counts_follow_filters(self):
+        facets = compute_facets(apply_catalog_filters(Product.objects.all(), QueryDict('skin_type=oily')))
+        self.assertEqual([(item['name'], item['count']) for item in facets['brand']], [('Brand', 1), ('Other', 1)])
+        self.assertEqual(facets['skin_type'], [{'value': 'oily', 'count': 2}])
+        self.assertEqual({item['key']: item['count'] for item in facets['price']}['100k_200k'], 1)
+        self.assertEqual(facets['in_stock'], {'true': 2, 'false': 0})
+
+
+class DiscountTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.code = DiscountCode.objects.create(
+            code='SALE10', discount_percentage=10, max_uses=1,
+            valid_from=now - timedelta(days=1), valid_to=now + timedelta(days=1),
+        )
+
+    def test_redeem_stops_at_max_uses_and_refreshes_cached_lookup(self):
+        self.assertTrue(is_discount_usable(lookup_discount_code(' sale10 ')))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(redeem_discount_code(self.code.pk))
+        self.assertFalse(redeem_discount_code(self.code.pk))
+        self.code.refresh_from_db()
+        self.assertEqual(self.code.used_count, 1)
+        self.assertFalse(is_discount_usable(lookup_discount_code('SALE10')))
+        with self.captureOnCommitCallbacks(execute=True):
+            release_discount_code(self.code.pk)
+        self.assertTrue(is_discount_usable(lookup_discount_code('SALE10')))
+
+    def test_inactive_or_expired_code_is_not_redeemed(self):
+        DiscountCode.objects.filter(pk=self.code.pk).update(max_uses=None, is_active=False)
+        self.assertFalse(redeem_discount_code(self.code.pk))
+        DiscountCode.objects.filter(pk=self.code.pk).update(is_active=True, valid_to=timezone.now() - timedelta(minutes=1))
+        self.assertFalse(redeem_discount_code(self.code.pk))
+        self.code.refresh_from_db()
+        self.assertEqual(self.code.used_count, 0)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        brand = Brand.objects.create(name='Maybelline')
+        category = Category.objects.create(name='Trang điểm')
+        for name in ('Son môi đỏ', 'Son dưỡng', 'Sữa rửa mặt'):
+            Product.objects.create(name=name, price=1000, brand=brand, category=category)
+
+    def search(self, query):
+        return list(search_products(Product.objects.all(), query).values_list('name', flat=True))
+
+    def test_matches_without_diacritics_and_by_prefix(self):
+        self.assertEqual(sorted(self.search('son moi')), ['Son môi đỏ'])
+        self.assertEqual(sorted(self.search('SỮA RỬA')), ['Sữa rửa mặt'])
+        self.assertEqual(sorted(self.search('so')), ['Son dưỡng', 'Son môi đỏ'])
+        self.assertEqual(sorted(self.search('maybell')), ['Son dưỡng', 'Son môi đỏ', 'Sữa rửa mặt'])
+
+    def test_every_term_must_match_even_when_last_term_prefixes_an_earlier_one(self):
+        # "son s": token "son" vừa khớp từ đầy đủ vừa là mở rộng của "s"
+        self.assertEqual(sorted(self.search('son s')), ['Son dưỡng', 'Son môi đỏ'])
+        self.assertEqual(self.search('son xyz'), [])
+
+    def test_reindexes_when_product_is_renamed(self):
+        product = Product.objects.get(name='Sữa rửa mặt')
+        product.name = 'Kem chống nắng'
+        product.save()
+        self.assertEqual(self.search('sua'), [])
+        self.assertEqual(self.search('chong nang'), ['Kem chống nắng'])
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='x')
+        self.client = api_client(self.user)
+        self.product = create_product(stock=10)
+        self.url = f'/products/{self.product.pk}/'
+
+    def test_etag_returns_304_until_product_changes(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+        self.product.price = 2000
+        self.product.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertEqual(Decimal(changed.json()['price']), 2000)
+
+    def test_stock_changes_outside_model_save_invalidate_cached_detail(self):
+        self.assertEqual(self.client.get(self.url).json()['stock'], 10)
+        reservations = reserve_stock(self.user, [(self.product.pk, 3)])
+        self.assertEqual(self.client.get(self.url).json()['stock'], 7)
+        release_reservations(StockReservation.objects.filter(pk__in=[r.pk for r in reservations]))
+        self.assertEqual(self.client.get(self.url).json()['stock'], 10)
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.product = create_product(stock=1)
+        self.users = [User.objects.create_user(username=f'user-{i}', password='x') for i in range(3)]
+
+    def assert_aggregates_match_reviews(self):
+        self.product.refresh_from_db()
+        ratings = list(Review.objects.filter(product=self.product).values_list('rating', flat=True))
+        self.assertEqual(self.product.review_count, len(ratings))
+        self.assertAlmostEqual(self.product.rating_sum, sum(ratings))
+        self.assertAlmostEqual(self.product.rating_avg, sum(ratings) / len(ratings) if ratings else 0.0)
+        for star in (1, 2, 3, 4, 5):
+            self.assertEqual(getattr(self.product, f'rating_{star}'), sum(1 for r in ratings if rating_star(r) == star))
+
+    def test_create_edit_and_delete_update_aggregates(self):
+        reviews = [Review.objects.create(user=user, product=self.product, rating=rating) for user, rating in zip(self.users, (5, 4, 2))]
+        self.assert_aggregates_match_reviews()
+        reviews[1].rating = 4.5
+        reviews[1].save()
+        self.assert_aggregates_match_reviews()
+        self.assertEqual((self.product.rating_4, self.product.rating_5), (0, 2))
+        reviews[0].delete()
+        self.assert_aggregates_match_reviews()
+        Review.objects.filter(pk=reviews[2].pk).delete()
+        self.assert_aggregates_match_reviews()
+
+    def test_saving_stale_product_keeps_aggregates(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        Review.objects.create(user=self.users[0], product=self.product, rating=5)
+        stale.name = 'Tên mới'
+        stale.save()
+        self.assert_aggregates_match_reviews()
+        self.assertEqual(self.product.name, 'Tên mới')
+
+
+# Cấu hình phí và bảng khuyến mãi được nhớ trong process, còn signal chỉ báo đổi phiên bản sau commit
+# (không chạy trong TestCase): xoá cache sau khi dựng dữ liệu
+def reset_config_caches():
+    cache.clear()
+    fee_config_cache.clear()
+    promotion_map_cache.clear()
+
+
+class CartPricingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x')
+        self.lipstick = create_product(stock=10)
+        self.cream = Product.objects.create(
+            name='Kem', price=Decimal('50000'), stock=10, brand=self.lipstick.brand, category=self.lipstick.category,
+        )
+        Product.objects.filter(pk=self.lipstick.pk).update(price=Decimal('100000'))
+        ServiceFee.objects.create(percent=2, free_shipping_threshold=500000, default_shipping_fee=40000)
+        now = timezone.now()
+        self.code = DiscountCode.objects.create(
+            code='SALE10', discount_percentage=10, valid_from=now - timedelta(days=1), valid_to=now + timedelta(days=1),
+        )
+        self.cart = Cart.objects.create(user=self.user, address='12 Lê Lợi, Quận 1, TP HCM')
+        CartItem.objects.create(cart=self.cart, product=self.lipstick, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.cream, quantity=1)
+        reset_config_caches()
+
+    def price(self):
+        return price_cart(Cart.objects.get(pk=self.cart.pk), refresh=True)
+
+    def test_prices_lines_fees_and_discount_code(self):
+        Cart.objects.filter(pk=self.cart.pk).update(discount_code=self.code)
+        price = self.price()
+        self.assertEqual((price.subtotal, price.quantity, price.line_count), (Decimal('250000.00'), 3, 2))
+        self.assertEqual(price.shipping_fee, 30000)
+        self.assertEqual(price.service_fee, 5000)
+        self.assertEqual(price.discount_amount, 25000)
+        self.assertEqual(price.total, Decimal('260000.00'))
+
+    def test_order_from_cart_matches_cart_price_and_empties_cart(self):
+        Cart.objects.filter(pk=self.cart.pk).update(discount_code=self.code)
+        recalculate_cart_fees(Cart.objects.get(pk=self.cart.pk))
+        expected = self.price()
+        order = create_order_from_cart(self.user)
+        self.assertEqual((order.total_price, order.shipping_fee, order.discount_code_id), (expected.total, 30000, self.code.pk))
+        items = {item.product_id: item for item in order.items.all()}
+        self.assertEqual((items[self.lipstick.pk].quantity, items[self.lipstick.pk].price), (2, Decimal('100000.00')))
+        self.assertEqual(items[self.cream.pk].product_name, 'Kem')
+        self.code.refresh_from_db()
+        self.assertEqual(self.code.used_count, 1)
+        self.cream.refresh_from_db()
+        self.assertEqual((self.cream.stock, self.cream.sold), (9, 1))
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+        self.assertIsNone(Cart.objects.get(pk=self.cart.pk).discount_code_id)
+        # Webhook gửi lặp lại khi giỏ đã rỗng: không tạo đơn thứ hai
+        self.assertIsNone(create_order_from_cart(self.user))
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
+    def test_promotions_price_lines_and_follow_their_window(self):
+        now = timezone.now()
+        promotion = Promotion.objects.create(
+            name='Hè', discount_percentage=20, valid_from=now - timedelta(hours=1), valid_to=now + timedelta(hours=1),
+        )
+        promotion.products.add(self.lipstick)
+        better = Promotion.objects.create(
+            name='Flash', discount_percentage=25, valid_from=now - timedelta(hours=1), valid_to=now + timedelta(hours=1),
+        )
+        better.products.add(self.lipstick)
+        Promotion.objects.create(
+            name='Sắp tới', discount_percentage=50, valid_from=now + timedelta(days=1), valid_to=now + timedelta(days=2),
+        ).products.add(self.cream)
+        Cart.objects.filter(pk=self.cart.pk).update(discount_code=self.code)
+        reset_config_caches()
+        self.assertEqual(effective_price(Product.objects.get(pk=self.lipstick.pk)), Decimal('75000.00'))
+        self.assertEqual(effective_price(Product.objects.get(pk=self.cream.pk)), Decimal('50000'))
+        price = self.price()
+        # 2 x 75.000 + 50.000, giảm 10% trên tạm tính đã khuyến mãi
+        self.assertEqual(price.subtotal, Decimal('200000.00'))
+        self.assertEqual(price.discount_amount, 20000)
+        self.assertEqual(price.total, Decimal('200000.00') + 30000 + 4000 - 20000)
+        Promotion.objects.filter(pk__in=[promotion.pk, better.pk]).update(is_active=False)
+        reset_config_caches()
+        self.assertEqual(self.price().subtotal, Decimal('250000.00'))
+
+    def test_prices_are_memoised_on_the_cart(self):
+        cart = Cart.objects.get(pk=self.cart.pk)
+        first = price_cart(cart, refresh=True)
+        with self.assertNumQueries(0):
+            self.assertIs(price_cart(cart), first)
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x')
+        self.client = api_client(self.user)
+        self.first = create_product(stock=10)
+        self.second = Product.objects.create(name='Kem', price=500, stock=10, brand=self.first.brand, category=self.first.category)
+        self.third = Product.objects.create(name='Nước hoa', price=900, stock=10, brand=self.first.brand, category=self.first.category)
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.first, quantity=1)
+        CartItem.objects.create(cart=self.cart, product=self.second, quantity=2)
+        reset_config_caches()
+
+    def cart_lines(self):
+        return dict(CartItem.objects.filter(cart=self.cart).values_list('product_id', 'quantity'))
+
+    def batch(self, operations):
+        return self.client.post('/carts/batch/', {'operations': operations}, format='json')
+
+    def test_applies_operations_in_order(self):
+        response = self.batch([
+            {'op': 'add', 'product': self.first.pk, 'quantity': 2},
+            {'op': 'remove', 'product': self.second.pk},
+            {'op': 'add', 'product': self.third.pk, 'quantity': 1},
+            {'op': 'set_quantity', 'product': self.third.pk, 'quantity': 4},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart_lines(), {self.first.pk: 3, self.third.pk: 4})
+        self.assertEqual(response.json()['total_quantity'], 7)
+
+    def test_unknown_product_rejects_whole_batch(self):
+        response = self.batch([
+            {'op': 'remove', 'product': self.first.pk},
+            {'op': 'add', 'product': 999999, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.cart_lines(), {self.first.pk: 1, self.second.pk: 2})
+
+    def test_failure_while_writing_rolls_back_earlier_writes(self):
+        operations = [
+            {'op': 'remove', 'product': self.first.pk},
+            {'op': 'set_quantity', 'product': self.second.pk, 'quantity': 5},
+            {'op': 'add', 'product': self.third.pk, 'quantity': 1},
+        ]
+        with mock.patch.object(CartItem.objects, 'bulk_create', side_effect=DatabaseError('mất kết nối')):
+            with self.assertRaises(DatabaseError):
+                self.batch(operations)
+        self.assertEqual(self.cart_lines(), {self.first.pk: 1, self.second.pk: 2})
+
+
+class ShippingZoneTests(TestCase):
+    def setUp(self):
+        reset_config_caches()
+
+    def zone_fee(self, address):
+        return get_fee_config().shipping_zones.zone_for(address).fee
+
+    def test_seeded_zone_matches_old_inner_city_spellings(self):
+        # Các cách viết is_inner_city() trước đây nhận là nội thành vẫn khớp vùng "Nội thành" tạo bởi migration
+        for address in (
+            '1 Tràng Tiền, Hà Nội', 'ha noi', 'Hoàn Kiếm, HN', '12 Lê Lợi, TP HCM', 'Quận 3, HCM', 'Sài Gòn',
+            'Thành phố Hồ Chí Minh', 'Ho Chi Minh City', 'Hải Châu, Đà Nẵng', 'da nang',
+        ):
+            with self.subTest(address=address):
+                self.assertEqual(self.zone_fee(address), 30000)
+        for address in ('Ninh Kiều, Cần Thơ', 'Hnam', 'Đà Lạt', '', None):
+            with self.subTest(address=address):
+                self.assertEqual(self.zone_fee(address), 50000)
+
+    def test_district_beats_city_and_priority_breaks_ties(self):
+        suburb = ShippingZone.objects.create(name='Ngoại thành HN', fee=45000)
+        ShippingZoneArea.objects.create(zone=suburb, name='Sóc Sơn', level='district')
+        express = ShippingZone.objects.create(name='Hà Nội nhanh', fee=20000, priority=5)
+        ShippingZoneArea.objects.create(zone=express, name='Hà Nội', level='city')
+        reset_config_caches()
+        self.assertEqual(self.zone_fee('Sóc Sơn, Hà Nội'), 45000)
+        self.assertEqual(self.zone_fee('Ba Đình, Hà Nội'), 20000)
+        self.assertEqual(self.zone_fee('Đà Nẵng'), 30000)
+
+
+class CheckoutQuoteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x', address='Cần Thơ')
+        self.product = create_product(stock=10)
+        self.other = Product.objects.create(name='Kem', price=500, stock=10, brand=self.product.brand, category=self.product.category)
+        self.cart = Cart.objects.create(user=self.user, address='Quận 1, TP HCM')
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=3)
+        CartItem.objects.create(cart=self.cart, product=self.other, quantity=1)
+        reset_config_caches()
+        quote = build_checkout_quote(Cart.objects.for_read().get(pk=self.cart.pk), receiver_phone='0909')
+        quote.checkout_session_id = 'cs_1'
+        quote.save()
+        self.quote = quote
+        reservations = reserve_stock(self.user, [(line[0], line[1]) for line in quote_lines(quote)])
+        StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(checkout_session_id='cs_1')
+
+    def test_order_uses_quoted_prices_and_only_removes_quoted_quantities(self):
+        # Sau khi tạo phiên: giá đổi, khách thêm một sản phẩm và tăng số lượng một dòng
+        Product.objects.filter(pk=self.product.pk).update(price=1)
+        CartItem.objects.filter(cart=self.cart, product=self.product).update(quantity=5)
+        third = Product.objects.create(name='Nước hoa', price=900, stock=10, brand=self.product.brand, category=self.product.category)
+        CartItem.objects.create(cart=self.cart, product=third, quantity=1)
+
+        order = create_order_from_quote('cs_1')
+        self.assertEqual(order.total_price, self.quote.total)
+        self.assertEqual((order.shipping_fee, order.receiver_phone, order.address), (self.quote.shipping_fee, '0909', 'Quận 1, TP HCM'))
+        self.assertEqual(
+            sorted(order.items.values_list('product_id', 'quantity', 'price')),
+            sorted((product_id, quantity, unit_price) for product_id, quantity, unit_price in quote_lines(self.quote)),
+        )
+        self.assertEqual(dict(CartItem.objects.filter(cart=self.cart).values_list('product_id', 'quantity')), {self.product.pk: 2, third.pk: 1})
+        self.cart.refresh_from_db()
+        self.assertGreater(self.cart.shipping_fee, 0)
+        self.assertEqual(CheckoutQuote.objects.get(pk=self.quote.pk).order_id, order.pk)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sold), (7, 3))
+        # Webhook gửi lại không tạo thêm đơn
+        self.assertIsNone(create_order_from_quote('cs_1'))
+        self.assertEqual(Order.objects.count(), 1)
+
+
+@override_settings(STORE_TIME_ZONE='Asia/Ho_Chi_Minh')
+class SalesSeriesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x')
+        self.product = create_product(stock=10)
+        self.other = Product.objects.create(
+            name='Kem', price=500, stock=10, brand=Brand.objects.create(name='Other'), category=self.product.category,
+        )
+        tz = store_timezone()
+        # Đơn thứ hai lúc 00:30 ngày 08 giờ cửa hàng (vẫn là ngày 07 theo UTC) phải được tính vào ngày 08
+        self.wednesday = timezone.make_aware(datetime(2026, 10, 7, 23, 30), tz)
+        create_order(self.user, self.product, 1000, quantity=2, created_at=self.wednesday)
+        create_order(self.user, self.other, 400, created_at=self.wednesday + timedelta(hours=1))
+        create_order(self.user, self.product, 700, created_at=timezone.make_aware(datetime(2026, 10, 13, 9), tz))
+        create_order(self.user, self.product, 999, status=OrderStatus.PENDING, created_at=self.wednesday)
+
+    def test_daily_series_fills_gaps_and_buckets_by_store_day(self):
+        data = sales_series(date(2026, 10, 6), date(2026, 10, 9))
+        self.assertEqual([point['period'] for point in data['series']], ['2026-10-06', '2026-10-07', '2026-10-08', '2026-10-09'])
+        self.assertEqual([point['orders'] for point in data['series']], [0, 1, 1, 0])
+        self.assertEqual(data['series'][1]['revenue'], Decimal('1000.00'))
+        self.assertEqual(data['totals']['average_order_value'], Decimal('700.00'))
+
+    def test_weekly_series_labels_partial_first_period_with_start(self):
+        data = sales_series(date(2026, 10, 7), date(2026, 10, 18), 'week')
+        self.assertEqual([point['period'] for point in data['series']], ['2026-10-07', '2026-10-12'])
+        self.assertEqual([point['revenue'] for point in data['series']], [Decimal('1400.00'), Decimal('700.00')])
+        self.assertEqual([point['units'] for point in data['series']], [3, 1])
+        # Từ thứ Năm: đơn thứ Tư không thuộc kỳ đầu dù cùng tuần
+        data = sales_series(date(2026, 10, 9), date(2026, 10, 18), 'week')
+        self.assertEqual(data['series'][0], {
+            'period': '2026-10-09', 'revenue': Decimal('0.00'), 'orders': 0, 'units': 0, 'average_order_value': Decimal('0.00'),
+        })
+
+    def test_filtered_series_reports_line_totals_under_item_keys(self):
+        data = sales_series(date(2026, 10, 1), date(2026, 10, 31), 'month', brand_id=self.product.brand_id)
+        [point] = data['series']
+        self.assertEqual(point['period'], '2026-10-01')
+        self.assertNotIn('revenue', point)
+        self.assertEqual((point['item_revenue'], point['orders'], point['units']), (Decimal('1700.00'), 2, 3))
+        self.assertEqual(point['item_average_order_value'], Decimal('850.00'))
+        self.assertEqual(data['totals']['item_revenue'], Decimal('1700.00'))
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(User.objects.create_user(username='alice', password='x'))
+        self.product = create_product(stock=3)
+
+    def test_list_is_compact_and_fields_param_narrows_payload(self):
+        [item] = self.client.get('/products/').json()['results']
+        self.assertNotIn('description', item)
+        self.assertEqual(item['brand'], {'id': self.product.brand_id, 'name': 'Brand'})
+        [item] = self.client.get('/products/', {'fields': 'id,name'}).json()['results']
+        self.assertEqual(set(item), {'id', 'name'})
+        [item] = self.client.get('/products/', {'expand': 'brand'}).json()['results']
+        self.assertIn('name', item['brand'])
+
+    def test_detail_keeps_full_representation(self):
+        data = self.client.get(f'/products/{self.product.pk}/').json()
+        self.assertIn('description', data)
+        self.assertEqual(set(self.client.get(f'/products/{self.product.pk}/', {'fields': 'id,stock'}).json()), {'id', 'stock'})
+
+
+class BarcodeLookupTests(TestCase):
+    def setUp(self):
+        barcode_cache.clear()
+        self.product = create_product(stock=4)
+        self.product.barcode = '8930001'
+        self.product.save()
+        self.client = api_client(User.objects.create_user(username='staff', password='x', is_staff=True))
+
+    def test_lookup_returns_found_and_missing_barcodes(self):
+        response = self.client.post('/barcode-lookup/', {'barcodes': ['8930001', ' 8930001 ', 'nope']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.product.pk])
+        self.assertEqual(response.data['results'][0]['stock'], 4)
+        self.assertEqual(response.data['not_found'], ['nope'])
+
+    def test_cached_id_is_rechecked_after_barcode_change(self):
+        self.client.post('/barcode-lookup/', {'barcodes': ['8930001']}, format='json')
+        Product.objects.filter(pk=self.product.pk).update(barcode='8930002')
+        response = self.client.post('/barcode-lookup/', {'barcodes': ['8930001', '8930002']}, format='json')
+        self.assertEqual(response.data['not_found'], ['8930001'])
+        self.assertEqual([row['barcode'] for row in response.data['results']], ['8930002'])
+
+    def test_rejects_empty_list_and_non_staff(self):
+        self.assertEqual(self.client.post('/barcode-lookup/', {'barcodes': []}, format='json').status_code, 400)
+        customer = api_client(User.objects.create_user(username='alice', password='x'))
+        self.assertEqual(customer.post('/barcode-lookup/', {'barcodes': ['8930001']}, format='json').status_code, 403)
+
+
+class FeeConfigCacheTests(TestCase):
+    def setUp(self):
+        reset_config_caches()
+
+    def test_config_is_reused_until_service_fee_is_saved(self):
+        ServiceFee.objects.create(percent=3.0)
+        get_fee_config()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_fee_config().service_fee_percent, 3.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceFee.objects.create(percent=5.0)
+        self.assertEqual(get_fee_config().service_fee_percent, 5.0)
+
+    def test_expired_entry_is_reloaded_without_version_bump(self):
+        ServiceFee.objects.create(percent=3.0)
+        get_fee_config()
+        ServiceFee.objects.update(percent=4.0)
+        with mock.patch('store.fees.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(get_fee_config().service_fee_percent, 4.0)
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x')
+        self.product = create_product(stock=10)
+        self.client = api_client(self.user)
+
+    def history_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/orders/', {'page_size': 20})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()['results']
+
+    def test_history_query_count_does_not_grow_with_orders(self):
+        create_order(self.user, self.product, 1000)
+        single, _ = self.history_queries()
+        for _ in range(3):
+            create_order(self.user, self.product, 2000, quantity=2)
+        many, results = self.history_queries()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(many, single)
+
+    def test_lines_keep_product_snapshot_after_product_changes(self):
+        order = create_order(self.user, self.product, 1000)
+        Product.objects.filter(pk=self.product.pk).update(name='Tên mới', barcode='999')
+        [line] = self.client.get(f'/orders/{order.pk}/').json()['items']
+        self.assertEqual((line['product_name'], line['product_barcode']), ('Sản phẩm', None))
+
+
+class AdminOrderSearchTests(TestCase):
+    def setUp(self):
+        product = create_product(stock=10)
+        self.alice = User.objects.create_user(username='Alice', password='x')
+        self.bob = User.objects.create_user(username='bob', password='x')
+        self.first = create_order(self.alice, product, 1000)
+        Order.objects.filter(pk=self.first.pk).update(receiver_phone='0912345678')
+        self.second = create_order(self.bob, product, 2000, status=OrderStatus.PENDING)
+        self.client = api_client(User.objects.create_user(username='staff', password='x', is_staff=True))
+
+    def search(self, **params):
+        response = self.client.get('/admin-orders/', {'page_size': 20, **params})
+        self.assertEqual(response.status_code, 200)
+        return sorted(order['id'] for order in response.json()['results'])
+
+    def test_search_by_order_id_phone_and_username_prefix(self):
+        self.assertEqual(self.search(search=f'#{self.second.pk}'), [self.second.pk])
+        for phone in ('0912 345 678', '+84912345678', '84-912-345-678'):
+            with self.subTest(phone=phone):
+                self.assertEqual(self.search(search=phone), [self.first.pk])
+        self.assertEqual(self.search(search='ali'), [self.first.pk])
+        self.assertEqual(self.search(search='lice'), [])
+        self.assertEqual(self.search(search='#abc'), [])
+
+    def test_status_filter(self):
+        self.assertEqual(self.search(status=OrderStatus.PENDING), [self.second.pk])
+
+
+@override_settings(STORE_TIME_ZONE='Asia/Ho_Chi_Minh')
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='x', first_name='An')
+        self.product = create_product(stock=10)
+        self.today = store_today()
+        today_start, _ = day_bounds(self.today)
+        # Ranh giới ngày theo giờ cửa hàng: 00:30 hôm nay (17:30 UTC hôm trước) vẫn tính là hôm nay
+        self.late = create_order(self.user, self.product, 1500, created_at=today_start + timedelta(minutes=30))
+        create_order(self.user, self.product, 700, created_at=today_start + timedelta(minutes=10))
+        create_order(self.user, self.product, 900, status=OrderStatus.CANCELLED, created_at=today_start + timedelta(minutes=20))
+        create_order(self.user, self.product, 400, created_at=today_start - timedelta(minutes=30))
+        create_order(self.user, self.product, 300, created_at=today_start - timedelta(days=2))
+
+    def test_daily_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = daily_order_stats(self.today)
+        self.assertEqual((stats['revenue_today'], stats['orders_today'], stats['orders_yesterday']), (Decimal('2200.00'), 2, 1))
+        self.assertEqual(stats['last_order_at'], self.late.created_at)
+
+    def test_dashboard_endpoint(self):
+        Product.objects.filter(pk=self.product.pk).update(sold=7)
+        client = api_client(User.objects.create_user(username='staff', password='x', is_staff=True))
+        data = client.get('/dashboard/').json()
+        self.assertEqual((Decimal(str(data['revenue_today'])), data['new_orders'], data['new_orders_delta']), (Decimal('2200'), 2, 1))
+        self.assertEqual(data['revenue_updated'], '00:30')
+        self.assertEqual(data['recent_orders'][0]['customer'], 'An')
+        self.assertEqual([p['sold'] for p in data['best_sellers']], [7])
@@ -6,7 +6,7 @@ from .views import (
     ProductViewSet, CategoryViewSet, OrderViewSet, ReviewViewSet, CartViewSet, CartItemViewSet,
     CurrentUserAPIView, RegisterUserAPIView, UpdateUserAPIView, DiscountCodeViewSet,
     stripe_success_view, stripe_cancel_view, UserAddressViewSet, UserVoucherViewSet, FavoriteProductViewSet,
-    AdminOrderViewSet, InventoryListView, UpdateStockAPIView, StockHistoryListAPIView, ReportSummaryAPIView, DashboardAPIView
+    AdminOrderViewSet, InventoryListView, UpdateStockAPIView, BarcodeLookupAPIView, StockHistoryListAPIView, ReportSummaryAPIView, ReportSeriesAPIView, DashboardAPIView
 )
 
 router = DefaultRouter()
@@ -33,7 +33,9 @@ urlpatterns = [
     path('stripe/webhook/', stripe_webhook, name='stripe-webhook'),
     path('inventory/', InventoryListView.as_view(), name='inventory'),
     path('update-stock/', UpdateStockAPIView.as_view(), name='update-stock'),
+    path('barcode-lookup/', BarcodeLookupAPIView.as_view(), name='barcode-lookup'),
     path('stock-history/', StockHistoryListAPIView.as_view(), name='stock-history'),
     path('report-summary/', ReportSummaryAPIView.as_view(), name='report-summary'),
+    path('report-series/', ReportSeriesAPIView.as_view(), name='report-series'),
     path('dashboard/', DashboardAPIView.as_view(), name='dashboard'),
 ]
\ No newline at end of file
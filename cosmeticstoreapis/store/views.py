@@ -1,7 +1,9 @@
 from django.template.response import TemplateResponse
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Count, F
-from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Sum, Count, F, Prefetch, Case, When
+from django.utils import timezone
+from datetime import date, timedelta
 from rest_framework.views import APIView
 from rest_framework import status, viewsets, generics, filters, serializers
 from rest_framework.permissions import IsAuthenticated
@@ -14,16 +16,28 @@ from store.models import (
 	recalculate_cart_fees,
 	Product, Category, Order, Review,
 	Cart, CartItem, DiscountCode, UserVoucher,
-	OrderStatus, FavoriteProduct, StockHistory
+	OrderStatus, FavoriteProduct, StockHistory, DailySales
 )
 from .serializers import (
 	ProductSerializer, CategorySerializer, OrderSerializer, ReviewSerializer,
 	CartSerializer, CartItemSerializer, UserAddressSerializer, UserSerializer, 
 	DiscountCodeSerializer, UserVoucherSerializer, FavoriteProductSerializer,
-	StockHistorySerializer,
+	StockHistorySerializer, CartOperationSerializer,
 )
 from .permissions import IsStaffOnly, IsStaffOrReadOnly, IsOwnerOrAdmin
-from .pagination import StandardResultsSetPagination
+from .pagination import StandardResultsSetPagination, CursorOrPageNumberPagination
+from .search import ProductSearchFilter
+from .order_search import AdminOrderSearchFilter
+from .reporting import (
+	REVENUE_STATUSES, SERIES_GRANULARITIES, SERIES_MAX_POINTS, cached_sales_series, daily_order_stats, series_periods,
+	store_timezone, store_today,
+)
+from .caching import catalog_cached, bump_catalog_version
+from .facets import apply_catalog_filters, get_facets
+from .barcodes import lookup_barcodes, MAX_LOOKUP_BARCODES
+from .images import image_url
+from .cart_ops import apply_cart_operations, CartOperationError, MAX_CART_OPERATIONS
+from .discounts import is_discount_usable, lookup_discount_code
 
 
 # Trang thanh toán thành công
@@ -114,26 +128,49 @@ class UserVoucherViewSet(viewsets.ViewSet, generics.ListAPIView):
 
 # Product chỉ staff được chỉnh sửa, người khác chỉ xem
 class ProductViewSet(viewsets.ViewSet, generics.ListAPIView):
-	filter_backends = [filters.SearchFilter]
-	search_fields = ['name', 'description', 'barcode']
-	queryset = Product.objects.all().order_by('id')
+	filter_backends = [ProductSearchFilter, filters.OrderingFilter]
+	ordering_fields = ['rating_avg', 'review_count', 'price', 'sold', 'id']
+	queryset = Product.objects.for_read().order_by('id')
 	serializer_class = ProductSerializer
-	pagination_class = StandardResultsSetPagination
+	pagination_class = CursorOrPageNumberPagination
+	cursor_ordering = ('id',)
 	permission_classes = [IsAuthenticated, IsStaffOrReadOnly, TokenHasReadWriteScope]
 
+	# Action list trả về dạng rút gọn, client dùng ?fields= / ?expand= để lấy thêm
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		context['compact'] = self.action in ('list', 'facets')
+		return context
+
 	def get_queryset(self):
-		queryset = Product.objects.all().order_by('id')
-		category_id = self.request.query_params.get('category')
-		brand_id = self.request.query_params.get('brand')
-		if category_id:
-			queryset = queryset.filter(category_id=category_id)
-		if brand_id:
-			queryset = queryset.filter(brand_id=brand_id)
-		return queryset
+		queryset = Product.objects.for_read(self.get_serializer().fields).order_by('id')
+		return apply_catalog_filters(queryset, self.request.query_params)
+
+	@catalog_cached
+	def list(self, request, *args, **kwargs):
+		return super().list(request, *args, **kwargs)
+
+	# Danh sách sản phẩm theo bộ lọc kèm số lượng theo từng facet (brand, category, skin_type, origin, giá, còn hàng)
+	@catalog_cached
+	@action(detail=False, methods=['get'], url_path='facets')
+	def facets(self, request):
+		params = request.query_params
+		facet_queryset = apply_catalog_filters(Product.objects.all(), params)
+		facet_queryset = ProductSearchFilter().filter_queryset(request, facet_queryset, self)
+		facets = get_facets(facet_queryset, params)
+		queryset = self.filter_queryset(self.get_queryset())
+		page = self.paginate_queryset(queryset)
+		if page is not None:
+			response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+			response.data['facets'] = facets
+			return response
+		return Response({'results': self.get_serializer(queryset, many=True).data, 'facets': facets})
 
+	@catalog_cached
 	def retrieve(self, request, pk=None):
+		serializer = ProductSerializer(context={'request': request})
 		try:
-			product = Product.objects.get(pk=pk)
+			product = Product.objects.for_read(serializer.fields).get(pk=pk)
 		except Product.DoesNotExist:
 			return Response(status=404)
 		serializer = ProductSerializer(product, context={'request': request})
@@ -169,8 +206,16 @@ class FavoriteProductViewSet(viewsets.ModelViewSet):
 	serializer_class = FavoriteProductSerializer
 	permission_classes = [IsAuthenticated]
 
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		context['compact'] = self.action == 'list'
+		return context
+
 	def get_queryset(self):
-		queryset = FavoriteProduct.objects.filter(user=self.request.user)
+		product_fields = self.get_serializer().fields['product'].fields
+		queryset = FavoriteProduct.objects.filter(user=self.request.user).prefetch_related(
+			Prefetch('product', queryset=Product.objects.for_read(product_fields))
+		)
 		product_id = self.request.query_params.get('product')
 		if product_id:
 			queryset = queryset.filter(product_id=product_id)
@@ -200,6 +245,11 @@ class CategoryViewSet(viewsets.ViewSet, generics.ListAPIView):
 	pagination_class = StandardResultsSetPagination
 	permission_classes = [IsAuthenticated, IsStaffOrReadOnly, TokenHasReadWriteScope]
 
+	@catalog_cached
+	def list(self, request, *args, **kwargs):
+		return super().list(request, *args, **kwargs)
+
+	@catalog_cached
 	def retrieve(self, request, pk=None):
 		try:
 			category = Category.objects.get(pk=pk)
@@ -241,24 +291,30 @@ class OrderViewSet(viewsets.ViewSet, generics.ListAPIView):
 	search_fields = ['address', 'receiver_phone']
 	ordering_fields = ['created_at', 'status', 'total_price']
 	serializer_class = OrderSerializer
-	pagination_class = StandardResultsSetPagination
+	pagination_class = CursorOrPageNumberPagination
+	cursor_ordering = ('-created_at', '-id')
 	permission_classes = [IsAuthenticated, IsOwnerOrAdmin, TokenHasReadWriteScope]
 
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		context['compact'] = self.action == 'list'
+		return context
+
 	def get_queryset(self):
 		user = self.request.user
 		if getattr(self, 'swagger_fake_view', False) or not user.is_authenticated:
 			return Order.objects.none()
-		queryset = Order.objects.filter(user=user)
+		queryset = Order.objects.for_read().filter(user=user).order_by('-created_at', '-id')
 		return queryset
 
 	def retrieve(self, request, pk=None):
 		try:
-			order = Order.objects.get(pk=pk)
+			order = Order.objects.for_read().get(pk=pk)
 		except Order.DoesNotExist:
 			return Response(status=404)
 		if order.user != request.user and not request.user.is_staff and not request.user.is_superuser:
 			return Response({'detail': 'Bạn không có quyền truy cập đơn hàng này.'}, status=403)
-		serializer = OrderSerializer(order)
+		serializer = OrderSerializer(order, context={'request': request})
 		return Response(serializer.data)
 
 	def create(self, request):
@@ -303,7 +359,8 @@ class ReviewViewSet(viewsets.ViewSet, generics.ListAPIView):
 	filter_backends = [filters.SearchFilter]
 	search_fields = ['comment']
 	serializer_class = ReviewSerializer
-	pagination_class = StandardResultsSetPagination
+	pagination_class = CursorOrPageNumberPagination
+	cursor_ordering = ('id',)
 	permission_classes = [IsAuthenticated, IsOwnerOrAdmin, TokenHasReadWriteScope]
 
 	def get_queryset(self):
@@ -365,7 +422,7 @@ class ReviewViewSet(viewsets.ViewSet, generics.ListAPIView):
 class CartViewSet(viewsets.ViewSet, generics.ListAPIView):
 	filter_backends = [filters.SearchFilter]
 	search_fields = ['user__username']
-	queryset = Cart.objects.all().order_by('id')
+	queryset = Cart.objects.for_read().order_by('id')
 	serializer_class = CartSerializer
 	pagination_class = StandardResultsSetPagination
 	permission_classes = [IsAuthenticated, IsOwnerOrAdmin, TokenHasReadWriteScope]
@@ -374,17 +431,17 @@ class CartViewSet(viewsets.ViewSet, generics.ListAPIView):
 		user = self.request.user
 		if getattr(self, 'swagger_fake_view', False) or not user.is_authenticated:
 			return Cart.objects.none()
-		return Cart.objects.filter(user=user).order_by('id')
+		return Cart.objects.for_read().filter(user=user).order_by('id')
 
 	def retrieve(self, request, pk=None):
 		try:
-			cart = Cart.objects.get(pk=pk)
+			cart = Cart.objects.for_read().get(pk=pk)
 		except Cart.DoesNotExist:
 			return Response(status=404)
 		# Chỉ cho phép user truy cập cart của chính mình
 		if cart.user != request.user:
 			return Response({'detail': 'Bạn không có quyền truy cập giỏ hàng này.'}, status=403)
-		serializer = CartSerializer(cart)
+		serializer = CartSerializer(cart, context={'request': request})
 		data = serializer.data
 		# shipping_fee và service_fee đã có trong serializer
 		return Response(data)
@@ -419,13 +476,13 @@ class CartViewSet(viewsets.ViewSet, generics.ListAPIView):
 			serializer.save()
 			# Tính lại phí sau khi cập nhật
 			recalculate_cart_fees(cart)
-			cart.refresh_from_db()
+			cart = Cart.objects.for_read().get(pk=cart.pk)
 			return Response(CartSerializer(cart).data)
 		return Response(serializer.errors, status=400)
 
 	def partial_update(self, request, pk=None):
 		try:
-			cart = Cart.objects.get(pk=pk)
+			cart = Cart.objects.for_read().get(pk=pk)
 		except Cart.DoesNotExist:
 			return Response(status=404)
 		# Nếu truyền discount_code thì cập nhật vào cart
@@ -452,12 +509,36 @@ class CartViewSet(viewsets.ViewSet, generics.ListAPIView):
 		cart.delete()
 		return Response(status=204)
 
+	# Áp dụng nhiều thao tác add / set_quantity / remove lên giỏ của user trong một transaction,
+	# tính lại phí một lần và trả về giỏ hàng đã tính giá
+	@action(detail=False, methods=['post'], url_path='batch')
+	def batch(self, request):
+		operations = request.data.get('operations')
+		if not isinstance(operations, list) or not operations:
+			return Response({'error': 'Thiếu danh sách thao tác.'}, status=400)
+		if len(operations) > MAX_CART_OPERATIONS:
+			return Response({'error': f'Tối đa {MAX_CART_OPERATIONS} thao tác mỗi lần.'}, status=400)
+		serializer = CartOperationSerializer(data=operations, many=True)
+		if not serializer.is_valid():
+			return Response({'operations': serializer.errors}, status=400)
+		with transaction.atomic():
+			cart, _ = Cart.objects.select_for_update().get_or_create(user=request.user)
+			try:
+				apply_cart_operations(cart, serializer.validated_data)
+			except CartOperationError as exc:
+				return Response({'error': str(exc)}, status=400)
+			recalculate_cart_fees(cart)
+		cart = Cart.objects.for_read().get(pk=cart.pk)
+		return Response(CartSerializer(cart, context={'request': request}).data)
+
 
 # CartItem chỉ chủ sở hữu hoặc admin được chỉnh sửa, người khác chỉ xem
 class CartItemViewSet(viewsets.ViewSet, generics.ListAPIView):
 	filter_backends = [filters.SearchFilter]
 	search_fields = ['product__name']
-	queryset = CartItem.objects.all().order_by('id')
+	queryset = CartItem.objects.prefetch_related(
+		Prefetch('product', queryset=Product.objects.for_read())
+	).order_by('id')
 	serializer_class = CartItemSerializer
 	pagination_class = StandardResultsSetPagination
 	permission_classes = [IsAuthenticated, IsOwnerOrAdmin, TokenHasReadWriteScope]
@@ -578,35 +659,39 @@ class DiscountCodeViewSet(viewsets.ViewSet, generics.ListAPIView):
 		discount.delete()
 		return Response(status=204)
 	
+	# Tra theo cột code_normalized có index, kết quả cache ngắn (store/discounts.py)
 	@action(detail=False, methods=['get'], url_path='validate')
 	def validate(self, request):
-		code = request.GET.get('code', '').strip()
-		try:
-			discount = DiscountCode.objects.get(code__iexact=code)
-			if discount.is_valid():
-				return Response({
-					"valid": True,
-					"value": float(discount.discount_percentage),
-					"id": discount.id,
-					"code": discount.code,
-					"message": ""
-				})
-			else:
-				return Response({"valid": False, "value": 0, "message": "Mã giảm giá hết hạn hoặc đã sử dụng tối đa"})
-		except DiscountCode.DoesNotExist:
+		discount = lookup_discount_code(request.GET.get('code', ''))
+		if discount is None:
 			return Response({"valid": False, "value": 0, "message": "Mã giảm giá không tồn tại"})
+		if is_discount_usable(discount):
+			return Response({
+				"valid": True,
+				"value": float(discount['discount_percentage']),
+				"id": discount['id'],
+				"code": discount['code'],
+				"message": ""
+			})
+		return Response({"valid": False, "value": 0, "message": "Mã giảm giá hết hạn hoặc đã sử dụng tối đa"})
 
 
 # API cho staff quản lý toàn bộ đơn hàng
 class AdminOrderViewSet(viewsets.ModelViewSet):
-	queryset = Order.objects.all().order_by('-created_at')
+	queryset = Order.objects.for_read().order_by('-created_at', '-id')
 	serializer_class = OrderSerializer
 	permission_classes = [IsAuthenticated, IsStaffOnly]
-	pagination_class = StandardResultsSetPagination
-	filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-	search_fields = ['id', 'address', 'receiver_phone', 'user__username']
+	pagination_class = CursorOrPageNumberPagination
+	cursor_ordering = ('-created_at', '-id')
+	# Tìm theo mã đơn, số điện thoại (khớp đúng) hoặc tiền tố username, xem store/order_search.py
+	filter_backends = [AdminOrderSearchFilter, filters.OrderingFilter]
 	ordering_fields = ['created_at', 'status', 'total_price']
 
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		context['compact'] = self.action == 'list'
+		return context
+
 	def get_queryset(self):
 		queryset = super().get_queryset()
 		status = self.request.query_params.get('status')
@@ -617,12 +702,17 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
 
 # API quản lý tồn kho cho nhân viên
 class InventoryListView(ListAPIView):
-	queryset = Product.objects.all().order_by('id')
+	queryset = Product.objects.for_read().order_by('id')
 	serializer_class = ProductSerializer
 	permission_classes = [IsAuthenticated, IsStaffOnly]
 
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		context['compact'] = True
+		return context
+
 	def get_queryset(self):
-		queryset = Product.objects.all().order_by('id')
+		queryset = Product.objects.for_read(self.get_serializer().fields).order_by('id')
 		search = self.request.query_params.get('search')
 		if search:
 			queryset = queryset.filter(name__icontains=search)
@@ -639,25 +729,41 @@ class UpdateStockAPIView(APIView):
         note = request.data.get('note', '')
         if not product_id or change is None:
             return Response({'error': 'Thiếu thông tin.'}, status=400)
-        try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
-            return Response({'error': 'Không tìm thấy sản phẩm.'}, status=404)
         try:
             change = int(change)
         except Exception:
             return Response({'error': 'Số lượng không hợp lệ.'}, status=400)
-        # Cập nhật tồn kho
-        product.stock = max(product.stock + change, 0)
-        product.save(update_fields=['stock'])
-        # Ghi nhận lịch sử
-        StockHistory.objects.create(product=product, user=request.user, change=change, note=note)
-        return Response({'success': True, 'stock': product.stock})
+        # Cập nhật tồn kho bằng một câu UPDATE nguyên tử (không xuống dưới 0), tránh mất cập nhật khi nhiều người cùng sửa
+        stock = F('stock') + change
+        if change < 0:
+            stock = Case(When(stock__gte=-change, then=F('stock') + change), default=0)
+        with transaction.atomic():
+            if not Product.objects.filter(id=product_id).update(stock=stock):
+                return Response({'error': 'Không tìm thấy sản phẩm.'}, status=404)
+            # Ghi nhận lịch sử
+            StockHistory.objects.create(product_id=product_id, user=request.user, change=change, note=note)
+            current_stock = Product.objects.filter(id=product_id).values_list('stock', flat=True).get()
+        bump_catalog_version()
+        return Response({'success': True, 'stock': current_stock})
+
+# API tra cứu nhiều barcode một lần cho máy quét kho, trả về bản ghi rút gọn id/tên/tồn kho/giá
+class BarcodeLookupAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsStaffOnly]
+
+    def post(self, request, *args, **kwargs):
+        barcodes = request.data.get('barcodes')
+        if not isinstance(barcodes, list) or not barcodes:
+            return Response({'error': 'Thiếu danh sách barcode.'}, status=400)
+        if len(barcodes) > MAX_LOOKUP_BARCODES:
+            return Response({'error': f'Tối đa {MAX_LOOKUP_BARCODES} barcode mỗi lần tra cứu.'}, status=400)
+        results, not_found = lookup_barcodes(barcodes)
+        return Response({'results': results, 'not_found': not_found})
 
 class StockHistoryListAPIView(ListAPIView):
     permission_classes = [IsAuthenticated, IsStaffOnly]
     serializer_class = StockHistorySerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorOrPageNumberPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         product_id = self.request.query_params.get('product_id')
@@ -671,19 +777,21 @@ class StockHistoryListAPIView(ListAPIView):
 class ReportSummaryAPIView(APIView):
 	permission_classes = [IsAuthenticated, IsStaffOnly]
 
+	# Doanh thu, số đơn, nhập/xuất kho đọc từ bảng tổng hợp theo ngày (một dòng mỗi ngày) thay vì quét Order/StockHistory
 	def get(self, request):
-		# Tổng doanh thu (đơn đã thanh toán)
-		total_revenue = Order.objects.filter(status__in=[OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.COMPLETED]).aggregate(
-			total=Sum('total_price'))['total'] or 0
-
-		# Tổng số đơn hàng đã thanh toán
-		total_orders = Order.objects.filter(status__in=[OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.COMPLETED]).count()
+		totals = DailySales.objects.aggregate(
+			revenue=Sum('revenue'), orders=Sum('order_count'), imports=Sum('imports'), exports=Sum('exports'),
+		)
+		total_revenue = totals['revenue'] or 0
+		total_orders = totals['orders'] or 0
+		total_import = totals['imports'] or 0
+		total_export = totals['exports'] or 0
 
 		# Tổng tồn kho hiện tại
 		total_stock = Product.objects.aggregate(total=Sum('stock'))['total'] or 0
 
 		# Top 5 sản phẩm bán chạy (dựa vào sold)
-		top_products = Product.objects.order_by('-sold')[:5]
+		top_products = Product.objects.only('id', 'name', 'sold', 'stock').order_by('-sold')[:5]
 		top_products_data = [
 			{
 				'id': p.id,
@@ -693,10 +801,6 @@ class ReportSummaryAPIView(APIView):
 			} for p in top_products
 		]
 
-		# Tổng số lượng nhập kho (tăng) và xuất kho (giảm)
-		total_import = StockHistory.objects.filter(change__gt=0).aggregate(total=Sum('change'))['total'] or 0
-		total_export = abs(StockHistory.objects.filter(change__lt=0).aggregate(total=Sum('change'))['total'] or 0)
-
 		return Response({
 			'total_revenue': total_revenue,
 			'total_orders': total_orders,
@@ -707,48 +811,58 @@ class ReportSummaryAPIView(APIView):
 		})
 
 
-# API dashboard tổng hợp cho nhân viên
-class DashboardAPIView(APIView):
+# API chuỗi báo cáo theo thời gian cho nhân viên/admin:
+# ?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=day|week|month&category=<id>&brand=<id>
+class ReportSeriesAPIView(APIView):
 	permission_classes = [IsAuthenticated, IsStaffOnly]
 
 	def get(self, request):
-		today = datetime.now().date()
-		# Doanh thu hôm nay
-		revenue_today = Order.objects.filter(
-			status__in=[OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.COMPLETED],
-			created_at__date=today
-		).aggregate(total=Sum('total_price'))['total'] or 0
+		params = request.query_params
+		granularity = params.get('granularity', 'day')
+		if granularity not in SERIES_GRANULARITIES:
+			return Response({'error': 'granularity phải là day, week hoặc month.'}, status=400)
+		try:
+			end = date.fromisoformat(params['to']) if params.get('to') else store_today()
+			start = date.fromisoformat(params['from']) if params.get('from') else end - timedelta(days=29)
+		except ValueError:
+			return Response({'error': 'Ngày không hợp lệ (định dạng YYYY-MM-DD).'}, status=400)
+		if start > end:
+			return Response({'error': 'from phải trước hoặc bằng to.'}, status=400)
+		if len(series_periods(start, end, granularity)) > SERIES_MAX_POINTS:
+			return Response({'error': f'Tối đa {SERIES_MAX_POINTS} kỳ mỗi lần, hãy thu hẹp khoảng thời gian hoặc chọn kỳ dài hơn.'}, status=400)
+		filters = {}
+		for name in ('category', 'brand'):
+			value = params.get(name)
+			if value:
+				try:
+					filters[f'{name}_id'] = int(value)
+				except ValueError:
+					return Response({'error': f'{name} không hợp lệ.'}, status=400)
+		return Response(cached_sales_series(start, end, granularity, **filters))
 
-		# Thời gian cập nhật doanh thu (lấy đơn mới nhất)
-		last_order = Order.objects.filter(
-			status__in=[OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.COMPLETED],
-			created_at__date=today
-		).order_by('-created_at').first()
-		revenue_updated = last_order.created_at.strftime('%H:%M') if last_order else ''
 
-		# Đơn hàng mới hôm nay
-		new_orders = Order.objects.filter(
-			status__in=[OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.COMPLETED],
-			created_at__date=today
-		).count()
+# API dashboard tổng hợp cho nhân viên
+class DashboardAPIView(APIView):
+	permission_classes = [IsAuthenticated, IsStaffOnly]
 
-		# Đơn hàng mới hôm qua để tính delta
-		yesterday = today - timedelta(days=1)
-		new_orders_yesterday = Order.objects.filter(
-			status__in=[OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.COMPLETED],
-			created_at__date=yesterday
-		).count()
-		new_orders_delta = new_orders - new_orders_yesterday
+	# Ba truy vấn: số liệu hôm nay/hôm qua (một aggregate), đơn gần đây kèm user, sản phẩm bán chạy
+	def get(self, request):
+		tz = store_timezone()
+		stats = daily_order_stats()
+		revenue_today = stats['revenue_today'] or 0
+		# Thời gian cập nhật doanh thu (đơn mới nhất hôm nay)
+		last_order_at = stats['last_order_at']
+		revenue_updated = timezone.localtime(last_order_at, tz).strftime('%H:%M') if last_order_at else ''
+		new_orders = stats['orders_today']
+		new_orders_delta = new_orders - stats['orders_yesterday']
 
 		# Đơn hàng gần đây (5 đơn mới nhất)
-		recent_orders = Order.objects.filter(
-			status__in=[OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.COMPLETED]
-		).order_by('-created_at')[:5]
+		recent_orders = Order.objects.filter(status__in=REVENUE_STATUSES).select_related('user').order_by('-created_at', '-id')[:5]
 		recent_orders_data = [
 			{
 				'id': o.id,
 				'customer': o.user.get_full_name() or o.user.username,
-				'time': o.created_at.strftime('%H:%M %d/%m'),
+				'time': timezone.localtime(o.created_at, tz).strftime('%H:%M %d/%m'),
 				'price': o.total_price,
 				'status': o.get_status_display()
 			} for o in recent_orders
@@ -762,7 +876,7 @@ class DashboardAPIView(APIView):
 				'name': p.name,
 				'price': p.price,
 				'sold': p.sold,
-				'image': p.image.url if p.image else None
+				'image': image_url(p, variant='card') or None
 			} for p in best_sellers
 		]
 
@@ -119,7 +119,7 @@ export default function InventoryScreen({ navigation }) {
               <View style={styles.itemBox}>
                 {item.image ? (
                   <View style={styles.row}>
-                    <Image source={{ uri: item.image }} style={styles.productImage} />
+                    <Image source={{ uri: item.image_urls?.thumbnail || item.image }} style={styles.productImage} />
                     <View style={{ flex: 1, marginLeft: 10 }}>
                       <Text style={styles.name}>{item.name}</Text>
                       <Text style={styles.info}>Mã vạch: {item.barcode || '---'}</Text>
@@ -55,14 +55,14 @@ export default function EmployeeOrderDetail({ route, navigation }) {
         <Text style={styles.label}>Danh sách sản phẩm:</Text>
         {order.items && order.items.length > 0 ? order.items.map((item, idx) => (
           <View key={idx} style={styles.productRow}>
-            {item.product && item.product.image ? (
+            {item.product_image ? (
               <View style={styles.productImageWrapper}>
-                <Image source={{ uri: item.product.image }} style={styles.productImage} />
+                <Image source={{ uri: item.product_image }} style={styles.productImage} />
               </View>
             ) : null}
             <View style={{ flex: 1, marginLeft: 10 }}>
-              <Text style={styles.productName}>{item.product?.name || item.product_name || '---'}</Text>
-              <Text style={styles.productPrice}>Giá: {item.product?.price ? parseInt(item.product.price).toLocaleString() : (item.price ? parseInt(item.price).toLocaleString() : '---')}đ</Text>
+              <Text style={styles.productName}>{item.product_name || '---'}</Text>
+              <Text style={styles.productPrice}>Giá: {item.price ? parseInt(item.price).toLocaleString() : '---'}đ</Text>
             </View>
             <Text style={styles.productQty}>x{item.quantity}</Text>
           </View>
@@ -1,16 +1,29 @@
 import React, { useEffect, useState } from 'react';
 import { View, Text, StyleSheet, ActivityIndicator, ScrollView, SafeAreaView, TouchableOpacity, Dimensions, RefreshControl } from 'react-native';
-import { BarChart } from 'react-native-chart-kit';
+import { BarChart, LineChart } from 'react-native-chart-kit';
 import { MaterialCommunityIcons } from '@expo/vector-icons';
 import { endpoints, authAxios } from '../../configs/Apis';
 import { useContext } from 'react';
 import { UserContext } from '../../configs/Contexts';
 
+// Các kỳ của biểu đồ xu hướng: số ngày lùi lại tính từ hôm nay
+const SERIES_OPTIONS = [
+  { key: 'day', label: '30 ngày', days: 29 },
+  { key: 'week', label: '12 tuần', days: 7 * 12 - 1 },
+  { key: 'month', label: '12 tháng', days: 365 },
+];
+
+const formatDate = (d) => {
+  const pad = (n) => `${n}`.padStart(2, '0');
+  return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+};
 
 export default function EmployeeReports({ navigation }) {
   const [loading, setLoading] = useState(true);
   const [report, setReport] = useState(null);
   const [refreshing, setRefreshing] = useState(false);
+  const [granularity, setGranularity] = useState('day');
+  const [series, setSeries] = useState(null);
   const user = useContext(UserContext);
   const token = user?.access_token;
 
@@ -26,13 +39,32 @@ export default function EmployeeReports({ navigation }) {
     }
   };
 
+  // Doanh thu, số đơn theo ngày/tuần/tháng (tính sẵn trên server)
+  const fetchSeries = async (key = granularity) => {
+    const option = SERIES_OPTIONS.find(o => o.key === key);
+    const to = new Date();
+    const from = new Date(to.getTime() - option.days * 24 * 60 * 60 * 1000);
+    try {
+      const res = await authAxios(token).get(endpoints.reportSeries, {
+        params: { granularity: key, from: formatDate(from), to: formatDate(to) },
+      });
+      setSeries(res.data);
+    } catch (err) {
+      setSeries(null);
+    }
+  };
+
   useEffect(() => {
     fetchReport();
   }, [token]);
 
+  useEffect(() => {
+    fetchSeries(granularity);
+  }, [token, granularity]);
+
   const onRefresh = async () => {
     setRefreshing(true);
-    await fetchReport(false);
+    await Promise.all([fetchReport(false), fetchSeries()]);
     setRefreshing(false);
   };
 
@@ -84,6 +116,14 @@ export default function EmployeeReports({ navigation }) {
     ],
   };
 
+  // Biểu đồ doanh thu theo kỳ; chỉ ghi nhãn vài kỳ để trục hoành không bị chồng chữ
+  const points = series?.series || [];
+  const labelStep = Math.max(1, Math.ceil(points.length / 6));
+  const seriesChartData = {
+    labels: points.map((p, idx) => (idx % labelStep === 0 ? p.period.slice(5) : '')),
+    datasets: [{ data: points.length ? points.map(p => Number(p.revenue) / 1000) : [0] }],
+  };
+
   return (
     <>
       <SafeAreaView style={styles.headerSafe}>
@@ -109,6 +149,46 @@ export default function EmployeeReports({ navigation }) {
           <Text style={styles.label}>Tổng doanh thu:</Text>
           <Text style={styles.value}>{report.total_revenue.toLocaleString('vi-VN')} đ</Text>
         </View>
+        <View style={styles.card}>
+          <Text style={styles.label}>Xu hướng doanh thu (nghìn đ):</Text>
+          <View style={styles.tabs}>
+            {SERIES_OPTIONS.map(option => (
+              <TouchableOpacity
+                key={option.key}
+                style={[styles.tab, granularity === option.key && styles.tabActive]}
+                onPress={() => setGranularity(option.key)}
+              >
+                <Text style={[styles.tabText, granularity === option.key && styles.tabTextActive]}>{option.label}</Text>
+              </TouchableOpacity>
+            ))}
+          </View>
+          {!series ? (
+            <Text style={styles.value}>Không thể tải dữ liệu xu hướng.</Text>
+          ) : (
+            <>
+              <LineChart
+                data={seriesChartData}
+                width={Dimensions.get('window').width - 48}
+                height={220}
+                chartConfig={{
+                  backgroundColor: '#fff',
+                  backgroundGradientFrom: '#fff',
+                  backgroundGradientTo: '#fff',
+                  decimalPlaces: 0,
+                  color: (opacity = 1) => `rgba(33, 150, 243, ${opacity})`,
+                  labelColor: (opacity = 1) => `rgba(52, 73, 94, ${opacity})`,
+                  propsForDots: { r: '2' },
+                }}
+                style={{ marginVertical: 8, borderRadius: 8, alignSelf: 'center' }}
+                fromZero
+                bezier
+              />
+              <Text style={styles.value}>Doanh thu: {Number(series.totals.revenue).toLocaleString('vi-VN')} đ</Text>
+              <Text style={styles.value}>Số đơn: {series.totals.orders} · Sản phẩm bán: {series.totals.units}</Text>
+              <Text style={styles.value}>Giá trị đơn trung bình: {Number(series.totals.average_order_value).toLocaleString('vi-VN')} đ</Text>
+            </>
+          )}
+        </View>
         <View style={styles.card}>
           <Text style={styles.label}>Tổng số đơn hàng:</Text>
           <Text style={styles.value}>{report.total_orders}</Text>
@@ -209,4 +289,25 @@ const styles = StyleSheet.create({
     color: '#222',
     marginBottom: 2,
   },
+  tabs: {
+    flexDirection: 'row',
+    marginVertical: 8,
+  },
+  tab: {
+    paddingVertical: 6,
+    paddingHorizontal: 12,
+    borderRadius: 16,
+    backgroundColor: '#e3f2fd',
+    marginRight: 8,
+  },
+  tabActive: {
+    backgroundColor: '#2196f3',
+  },
+  tabText: {
+    color: '#1976d2',
+    fontWeight: '600',
+  },
+  tabTextActive: {
+    color: '#fff',
+  },
 });
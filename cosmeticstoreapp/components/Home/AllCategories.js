@@ -63,7 +63,7 @@ export default function AllCategoriesScreen({ navigation }) {
             renderItem={({ item }) => (
               <TouchableOpacity style={styles.categoryBox} onPress={() => navigation.navigate('CategoryProducts', { category: item })}>
                 {item.image ? (
-                  <Image source={{ uri: item.image }} style={styles.categoryImage} resizeMode="cover" />
+                  <Image source={{ uri: item.image_urls?.card || item.image }} style={styles.categoryImage} resizeMode="cover" />
                 ) : (
                   <View style={styles.categoryImage} />
                 )}
@@ -73,7 +73,7 @@ export default function AllProductsScreen({ navigation }) {
             renderItem={({ item }) => (
               <TouchableOpacity style={styles.productBox} onPress={() => navigation.navigate('ProductDetail', { product: item })}>
                 {item.image ? (
-                  <Image source={{ uri: item.image }} style={styles.productImage} resizeMode="cover" />
+                  <Image source={{ uri: item.image_urls?.card || item.image }} style={styles.productImage} resizeMode="cover" />
                 ) : (
                   <View style={styles.productImage} />
                 )}
@@ -75,6 +75,46 @@ export default function CartScreen({ navigation }) {
     setShowAddressSuggestions(true);
   };
 
+  // Cập nhật state từ dữ liệu giỏ hàng backend trả về (GET /carts/ hoặc POST /carts/batch/)
+  const applyCartData = (cartData) => {
+    setCart(cartData);
+    setShippingAddress(prev => {
+      if (prev) return prev;
+      if (cartData && cartData.address) return cartData.address;
+      if (cartData && cartData.user_address) return cartData.user_address;
+      return '';
+    });
+    // Cập nhật phí vận chuyển và dịch vụ từ backend
+    if (cartData && typeof cartData.shipping_fee !== 'undefined') {
+      setShippingFee(cartData.shipping_fee);
+    }
+    if (cartData && typeof cartData.service_fee !== 'undefined') {
+      setServiceFee(cartData.service_fee);
+    }
+    // Cập nhật giảm giá từ backend nếu có
+    if (cartData && cartData.discount_code) {
+      setDiscountPercent(Number(cartData.discount_code.discount_percentage) || 0);
+      setDiscountCode(cartData.discount_code.code || '');
+      // Nếu backend trả về discount_amount hoặc discount_value
+      if (typeof cartData.discount_amount !== 'undefined') {
+        setDiscountAmount(Number(cartData.discount_amount) || 0);
+      } else if (typeof cartData.discount_value !== 'undefined') {
+        setDiscountAmount(Number(cartData.discount_value) || 0);
+      } else {
+        setDiscountAmount(0);
+      }
+    } else {
+      setDiscountAmount(0);
+    }
+    // Reset state nếu giỏ hàng trống
+    if (cartData && Array.isArray(cartData.items) && cartData.items.length === 0) {
+      setShippingAddress('');
+      setDiscountCode('');
+      setDiscountPercent(0);
+      setDiscountAmount(0);
+    }
+  };
+
   const fetchCart = async () => {
     if (!token) return;
     setLoading(true);
@@ -82,42 +122,7 @@ export default function CartScreen({ navigation }) {
       const axios = authAxios(token);
       const res = await axios.get('/carts/');
       const cartData = Array.isArray(res.data.results) ? res.data.results[0] : res.data;
-      setCart(cartData);
-      setShippingAddress(prev => {
-        if (prev) return prev;
-        if (cartData && cartData.address) return cartData.address;
-        if (cartData && cartData.user_address) return cartData.user_address;
-        return '';
-      });
-      // Cập nhật phí vận chuyển và dịch vụ từ backend
-      if (cartData && typeof cartData.shipping_fee !== 'undefined') {
-        setShippingFee(cartData.shipping_fee);
-      }
-      if (cartData && typeof cartData.service_fee !== 'undefined') {
-        setServiceFee(cartData.service_fee);
-      }
-      // Cập nhật giảm giá từ backend nếu có
-      if (cartData && cartData.discount_code) {
-        setDiscountPercent(Number(cartData.discount_code.discount_percentage) || 0);
-        setDiscountCode(cartData.discount_code.code || '');
-        // Nếu backend trả về discount_amount hoặc discount_value
-        if (typeof cartData.discount_amount !== 'undefined') {
-          setDiscountAmount(Number(cartData.discount_amount) || 0);
-        } else if (typeof cartData.discount_value !== 'undefined') {
-          setDiscountAmount(Number(cartData.discount_value) || 0);
-        } else {
-          setDiscountAmount(0);
-        }
-      } else {
-        setDiscountAmount(0);
-      }
-      // Reset state nếu giỏ hàng trống
-      if (cartData && Array.isArray(cartData.items) && cartData.items.length === 0) {
-        setShippingAddress('');
-        setDiscountCode('');
-        setDiscountPercent(0);
-        setDiscountAmount(0);
-      }
+      applyCartData(cartData);
     } catch (err) {
       setCart(null);
     }
@@ -164,23 +169,26 @@ export default function CartScreen({ navigation }) {
     setRefreshing(false);
   };
 
-  const handleRemoveItem = async (itemId) => {
+  // Thay đổi giỏ hàng qua POST /carts/batch/: backend tính lại phí một lần và trả về giỏ đã tính giá
+  const handleRemoveItem = async (productId) => {
     if (!token) return;
     try {
       const axios = authAxios(token);
-      await axios.delete(`/cart-items/${itemId}/`);
-      fetchCart();
+      const res = await axios.post('/carts/batch/', { operations: [{ op: 'remove', product: productId }] });
+      applyCartData(res.data);
     } catch (err) {
       Alert.alert('Thông báo', 'Lỗi khi xóa sản phẩm khỏi giỏ hàng!');
     }
   };
 
-  const handleChangeQuantity = async (itemId, newQuantity) => {
+  const handleChangeQuantity = async (productId, newQuantity) => {
     if (!token || newQuantity < 1) return;
     try {
       const axios = authAxios(token);
-      await axios.patch(`/cart-items/${itemId}/`, { quantity: newQuantity });
-      fetchCart();
+      const res = await axios.post('/carts/batch/', {
+        operations: [{ op: 'set_quantity', product: productId, quantity: newQuantity }],
+      });
+      applyCartData(res.data);
     } catch (err) {
       Alert.alert('Thông báo', 'Lỗi khi cập nhật số lượng!');
     }
@@ -193,10 +201,13 @@ export default function CartScreen({ navigation }) {
   };
 
   // Tính tổng giá tiền của giỏ hàng
+  // Đơn giá sau khuyến mãi (giống giá server dùng để tính tạm tính), thiếu thì dùng giá niêm yết
+  const getUnitPrice = (item) => Number(item.product_detail?.effective_price ?? item.product_detail?.price) || 0;
+
   const getSubtotal = () => {
     if (!cart || !cart.items) return 0;
     return cart.items.reduce((sum, item) => {
-      const price = Number(item.product_detail?.price) || 0;
+      const price = getUnitPrice(item);
       const quantity = Number(item.quantity) || 0;
       return sum + price * quantity;
     }, 0);
@@ -362,16 +373,21 @@ export default function CartScreen({ navigation }) {
                   <View style={styles.itemInfo}>
                     <Text style={styles.itemName}>{item.product_name}</Text>
                     <Text style={styles.itemDesc} numberOfLines={1} ellipsizeMode="tail">{item.product_detail?.description || ''}</Text>
-                    <Text style={styles.itemPrice}>
-                      {item.product_detail && item.product_detail.price ? formatCurrency(item.product_detail.price) : ''}
-                    </Text>
+                    {item.product_detail && item.product_detail.price ? (
+                      <View style={styles.itemPriceRow}>
+                        <Text style={styles.itemPrice}>{formatCurrency(getUnitPrice(item))}</Text>
+                        {getUnitPrice(item) !== Number(item.product_detail.price) && (
+                          <Text style={styles.itemOldPrice}>{formatCurrency(item.product_detail.price)}</Text>
+                        )}
+                      </View>
+                    ) : null}
                     <View style={styles.quantityRow}>
-                      <TouchableOpacity onPress={() => handleChangeQuantity(item.id, item.quantity - 1)} style={styles.qtyBtn}><Text>-</Text></TouchableOpacity>
+                      <TouchableOpacity onPress={() => handleChangeQuantity(item.product, item.quantity - 1)} style={styles.qtyBtn}><Text>-</Text></TouchableOpacity>
                       <Text style={styles.qtyText}>{item.quantity}</Text>
-                      <TouchableOpacity onPress={() => handleChangeQuantity(item.id, item.quantity + 1)} style={styles.qtyBtn}><Text>+</Text></TouchableOpacity>
+                      <TouchableOpacity onPress={() => handleChangeQuantity(item.product, item.quantity + 1)} style={styles.qtyBtn}><Text>+</Text></TouchableOpacity>
                     </View>
                   </View>
-                  <TouchableOpacity onPress={() => handleRemoveItem(item.id)} style={styles.removeBtn}>
+                  <TouchableOpacity onPress={() => handleRemoveItem(item.product)} style={styles.removeBtn}>
                     <MaterialCommunityIcons name="delete" size={22} color="#d32f2f" />
                   </TouchableOpacity>
                 </View>
@@ -490,10 +506,20 @@ const styles = StyleSheet.create({
     color: '#888',
     marginBottom: 2,
   },
+  itemPriceRow: {
+    flexDirection: 'row',
+    alignItems: 'center',
+    gap: 8,
+    marginBottom: 4,
+  },
   itemPrice: {
     fontSize: 14,
     color: '#1976d2',
-    marginBottom: 4,
+  },
+  itemOldPrice: {
+    fontSize: 12,
+    color: '#aaa',
+    textDecorationLine: 'line-through',
   },
   quantityRow: {
     flexDirection: 'row',
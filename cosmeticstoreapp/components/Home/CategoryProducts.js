@@ -75,7 +75,7 @@ export default function CategoryProductsScreen({ route, navigation }) {
             renderItem={({ item }) => (
               <TouchableOpacity style={styles.productBox} onPress={() => navigation.navigate('ProductDetail', { product: item })}>
                 {item.image ? (
-                  <Image source={{ uri: item.image }} style={styles.productImage} resizeMode="cover" />
+                  <Image source={{ uri: item.image_urls?.card || item.image }} style={styles.productImage} resizeMode="cover" />
                 ) : (
                   <View style={styles.productImage} />
                 )}
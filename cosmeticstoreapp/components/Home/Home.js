@@ -48,7 +48,7 @@ export default function HomeScreen(props) {
   };
   const fetchFeaturedProducts = async (token) => {
     try {
-      const allProducts = await fetchAllPages(token, endpoints["products"], "?sold_gte=100");
+      const allProducts = await fetchAllPages(token, endpoints["products"], "?sold_gte=100&expand=description");
       setProducts(allProducts);
     } catch (err) {
       console.error("Lỗi khi load sản phẩm nổi bật:", err);
@@ -192,7 +192,7 @@ export default function HomeScreen(props) {
             >
               <View style={{ flexDirection: 'row', alignItems: 'center' }}>
                 {item.image ? (
-                  <Image source={{ uri: item.image }} style={styles.suggestionImage} />
+                  <Image source={{ uri: item.image_urls?.thumbnail || item.image }} style={styles.suggestionImage} />
                 ) : (
                   <View style={styles.suggestionImage} />
                 )}
@@ -215,7 +215,7 @@ export default function HomeScreen(props) {
           renderItem={({ item }) => (
             <TouchableOpacity style={styles.featuredBox} onPress={() => navigation.navigate('ProductDetail', { product: item })}>
               {item.image ? (
-                <Image source={{ uri: item.image }} style={styles.featuredImage} resizeMode="cover" />
+                <Image source={{ uri: item.image_urls?.card || item.image }} style={styles.featuredImage} resizeMode="cover" />
               ) : (
                 <View style={styles.featuredImage} />
               )}
@@ -20,7 +20,8 @@ const formatCurrency = (value) => {
 };
 
 export default function ProductDetailScreen({ route, navigation }) {
-  const { product } = route.params;
+  // Danh sách chỉ trả về dạng rút gọn, tải chi tiết đầy đủ theo id
+  const [product, setProduct] = useState(route.params.product);
   const user = useContext(UserContext);
   const [relatedProducts, setRelatedProducts] = useState([]);
   const [reviews, setReviews] = useState([]);
@@ -90,6 +91,13 @@ export default function ProductDetailScreen({ route, navigation }) {
     }
   }, [user]);
 
+  useEffect(() => {
+    if (!token) return;
+    authAxios(token).get(endpoints.productDetails(route.params.product.id))
+      .then(res => setProduct(res.data))
+      .catch(() => {});
+  }, [route.params.product.id, token]);
+
   const fetchData = async () => {
     if (!token) return;
     const axios = authAxios(token);
@@ -427,7 +435,7 @@ export default function ProductDetailScreen({ route, navigation }) {
                 onPress={() => navigation.push('ProductDetail', { product: item })}
               >
                 {item.image ? (
-                  <Image source={{ uri: item.image }} style={styles.relatedImage} />
+                  <Image source={{ uri: item.image_urls?.thumbnail || item.image }} style={styles.relatedImage} />
                 ) : (
                   <View style={styles.relatedImage} />
                 )}
@@ -121,7 +121,7 @@ export default function OrderDetailScreen({ route, navigation }) {
           data={order.items || []}
           keyExtractor={item => item.id?.toString()}
           renderItem={({ item }) => {
-            const imageUrl = item.product?.image || (item.product?.images && item.product.images.length > 0 ? item.product.images[0].image : null);
+            const imageUrl = item.product_image || null;
             return (
               <View style={styles.itemBoxRow}>
                 {imageUrl ? (
@@ -130,7 +130,7 @@ export default function OrderDetailScreen({ route, navigation }) {
                   <View style={styles.productImageRow} />
                 )}
                 <View style={styles.itemInfoCol}>
-                  <Text style={styles.itemNameRow}>{item.product_name || item.product?.name}</Text>
+                  <Text style={styles.itemNameRow}>{item.product_name}</Text>
                   <Text style={styles.itemQty}>Số lượng: {item.quantity}</Text>
                   <Text style={styles.itemPrice}>Giá: {item.price ? Number(item.price).toLocaleString('vi-VN', { style: 'currency', currency: 'VND', minimumFractionDigits: 0 }) : ''}</Text>
                 </View>
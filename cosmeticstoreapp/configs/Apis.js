@@ -19,6 +19,7 @@ export const endpoints = {
 	inventory: '/inventory/',
 	updateStock: '/update-stock/',
 	reportSummary: '/report-summary/',
+	reportSeries: '/report-series/',
 	dashboard: '/dashboard/',
 };
 